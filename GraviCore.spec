@@ -11,8 +11,14 @@ a = Analysis(
     ],
     hiddenimports=[
         'database',
+        'export',
+        'live_stream',
         'recorder',
         'replay_window',
+        'serial_ingest',
+        'filters',
+        'ring_buffer',
+        'acquisition',
         'web_dashboard',
         'remote_sync',
         'flask',
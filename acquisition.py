@@ -0,0 +1,443 @@
+# ============================================================
+#  acquisition.py — Serial acquisition + recording, optionally in
+#                   a separate process (shared-memory sample ring)
+# ============================================================
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import types
+from multiprocessing import shared_memory
+
+import serial
+
+import database as db
+from filters import MedianClamp, MEDIAN_WINDOW, MAX_DELTA
+from recorder import SessionRecorder
+from ring_buffer import SampleRing, RING_CAPACITY
+from serial_ingest import LineReader, BINARY_REQUEST, JSON_REQUEST
+
+SINK_INTERVAL = 0.01   # s between two reads of the ring by the recorder
+STATS_INTERVAL = 0.5   # s between two stats messages to the GUI
+REPLY_TIMEOUT = 10.0   # s to wait for the acquisition process to answer
+QUIT_TIMEOUT = 5.0     # s to wait for it to exit before terminating it
+
+
+# ── Shared by both modes ────────────────────────────────────
+
+def com_ratio(weight):
+    """Normalised centre of mass (xr, yr) in [-1, 1], or (0, 0) below 1 kg."""
+    total = weight[0] + weight[1] + weight[2] + weight[3]
+    if total < 1000:
+        return 0.0, 0.0
+    return ((weight[0] + weight[2] - weight[1] - weight[3]) / total,
+            (weight[2] + weight[3] - weight[0] - weight[1]) / total)
+
+
+def pump(reader: LineReader, filt: MedianClamp, ring: SampleRing,
+         on_status) -> int:
+    """One bulk read of the port: filtered samples go to the ring, status
+    messages to on_status(dict). Returns the number of samples pushed."""
+    messages = reader.read_messages()
+    if not messages:
+        return 0
+    now = time.time()
+    n = 0
+    for kind, data, t in messages:
+        if kind == "status":
+            on_status(data)
+            continue
+        w = filt.step(data)
+        ring.push((now if t is None else t, w[0], w[1], w[2], w[3]))
+        n += 1
+    return n
+
+
+def read_ring(reader, name: str):
+    """reader.read() plus the number of samples the ring overwrote before
+    this reader got them (also logged)."""
+    before = reader.dropped
+    rows = reader.read()
+    lost = reader.dropped - before
+    if lost:
+        print(f"[RING] {name}: {lost} samples overwritten before being read")
+    return rows, lost
+
+
+def record_rows(recorder: SessionRecorder, rows):
+    """Hand ring rows (t, w0, w1, w2, w3) to the recorder."""
+    for t, w0, w1, w2, w3 in rows:
+        xr, yr = com_ratio((w0, w1, w2, w3))
+        recorder.record_at(t, w0, w1, w2, w3, xr, yr)
+
+
+def _send_json(port, obj: dict):
+    port.write((json.dumps(obj) + "\n").encode())
+
+
+def release_port(port):
+    """Switch the device back to JSON lines (what a later port probe or an
+    older app expects), then close the port."""
+    try:
+        _send_json(port, JSON_REQUEST)
+        port.flush()
+    except Exception:
+        pass
+    try:
+        port.close()
+    except Exception:
+        pass
+
+
+# ── Acquisition process (worker side) ───────────────────────
+# Commands (GUI -> worker):  ("open", token, device, baud), ("close",),
+#   ("write", bytes), ("rec_start", user_id, platform_id), ("rec_stop",),
+#   ("quit",)
+# Events (worker -> GUI):    ("port", token, ok, message), ("status", dict),
+#   ("stats", dict), ("rec_started", session_id, start_time),
+#   ("rec_stopped", session_id)
+
+class _Worker:
+    """Owns the serial port, the filter and the recorder."""
+
+    def __init__(self, ring: SampleRing, events, filt: MedianClamp):
+        self.ring = ring
+        self.events = events
+        self.filt = filt
+        self.recorder = SessionRecorder()
+        self.port = None
+        self.token = 0
+        self.reader = None
+        self.sink_reader = None
+        self._quit = threading.Event()
+
+    def run(self, commands):
+        threads = [threading.Thread(target=self._read_loop, name="acq-read",
+                                    daemon=True),
+                   threading.Thread(target=self._sink_loop, name="acq-sink",
+                                    daemon=True)]
+        for th in threads:
+            th.start()
+        next_stats = 0.0
+        while True:
+            try:
+                cmd = commands.get(timeout=STATS_INTERVAL)
+            except queue.Empty:
+                cmd = None
+            if cmd is not None:
+                if cmd[0] == "quit":
+                    break
+                try:
+                    self._handle(cmd)
+                except Exception as e:
+                    print(f"[ACQ] {cmd[0]}: {e}")
+            now = time.monotonic()
+            if now >= next_stats:
+                next_stats = now + STATS_INTERVAL
+                self._send_stats()
+        self._quit.set()
+        if self.recorder.is_recording:
+            self.recorder.stop()
+        self._close_port()
+        for th in threads:
+            th.join(1.0)
+        db.close_all()
+
+    def _handle(self, cmd):
+        kind = cmd[0]
+        if kind == "open":
+            _, token, device, baud = cmd
+            self._close_port()
+            try:
+                port = serial.Serial(device, baud, timeout=1)
+            except Exception as e:
+                self.events.put(("port", token, False, f"Erreur: {e}"))
+                return
+            self.token, self.port = token, port
+            self.events.put(("port", token, True, ""))
+        elif kind == "close":
+            self._close_port()
+        elif kind == "write":
+            if self.port is not None:
+                self.port.write(cmd[1])
+        elif kind == "rec_start":
+            sid = self.recorder.start(cmd[1], cmd[2])
+            self.events.put(("rec_started", sid, self.recorder.start_time))
+        elif kind == "rec_stop":
+            self.events.put(("rec_stopped", self.recorder.stop()))
+
+    def _close_port(self):
+        port, self.port = self.port, None
+        if port is not None:
+            release_port(port)
+
+    def _send_stats(self):
+        st = self.reader.stats if self.reader is not None else None
+        sink = self.sink_reader
+        stats = {"recorded": self.recorder.sample_count,
+                 "rec_dropped": self.recorder.dropped_samples,
+                 "ring_dropped": sink.dropped if sink is not None else 0}
+        if st is not None:
+            stats.update(rate=st.rate, capacity=st.capacity, lines=st.lines,
+                         frames=st.frames, bad=st.bad, dropped=st.dropped,
+                         crc_errors=st.crc_errors)
+        self.events.put(("stats", stats))
+
+    def _read_loop(self):
+        reader = None
+        while not self._quit.is_set():
+            port = self.port
+            if port is None:
+                time.sleep(0.05)
+                continue
+            try:
+                if reader is None or reader.port is not port:
+                    reader = self.reader = LineReader(port)
+                    self.filt.reset()  # no history from the last port
+                    # Ask for binary frames; JSON lines go on if unsupported
+                    _send_json(port, BINARY_REQUEST)
+                pump(reader, self.filt, self.ring,
+                     lambda data: self.events.put(("status", data)))
+            except Exception as e:
+                if self.port is port:
+                    print(f"[ACQ] {e}")
+                    self._close_port()
+                    self.events.put(("port", self.token, False, f"Erreur: {e}"))
+                time.sleep(0.5)
+
+    def _sink_loop(self):
+        reader = self.sink_reader = self.ring.reader()
+        while not self._quit.wait(SINK_INTERVAL):
+            rows, lost = read_ring(reader, "enregistrement")
+            if self.recorder.is_recording:
+                if lost:
+                    self.recorder.count_lost(lost)
+                if rows:
+                    record_rows(self.recorder, rows)
+        db.close_connection()
+
+
+def _worker_main(shm_name, capacity, commands, events, db_path, window,
+                 max_delta):
+    """Entry point of the acquisition process."""
+    db._DB_PATH = db_path
+    # Attached, not owned: the GUI process unlinks the block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = SampleRing(capacity, buf=shm.buf)
+    try:
+        _Worker(ring, events, MedianClamp(window, max_delta)).run(commands)
+    finally:
+        ring.close()
+        shm.close()
+
+
+# ── GUI side ────────────────────────────────────────────────
+
+class RemotePort:
+    """Stand-in for the serial.Serial the acquisition process opened."""
+
+    def __init__(self, acq: "AcquisitionProcess", token: int, device: str):
+        self._acq = acq
+        self.token = token
+        self.port = device
+        self.is_open = True
+        self.error = ""
+
+    def write(self, data: bytes):
+        self._acq._send(("write", bytes(data)))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self._acq._ports.pop(self.token, None)
+            self._acq._send(("close",))
+
+
+class RemoteRecorder:
+    """Stand-in for SessionRecorder: samples are recorded by the
+    acquisition process; start() and stop() wait for it."""
+
+    def __init__(self, acq: "AcquisitionProcess"):
+        self._acq = acq
+        self._recording = False
+        self._session_id = None
+        self._start_time = 0.0
+
+    @property
+    def is_recording(self) -> bool:
+        return self._recording
+
+    @property
+    def session_id(self) -> int:
+        return self._session_id
+
+    @property
+    def start_time(self) -> float:
+        return self._start_time
+
+    @property
+    def elapsed(self) -> float:
+        if not self._recording:
+            return 0.0
+        return time.time() - self._start_time
+
+    @property
+    def sample_count(self) -> int:
+        return self._acq.stats.recorded
+
+    @property
+    def dropped_samples(self) -> int:
+        return self._acq.stats.rec_dropped
+
+    def start(self, user_id: int, platform_id: int) -> int:
+        """Start a new recording session. Returns session_id, or None if
+        the acquisition process did not answer (nothing is recorded)."""
+        if self._recording:
+            self.stop()
+        reply = self._acq._request(("rec_start", user_id, platform_id),
+                                   "rec_started")
+        if reply is None:
+            # Commands run in order: a late start is ended right away
+            self._acq._send(("rec_stop",))
+            return None
+        self._session_id, self._start_time = reply
+        self._acq.stats.recorded = 0
+        self._acq.stats.rec_dropped = 0
+        self._recording = True
+        return self._session_id
+
+    def stop(self) -> int:
+        """Stop recording once the acquisition process has saved the
+        session. Returns session_id."""
+        if not self._recording:
+            return None
+        self._recording = False
+        reply = self._acq._request(("rec_stop",), "rec_stopped")
+        self._session_id = None
+        return reply[0] if reply else None
+
+
+class AcquisitionProcess:
+    """Serial reading, filtering and recording in their own process.
+
+    Samples come back through a SampleRing in shared memory: `samples`
+    is read like the in-process ring. `recorder` and the ports returned
+    by open_port() replace SessionRecorder and serial.Serial for the GUI;
+    status messages are collected with poll_status()."""
+
+    def __init__(self, capacity: int = RING_CAPACITY,
+                 window: int = MEDIAN_WINDOW, max_delta: float = MAX_DELTA):
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=SampleRing.nbytes(capacity))
+        self.samples = SampleRing(capacity, buf=self._shm.buf)
+        ctx = multiprocessing.get_context("spawn")
+        self._commands = ctx.Queue()
+        self._events = ctx.Queue()
+        self._proc = ctx.Process(
+            target=_worker_main, name="acquisition", daemon=True,
+            args=(self._shm.name, capacity, self._commands, self._events,
+                  db._DB_PATH, window, max_delta))
+        # Last IngestStats values of the process (+ samples recorded)
+        self.stats = types.SimpleNamespace(
+            rate=0.0, capacity=0.0, lines=0, frames=0, bad=0, dropped=0,
+            crc_errors=0, recorded=0, rec_dropped=0, ring_dropped=0)
+        self.recorder = RemoteRecorder(self)
+        self._ports = {}
+        self._token = 0
+        self._status = []
+        self._replies = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def is_alive(self) -> bool:
+        return self._proc.is_alive()
+
+    def start(self):
+        self._proc.start()
+        threading.Thread(target=self._event_loop, name="acq-events",
+                         daemon=True).start()
+
+    def open_port(self, device: str, baud: int) -> RemotePort:
+        """Have the process open `device`; the port reports is_open False
+        (and error) if that fails or the link drops later."""
+        self._token += 1
+        port = self._ports[self._token] = RemotePort(self, self._token, device)
+        self._send(("open", self._token, device, baud))
+        return port
+
+    def poll_status(self) -> list:
+        """Status messages received from the device since the last call."""
+        with self._cond:
+            status, self._status = self._status, []
+        return status
+
+    def close(self, timeout: float = QUIT_TIMEOUT):
+        """Stop the process (an ongoing recording is saved first) and free
+        the shared memory. Readers of `samples` must be done."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._proc.is_alive():
+            self._send(("quit",))
+            self._proc.join(timeout)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join(1.0)
+        self.samples.close()
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _send(self, cmd):
+        self._commands.put(cmd)
+
+    def _request(self, cmd, reply: str, timeout: float = REPLY_TIMEOUT):
+        """Send cmd and wait for the `reply` event (its fields, or None)."""
+        with self._cond:
+            self._replies.pop(reply, None)
+        self._send(cmd)
+        with self._cond:
+            if not self._cond.wait_for(lambda: reply in self._replies, timeout):
+                print(f"[ACQ] no answer to {cmd[0]}")
+                return None
+            return self._replies.pop(reply)
+
+    def _event_loop(self):
+        while not self._closed:
+            try:
+                event = self._events.get(timeout=0.5)
+            except queue.Empty:
+                if not self._proc.is_alive() and not self._closed:
+                    print("[ACQ] acquisition process exited")
+                    for port in list(self._ports.values()):
+                        port.is_open = False
+                        port.error = "Processus d'acquisition arrete"
+                    self.recorder._recording = False
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            kind = event[0]
+            if kind == "stats":
+                self.stats.__dict__.update(event[1])
+            elif kind == "port":
+                _, token, ok, message = event
+                port = self._ports.get(token)
+                if port is not None and not ok:
+                    port.is_open = False
+                    port.error = message
+                    self._ports.pop(token, None)
+            else:
+                with self._cond:
+                    if kind == "status":
+                        self._status.append(event[1])
+                    else:
+                        self._replies[kind] = event[1:]
+                        self._cond.notify_all()
@@ -2,16 +2,33 @@
 #  Centre de Masse — Plateforme de Force  (Dear PyGui GPU)
 #  pip install pyserial dearpygui
 # ============================================================
-import dearpygui.dearpygui as dpg
+import multiprocessing
+
+if __name__ == "__main__":
+    # Frozen exe relaunched as a worker process (batch export, acquisition):
+    # run the task and exit before anything else is imported
+    multiprocessing.freeze_support()
+
 import serial
 import serial.tools.list_ports
 import json, threading, time, math, os, sys, webbrowser
 from collections import deque
 
+import acquisition
 import database as db
+import filters
+import live_stream
+import ring_buffer
+from acquisition import (com_ratio as _com_ratio, pump, read_ring,
+                         record_rows, release_port)
 from recorder import SessionRecorder
+from serial_ingest import LineReader, BINARY_REQUEST, probe
 from remote_sync import RemoteSync
 
+# dearpygui.dearpygui, imported by main(): worker processes (spawn start
+# method) import this file as __mp_main__ and must not load the GUI
+dpg = None
+
 
 def _app_dir():
     if getattr(sys, 'frozen', False):
@@ -109,9 +126,7 @@ def _save_settings(data):
     except Exception:
         pass
 
-current_theme = _load_settings().get("theme", "dark")
-if current_theme not in THEMES:
-    current_theme = "dark"
+current_theme = "dark"   # read from cm_settings.json by main()
 
 SENSOR_NAMES = ["Haut-Droit", "Haut-Gauche", "Bas-Droit", "Bas-Gauche"]
 
@@ -158,18 +173,25 @@ def _sc(i):
     """Sensor color i as RGBA (cached)."""
     return _tc_sc[i] if _tc_sc else _hex_rgba(THEMES[current_theme]["sensor_colors"][i])
 
-_refresh_theme_cache()
-
 # ============================================================
 # STATE
 # ============================================================
-raw_w         = [0, 0, 0, 0]
-freq          = 0.0
-last_received = time.time()
-_freq_times   = deque(maxlen=50)
-_sensor_bufs  = [deque(maxlen=5) for _ in range(4)]
-_sensor_prev  = [0.0] * 4
-_MAX_DELTA    = 3000
+# (t, w0, w1, w2, w3) of every filtered sample, written by the serial
+# thread only; the UI, the recorder and the live view read at their own
+# cursor (ring_buffer.RingReader), no lock
+samples       = None   # ring_buffer.SampleRing, created by main()
+_t_boot       = time.time()
+SINK_INTERVAL = 0.01   # s between recorder / live view reads
+_sink_stop    = threading.Event()
+_sink_thread  = None
+_sink_readers = {}     # "enregistrement" / "direct" -> RingReader
+# acquisition.AcquisitionProcess when serial reading and recording run in
+# their own process (cm_settings.json: "acquisition_process": true)
+_acq          = None
+_settings     = {}
+# filters.MedianClamp per sensor (cm_settings.json: median_window, max_delta)
+_filter       = None
+_ingest       = None   # serial_ingest.IngestStats of the current port
 com_trail     = deque(maxlen=TRAIL_LENGTH)
 calib_offsets = [0] * 4
 calib_scales  = [0.0] * 4
@@ -177,15 +199,14 @@ response_queue = []
 resp_lock      = threading.Lock()
 serial_conn    = None
 
-db.init_db()
-recorder = SessionRecorder()
+recorder = None   # SessionRecorder (or RemoteRecorder), created by main()
+_live = live_stream.broadcaster   # web dashboard live view (/live)
 web_server_thread  = None
 web_server_running = False
 
 _REMOTE_URL = "https://gravicore.ibenji.fr/cm_api.php"
 _REMOTE_KEY = "c4d1146e19f391e0b6901bcb88c32d10e7f6e5174d12f179bd7a1018b4c9c8e0"
-remote_sync = RemoteSync(server_url=_REMOTE_URL, api_key=_REMOTE_KEY,
-                         app_version=APP_VERSION)
+remote_sync = None
 
 _update_ready_flag = False   # set by remote_sync thread
 _prev_weights  = [None] * 4
@@ -202,45 +223,54 @@ _board = {
 # ============================================================
 # SERIAL THREAD
 # ============================================================
+def _on_status(data):
+    with resp_lock:
+        response_queue.append(data)
+
 def _read_loop():
-    global serial_conn, freq, last_received
+    global serial_conn, _ingest
+    reader = None
     while True:
         if serial_conn is None:
             time.sleep(0.05)
             continue
         try:
-            line = serial_conn.readline().decode(errors="ignore").strip()
-            if not line:
-                continue
-            data = json.loads(line)
-            if "weight1" in data:
-                for _si, _sk in enumerate(("weight1","weight2","weight3","weight4")):
-                    v = max(0, data[_sk])
-                    _sensor_bufs[_si].append(v)
-                    med = sorted(_sensor_bufs[_si])[len(_sensor_bufs[_si]) // 2]
-                    prev = _sensor_prev[_si]
-                    if abs(med - prev) > _MAX_DELTA:
-                        med = prev + _MAX_DELTA if med > prev else prev - _MAX_DELTA
-                    _sensor_prev[_si] = med
-                    raw_w[_si] = med
-                now = time.time()
-                _freq_times.append(now)
-                if len(_freq_times) >= 2:
-                    span = _freq_times[-1] - _freq_times[0]
-                    if span > 0:
-                        freq = (len(_freq_times) - 1) / span
-                last_received = now
-            elif "status" in data:
-                with resp_lock:
-                    response_queue.append(data)
-        except json.JSONDecodeError:
-            pass
+            if reader is None or reader.port is not serial_conn:
+                reader = LineReader(serial_conn)
+                _ingest = reader.stats
+                _filter.reset()  # no median / clamp history from the last port
+                # Ask for binary frames; JSON lines go on if unsupported
+                send_json(BINARY_REQUEST)
+            # Everything buffered so far, in one read
+            pump(reader, _filter, samples, _on_status)
         except Exception as e:
             print(f"[READ] {e}")
             serial_conn = None
             time.sleep(0.5)
 
-threading.Thread(target=_read_loop, daemon=True).start()
+def _sink_loop(record=True):
+    """Recorder and live web view, each at its own cursor on `samples`
+    (off the serial thread, so database and web work never delay it).
+    record=False when the acquisition process records itself."""
+    rec_reader = _sink_readers["enregistrement"] = samples.reader()
+    live_reader = _sink_readers["direct"] = samples.reader()
+    while not _sink_stop.wait(SINK_INTERVAL):
+        rows, lost = read_ring(rec_reader, "enregistrement")
+        if record and recorder.is_recording:
+            if lost:
+                recorder.count_lost(lost)
+            if rows:
+                record_rows(recorder, rows)
+        rows, _ = read_ring(live_reader, "direct")
+        if rows and _live.has_subscribers:
+            for t, w0, w1, w2, w3 in rows:
+                xr, yr = _com_ratio((w0, w1, w2, w3))
+                _live.publish((round(t * 1000), w0, w1, w2, w3, xr, yr))
+
+def _ring_lost(name):
+    """Samples the sink reader `name` lost to ring overruns."""
+    reader = _sink_readers.get(name)
+    return reader.dropped if reader is not None else 0
 
 def send_json(obj: dict):
     if serial_conn is None:
@@ -263,17 +293,9 @@ def _is_target(port_info) -> bool:
 def _try_port(device, baud, timeout=2.5):
     try:
         s = serial.Serial(device, baud, timeout=0.5)
-        deadline = time.time() + timeout
-        while time.time() < deadline:
-            raw = s.readline().decode(errors="ignore").strip()
-            if not raw:
-                continue
-            try:
-                d = json.loads(raw)
-                if "weight1" in d or "status" in d:
-                    return s
-            except json.JSONDecodeError:
-                pass
+        # JSON line or binary frame (device left in binary mode)
+        if probe(s, timeout):
+            return s
         s.close()
     except Exception:
         pass
@@ -297,39 +319,6 @@ def list_ports():
     result.sort(key=lambda x: (not x[3], not x[2], x[0]))
     return result
 
-# ============================================================
-# DPG CONTEXT
-# ============================================================
-dpg.create_context()
-
-# ============================================================
-# FONTS
-# ============================================================
-_font_dir = "C:/Windows/Fonts"
-font_default = font_title = font_header = font_small = font_coords = None
-font_mono = font_mono_large = None
-
-with dpg.font_registry():
-    segoe = os.path.join(_font_dir, "segoeui.ttf")
-    segoe_b = os.path.join(_font_dir, "segoeuib.ttf")
-    consola = os.path.join(_font_dir, "consola.ttf")
-    consola_b = os.path.join(_font_dir, "consolab.ttf")
-    if os.path.exists(segoe):
-        font_default = dpg.add_font(segoe, 20)
-        dpg.add_font_range(0x2600, 0x2700, parent=font_default)
-        font_small   = dpg.add_font(segoe, 16)
-    if os.path.exists(segoe_b):
-        font_title  = dpg.add_font(segoe_b, 30)
-        font_header = dpg.add_font(segoe_b, 20)
-        font_coords = dpg.add_font(segoe_b, 24)
-    if os.path.exists(consola):
-        font_mono = dpg.add_font(consola, 16)
-    if os.path.exists(consola_b):
-        font_mono_large = dpg.add_font(consola_b, 28)
-
-if font_default:
-    dpg.bind_font(font_default)
-
 # ============================================================
 # THEME ENGINE
 # ============================================================
@@ -407,11 +396,7 @@ def _build_global_theme(name):
             dpg.add_theme_style(dpg.mvStyleVar_ItemSpacing, 8, 4)
     return theme
 
-_global_themes = {
-    "dark":  _build_global_theme("dark"),
-    "light": _build_global_theme("light"),
-}
-dpg.bind_theme(_global_themes[current_theme])
+_global_themes = {}   # filled by _build_gui()
 
 # ============================================================
 # UI STATE
@@ -564,8 +549,7 @@ def _do_connect(s=None, a=None, u=None):
         dpg.set_value("label_conn_info", "Selectionne un port")
         return
     if serial_conn:
-        try: serial_conn.close()
-        except: pass
+        release_port(serial_conn)
         serial_conn = None
     baud = int(dpg.get_value("baud_combo"))
     if is_bt or is_target:
@@ -593,14 +577,18 @@ def _do_connect(s=None, a=None, u=None):
         except Exception as e:
             dpg.set_value("label_conn_info", f"Erreur: {e}")
             return
+    if _acq is not None:
+        # The acquisition process opens the port itself
+        try: serial_conn.close()
+        except: pass
+        serial_conn = _acq.open_port(device, baud)
     mode = "BT" if is_bt else "USB"
     dpg.set_value("label_conn_info", f"Connecte {mode} {device}")
 
 def _do_disconnect(s=None, a=None, u=None):
     global serial_conn
     if serial_conn:
-        try: serial_conn.close()
-        except: pass
+        release_port(serial_conn)
         serial_conn = None
     dpg.set_value("label_conn_info", "Deconnecte")
 
@@ -641,7 +629,11 @@ def _toggle_recording(s=None, a=None, u=None):
         if pid is None:
             dpg.set_value("lbl_rec_samples", "Selectionner une plateforme")
             return
-        recorder.start(uid, pid)
+        if recorder.start(uid, pid) is None:
+            # Acquisition process did not answer: nothing is being recorded
+            dpg.set_value("lbl_rec_samples",
+                          "Erreur : l'enregistrement n'a pas demarre")
+            return
         dpg.set_item_label("btn_rec", "ARRETER ENREGISTREMENT")
         dpg.bind_item_theme("btn_rec", _btn_theme(_t("accent_red"),
                             _t("accent_amber")))
@@ -661,7 +653,10 @@ def _open_history(s=None, a=None, u=None):
 def _toggle_dashboard(s=None, a=None, u=None):
     global web_server_thread, web_server_running
     if web_server_running:
+        from web_dashboard import stop_web_server
         web_server_running = False
+        # Graceful stop waits for running requests: keep it off the GUI thread
+        threading.Thread(target=stop_web_server, daemon=True).start()
         dpg.set_item_label("btn_dashboard", "DASHBOARD WEB : OFF")
         dpg.set_value("lbl_dashboard_url", "")
     else:
@@ -698,251 +693,292 @@ def _toggle_theme(s=None, a=None, u=None):
 # ============================================================
 # UI LAYOUT
 # ============================================================
-with dpg.window(tag="main_window", no_title_bar=True, no_move=True,
-                no_resize=True, no_scrollbar=True):
-
-    # ── Title bar (table: title left, freq/status right) ────
-    with dpg.table(header_row=False, borders_innerH=False,
-                   borders_innerV=False, borders_outerH=False,
-                   borders_outerV=False):
-        dpg.add_table_column(width_fixed=True)
-        dpg.add_table_column(width_stretch=True, init_width_or_weight=1.0)
-        dpg.add_table_column(width_fixed=True)
-        with dpg.table_row():
-            with dpg.group(horizontal=True):
-                t_title = dpg.add_text("GraviCore", tag="title_text")
-                if font_title:
-                    dpg.bind_item_font(t_title, font_title)
-                dpg.add_spacer(width=10)
-                with dpg.group():
-                    dpg.add_spacer(height=4)
-                    dpg.add_button(label="\u2600" if current_theme == "dark" else "\u263e",
-                                   tag="btn_theme", callback=_toggle_theme,
-                                   width=36, height=36)
-            dpg.add_spacer()
-            with dpg.group():
-                dpg.add_spacer(height=7)
+def _build_gui():
+    """Context, fonts, themes and the widget tree (called by main())."""
+    global _global_themes
+    dpg.create_context()
+
+    # ── Fonts ──────────────────────────────────────────────
+    _font_dir = "C:/Windows/Fonts"
+    font_default = font_title = font_header = font_small = font_coords = None
+    font_mono = font_mono_large = None
+
+    with dpg.font_registry():
+        segoe = os.path.join(_font_dir, "segoeui.ttf")
+        segoe_b = os.path.join(_font_dir, "segoeuib.ttf")
+        consola = os.path.join(_font_dir, "consola.ttf")
+        consola_b = os.path.join(_font_dir, "consolab.ttf")
+        if os.path.exists(segoe):
+            font_default = dpg.add_font(segoe, 20)
+            dpg.add_font_range(0x2600, 0x2700, parent=font_default)
+            font_small   = dpg.add_font(segoe, 16)
+        if os.path.exists(segoe_b):
+            font_title  = dpg.add_font(segoe_b, 30)
+            font_header = dpg.add_font(segoe_b, 20)
+            font_coords = dpg.add_font(segoe_b, 24)
+        if os.path.exists(consola):
+            font_mono = dpg.add_font(consola, 16)
+        if os.path.exists(consola_b):
+            font_mono_large = dpg.add_font(consola_b, 28)
+
+    if font_default:
+        dpg.bind_font(font_default)
+
+    _global_themes = {
+        "dark":  _build_global_theme("dark"),
+        "light": _build_global_theme("light"),
+    }
+    dpg.bind_theme(_global_themes[current_theme])
+
+    with dpg.window(tag="main_window", no_title_bar=True, no_move=True,
+                    no_resize=True, no_scrollbar=True):
+
+        # ── Title bar (table: title left, freq/status right) ────
+        with dpg.table(header_row=False, borders_innerH=False,
+                       borders_innerV=False, borders_outerH=False,
+                       borders_outerV=False):
+            dpg.add_table_column(width_fixed=True)
+            dpg.add_table_column(width_stretch=True, init_width_or_weight=1.0)
+            dpg.add_table_column(width_fixed=True)
+            with dpg.table_row():
                 with dpg.group(horizontal=True):
-                    t_freq = dpg.add_text("-- Hz", tag="label_freq")
-                    if font_small:
-                        dpg.bind_item_font(t_freq, font_small)
-                    dpg.add_spacer(width=15)
-                    t_status = dpg.add_text("DECONNECTE", tag="label_status")
-                    if font_small:
-                        dpg.bind_item_font(t_status, font_small)
-
-    dpg.add_separator()
-
-    # ── User / Platform bar ──────────────────────────────────
-    with dpg.group(horizontal=True):
-        dpg.add_text("UTILISATEUR")
-        dpg.add_combo([], tag="user_combo", width=160, callback=_on_user_change)
-        dpg.add_button(label="+ Ajouter", callback=_show_add_user)
-        dpg.add_button(label="Suppr.", callback=_show_del_user)
-        dpg.add_spacer(width=30)
-        dpg.add_text("PLATEFORME")
-        dpg.add_combo([], tag="plat_combo", width=200, callback=_on_plat_change)
-        dpg.add_button(label="+ Ajouter", callback=_show_add_plat)
-        dpg.add_button(label="Suppr.", callback=_show_del_plat)
-
-    dpg.add_separator()
-
-    # ── Connection bar ───────────────────────────────────────
-    with dpg.group(horizontal=True):
-        dpg.add_text("PORT")
-        dpg.add_combo([], tag="port_combo", width=380)
-        dpg.add_combo(["9600", "115200", "921600"], tag="baud_combo",
-                       default_value="921600", width=100)
-        dpg.add_button(label="Actualiser", callback=_refresh_ports)
-        btn_conn = dpg.add_button(label="Connecter", tag="btn_connect",
-                                  callback=_do_connect)
-        dpg.bind_item_theme(btn_conn, _btn_theme(_t("btn_connect_bg"),
-                            _t("btn_connect_hv")))
-        dpg.add_button(label="Deconnecter", callback=_do_disconnect)
-        dpg.add_spacer(width=10)
-        ci = dpg.add_text("", tag="label_conn_info")
-        if font_mono:
-            dpg.bind_item_font(ci, font_mono)
-
-    dpg.add_separator()
-    dpg.add_spacer(height=2)
-
-    # ── Main content ─────────────────────────────────────────
-    with dpg.group(horizontal=True, tag="main_content"):
-
-        # ── LEFT PANEL ───────────────────────────────────────
-        with dpg.child_window(width=280, tag="left_panel", border=False):
-            with dpg.tab_bar():
-
-                # TAB: Capteurs
-                with dpg.tab(label="  Capteurs  "):
-                    t_cap = dpg.add_text("CAPTEURS")
-                    if font_header:
-                        dpg.bind_item_font(t_cap, font_header)
-                    dpg.bind_item_theme(t_cap, _txt_theme(_t("text_secondary")))
-                    dpg.add_spacer(height=4)
-
-                    for i in range(4):
+                    t_title = dpg.add_text("GraviCore", tag="title_text")
+                    if font_title:
+                        dpg.bind_item_font(t_title, font_title)
+                    dpg.add_spacer(width=10)
+                    with dpg.group():
+                        dpg.add_spacer(height=4)
+                        dpg.add_button(label="\u2600" if current_theme == "dark" else "\u263e",
+                                       tag="btn_theme", callback=_toggle_theme,
+                                       width=36, height=36)
+                dpg.add_spacer()
+                with dpg.group():
+                    dpg.add_spacer(height=7)
+                    with dpg.group(horizontal=True):
+                        t_freq = dpg.add_text("-- Hz", tag="label_freq")
+                        if font_small:
+                            dpg.bind_item_font(t_freq, font_small)
+                        with dpg.tooltip("label_freq"):
+                            dpg.add_text("Lecture serie : --", tag="label_ingest")
+                        dpg.add_spacer(width=15)
+                        t_status = dpg.add_text("DECONNECTE", tag="label_status")
+                        if font_small:
+                            dpg.bind_item_font(t_status, font_small)
+
+        dpg.add_separator()
+
+        # ── User / Platform bar ──────────────────────────────────
+        with dpg.group(horizontal=True):
+            dpg.add_text("UTILISATEUR")
+            dpg.add_combo([], tag="user_combo", width=160, callback=_on_user_change)
+            dpg.add_button(label="+ Ajouter", callback=_show_add_user)
+            dpg.add_button(label="Suppr.", callback=_show_del_user)
+            dpg.add_spacer(width=30)
+            dpg.add_text("PLATEFORME")
+            dpg.add_combo([], tag="plat_combo", width=200, callback=_on_plat_change)
+            dpg.add_button(label="+ Ajouter", callback=_show_add_plat)
+            dpg.add_button(label="Suppr.", callback=_show_del_plat)
+
+        dpg.add_separator()
+
+        # ── Connection bar ───────────────────────────────────────
+        with dpg.group(horizontal=True):
+            dpg.add_text("PORT")
+            dpg.add_combo([], tag="port_combo", width=380)
+            dpg.add_combo(["9600", "115200", "921600"], tag="baud_combo",
+                           default_value="921600", width=100)
+            dpg.add_button(label="Actualiser", callback=_refresh_ports)
+            btn_conn = dpg.add_button(label="Connecter", tag="btn_connect",
+                                      callback=_do_connect)
+            dpg.bind_item_theme(btn_conn, _btn_theme(_t("btn_connect_bg"),
+                                _t("btn_connect_hv")))
+            dpg.add_button(label="Deconnecter", callback=_do_disconnect)
+            dpg.add_spacer(width=10)
+            ci = dpg.add_text("", tag="label_conn_info")
+            if font_mono:
+                dpg.bind_item_font(ci, font_mono)
+
+        dpg.add_separator()
+        dpg.add_spacer(height=2)
+
+        # ── Main content ─────────────────────────────────────────
+        with dpg.group(horizontal=True, tag="main_content"):
+
+            # ── LEFT PANEL ───────────────────────────────────────
+            with dpg.child_window(width=280, tag="left_panel", border=False):
+                with dpg.tab_bar():
+
+                    # TAB: Capteurs
+                    with dpg.tab(label="  Capteurs  "):
+                        t_cap = dpg.add_text("CAPTEURS")
+                        if font_header:
+                            dpg.bind_item_font(t_cap, font_header)
+                        dpg.bind_item_theme(t_cap, _txt_theme(_t("text_secondary")))
+                        dpg.add_spacer(height=4)
+
+                        for i in range(4):
+                            with dpg.group(horizontal=True):
+                                sn = dpg.add_text(SENSOR_NAMES[i],
+                                                  tag=f"sensor_name_{i}")
+                                dpg.bind_item_theme(sn, _txt_theme(_sc(i)))
+                                dpg.add_spacer(width=20)
+                                wt = dpg.add_text("0.00 kg", tag=f"weight_{i}")
+                                if font_mono_large:
+                                    dpg.bind_item_font(wt, font_mono_large)
+                            bar = dpg.add_progress_bar(default_value=0,
+                                                       tag=f"bar_{i}", width=-1)
+                            dpg.bind_item_theme(bar, _bar_theme(_sc(i)))
+                            dpg.add_spacer(height=2)
+
+                        dpg.add_separator()
+                        dpg.add_spacer(height=4)
+
                         with dpg.group(horizontal=True):
-                            sn = dpg.add_text(SENSOR_NAMES[i],
-                                              tag=f"sensor_name_{i}")
-                            dpg.bind_item_theme(sn, _txt_theme(_sc(i)))
+                            tl = dpg.add_text("POIDS TOTAL")
+                            dpg.bind_item_theme(tl, _txt_theme(_t("text_secondary")))
                             dpg.add_spacer(width=20)
-                            wt = dpg.add_text("0.00 kg", tag=f"weight_{i}")
+                            tt = dpg.add_text("0.00 kg", tag="label_total")
                             if font_mono_large:
-                                dpg.bind_item_font(wt, font_mono_large)
-                        bar = dpg.add_progress_bar(default_value=0,
-                                                   tag=f"bar_{i}", width=-1)
-                        dpg.bind_item_theme(bar, _bar_theme(_sc(i)))
-                        dpg.add_spacer(height=2)
-
-                    dpg.add_separator()
-                    dpg.add_spacer(height=4)
-
-                    with dpg.group(horizontal=True):
-                        tl = dpg.add_text("POIDS TOTAL")
-                        dpg.bind_item_theme(tl, _txt_theme(_t("text_secondary")))
-                        dpg.add_spacer(width=20)
-                        tt = dpg.add_text("0.00 kg", tag="label_total")
-                        if font_mono_large:
-                            dpg.bind_item_font(tt, font_mono_large)
-                        dpg.bind_item_theme(tt, _txt_theme(_t("accent_blue")))
-
-                    dpg.add_spacer(height=6)
-                    btn_tare = dpg.add_button(label="TARE", callback=_send_tare,
-                                              width=-1, height=32)
-                    dpg.bind_item_theme(btn_tare, _btn_theme(_t("tare_bg"),
-                                        _t("tare_hover"), _t("text_primary")))
-
-                # TAB: Calibration
-                with dpg.tab(label="  Calibration  "):
-                    t_cal = dpg.add_text("CALIBRATION")
-                    if font_header:
-                        dpg.bind_item_font(t_cal, font_header)
-                    dpg.bind_item_theme(t_cal, _txt_theme(_t("text_secondary")))
-                    dpg.add_spacer(height=4)
+                                dpg.bind_item_font(tt, font_mono_large)
+                            dpg.bind_item_theme(tt, _txt_theme(_t("accent_blue")))
+
+                        dpg.add_spacer(height=6)
+                        btn_tare = dpg.add_button(label="TARE", callback=_send_tare,
+                                                  width=-1, height=32)
+                        dpg.bind_item_theme(btn_tare, _btn_theme(_t("tare_bg"),
+                                            _t("tare_hover"), _t("text_primary")))
+
+                    # TAB: Calibration
+                    with dpg.tab(label="  Calibration  "):
+                        t_cal = dpg.add_text("CALIBRATION")
+                        if font_header:
+                            dpg.bind_item_font(t_cal, font_header)
+                        dpg.bind_item_theme(t_cal, _txt_theme(_t("text_secondary")))
+                        dpg.add_spacer(height=4)
 
-                    with dpg.group(horizontal=True):
-                        dpg.add_text("Poids ref :")
-                        dpg.add_input_float(tag="entry_ref_weight",
-                                            default_value=1.0, width=80,
-                                            format="%.3f", step=0)
-                        dpg.add_text("kg")
-
-                    dpg.add_spacer(height=4)
-                    cl = dpg.add_text("-- en attente --", tag="label_cal_log",
-                                      wrap=240)
-                    if font_mono:
-                        dpg.bind_item_font(cl, font_mono)
-                    dpg.add_spacer(height=4)
-
-                    for i in range(4):
-                        b = dpg.add_button(label=f"CAL {i+1}  {SENSOR_NAMES[i]}",
-                                           tag=f"btn_cal_{i}",
-                                           callback=_make_cal_cb(i), width=-1)
-                        dpg.bind_item_theme(b, _btn_theme(_t("cal_bg"),
-                                            _t("cal_hover"), _sc(i)))
-                        dpg.add_spacer(height=2)
-
-                    dpg.add_spacer(height=4)
-                    dpg.add_button(label="Lire calibration ESP",
-                                   callback=_get_calib, width=-1)
-                    dpg.add_spacer(height=4)
-
-                    for i in range(4):
-                        cdl = dpg.add_text(f"C{i+1}: off=--  sc=--",
-                                           tag=f"calib_lbl_{i}")
+                        with dpg.group(horizontal=True):
+                            dpg.add_text("Poids ref :")
+                            dpg.add_input_float(tag="entry_ref_weight",
+                                                default_value=1.0, width=80,
+                                                format="%.3f", step=0)
+                            dpg.add_text("kg")
+
+                        dpg.add_spacer(height=4)
+                        cl = dpg.add_text("-- en attente --", tag="label_cal_log",
+                                          wrap=240)
                         if font_mono:
-                            dpg.bind_item_font(cdl, font_mono)
-                        dpg.bind_item_theme(cdl, _txt_theme(_sc(i)))
-
-                # TAB: Outils
-                with dpg.tab(label="  Outils  "):
-                    dpg.add_spacer(height=8)
-                    dpg.add_button(label="HISTORIQUE SESSIONS",
-                                   callback=_open_history, width=-1, height=35)
-                    dpg.add_spacer(height=4)
-                    dpg.add_button(label="DASHBOARD WEB : OFF",
-                                   tag="btn_dashboard",
-                                   callback=_toggle_dashboard, width=-1,
-                                   height=35)
-                    dpg.add_spacer(height=4)
-                    durl = dpg.add_text("", tag="lbl_dashboard_url")
+                            dpg.bind_item_font(cl, font_mono)
+                        dpg.add_spacer(height=4)
+
+                        for i in range(4):
+                            b = dpg.add_button(label=f"CAL {i+1}  {SENSOR_NAMES[i]}",
+                                               tag=f"btn_cal_{i}",
+                                               callback=_make_cal_cb(i), width=-1)
+                            dpg.bind_item_theme(b, _btn_theme(_t("cal_bg"),
+                                                _t("cal_hover"), _sc(i)))
+                            dpg.add_spacer(height=2)
+
+                        dpg.add_spacer(height=4)
+                        dpg.add_button(label="Lire calibration ESP",
+                                       callback=_get_calib, width=-1)
+                        dpg.add_spacer(height=4)
+
+                        for i in range(4):
+                            cdl = dpg.add_text(f"C{i+1}: off=--  sc=--",
+                                               tag=f"calib_lbl_{i}")
+                            if font_mono:
+                                dpg.bind_item_font(cdl, font_mono)
+                            dpg.bind_item_theme(cdl, _txt_theme(_sc(i)))
+
+                    # TAB: Outils
+                    with dpg.tab(label="  Outils  "):
+                        dpg.add_spacer(height=8)
+                        dpg.add_button(label="HISTORIQUE SESSIONS",
+                                       callback=_open_history, width=-1, height=35)
+                        dpg.add_spacer(height=4)
+                        dpg.add_button(label="DASHBOARD WEB : OFF",
+                                       tag="btn_dashboard",
+                                       callback=_toggle_dashboard, width=-1,
+                                       height=35)
+                        dpg.add_spacer(height=4)
+                        durl = dpg.add_text("", tag="lbl_dashboard_url")
+                        if font_mono:
+                            dpg.bind_item_font(durl, font_mono)
+
+            # ── RIGHT PANEL ──────────────────────────────────────
+            with dpg.child_window(tag="right_panel", border=False):
+                # Recording controls
+                with dpg.group(horizontal=True):
+                    btn_r = dpg.add_button(label="DEMARRER ENREGISTREMENT",
+                                           tag="btn_rec",
+                                           callback=_toggle_recording, height=32)
+                    dpg.bind_item_theme(btn_r, _btn_theme(_t("btn_connect_bg"),
+                                        _t("btn_connect_hv")))
+                    dpg.add_spacer(width=10)
+                    rt = dpg.add_text("", tag="lbl_rec_time")
                     if font_mono:
-                        dpg.bind_item_font(durl, font_mono)
-
-        # ── RIGHT PANEL ──────────────────────────────────────
-        with dpg.child_window(tag="right_panel", border=False):
-            # Recording controls
-            with dpg.group(horizontal=True):
-                btn_r = dpg.add_button(label="DEMARRER ENREGISTREMENT",
-                                       tag="btn_rec",
-                                       callback=_toggle_recording, height=32)
-                dpg.bind_item_theme(btn_r, _btn_theme(_t("btn_connect_bg"),
-                                    _t("btn_connect_hv")))
-                dpg.add_spacer(width=10)
-                rt = dpg.add_text("", tag="lbl_rec_time")
-                if font_mono:
-                    dpg.bind_item_font(rt, font_mono)
-                dpg.bind_item_theme(rt, _txt_theme(_t("accent_red")))
-                dpg.add_spacer(width=10)
-                dpg.add_text("", tag="lbl_rec_samples")
-
-            dpg.add_spacer(height=2)
-
-            # Visualisation header
-            with dpg.group(horizontal=True):
-                dpg.add_text("VISUALISATION")
-                dpg.add_spacer(width=10)
-                td = dpg.add_text(
-                    f"Planche {BOARD_WIDTH_MM}x{BOARD_HEIGHT_MM} mm")
-                dpg.bind_item_theme(td, _txt_theme(_t("text_dim")))
-                dpg.add_spacer(width=30)
-                tc = dpg.add_text("X: 0.0 mm  Y: 0.0 mm",
-                                  tag="label_coords")
-                dpg.bind_item_theme(tc, _txt_theme(_t("accent_teal")))
-                if font_coords:
-                    dpg.bind_item_font(tc, font_coords)
-
-            dpg.add_spacer(height=4)
-
-            # Drawlist (initial size, resized each frame)
-            dpg.add_drawlist(width=800, height=500, tag="board_drawlist")
-
-# ── Modal dialogs ────────────────────────────────────────────
-with dpg.window(modal=True, show=False, tag="add_user_modal",
-                label="Nouvel utilisateur", width=300, height=100,
-                no_resize=True):
-    dpg.add_input_text(tag="add_user_input", hint="Nom...", width=-1,
-                       on_enter=True, callback=_do_add_user)
-    with dpg.group(horizontal=True):
-        dpg.add_button(label="OK", callback=_do_add_user, width=120)
-        dpg.add_button(label="Annuler", width=120,
-                       callback=lambda s, a, u: dpg.configure_item(
-                           "add_user_modal", show=False))
-
-with dpg.window(modal=True, show=False, tag="add_plat_modal",
-                label="Nouvelle plateforme", width=300, height=100,
-                no_resize=True):
-    dpg.add_input_text(tag="add_plat_input", hint="Nom...", width=-1,
-                       on_enter=True, callback=_do_add_plat)
-    with dpg.group(horizontal=True):
-        dpg.add_button(label="OK", callback=_do_add_plat, width=120)
-        dpg.add_button(label="Annuler", width=120,
-                       callback=lambda s, a, u: dpg.configure_item(
-                           "add_plat_modal", show=False))
-
-with dpg.window(modal=True, show=False, tag="del_confirm_modal",
-                label="Confirmer suppression", width=350, height=120,
-                no_resize=True):
-    dpg.add_text("", tag="del_confirm_text", wrap=320)
-    dpg.add_spacer(height=8)
-    with dpg.group(horizontal=True):
-        dpg.add_button(label="Supprimer", tag="del_confirm_ok",
-                       callback=_do_delete_confirmed, width=140)
-        dpg.add_button(label="Annuler", width=140,
-                       callback=lambda s, a, u: dpg.configure_item(
-                           "del_confirm_modal", show=False))
+                        dpg.bind_item_font(rt, font_mono)
+                    dpg.bind_item_theme(rt, _txt_theme(_t("accent_red")))
+                    dpg.add_spacer(width=10)
+                    dpg.add_text("", tag="lbl_rec_samples")
+
+                dpg.add_spacer(height=2)
+
+                # Visualisation header
+                with dpg.group(horizontal=True):
+                    dpg.add_text("VISUALISATION")
+                    dpg.add_spacer(width=10)
+                    td = dpg.add_text(
+                        f"Planche {BOARD_WIDTH_MM}x{BOARD_HEIGHT_MM} mm")
+                    dpg.bind_item_theme(td, _txt_theme(_t("text_dim")))
+                    dpg.add_spacer(width=30)
+                    tc = dpg.add_text("X: 0.0 mm  Y: 0.0 mm",
+                                      tag="label_coords")
+                    dpg.bind_item_theme(tc, _txt_theme(_t("accent_teal")))
+                    if font_coords:
+                        dpg.bind_item_font(tc, font_coords)
+
+                dpg.add_spacer(height=4)
+
+                # Drawlist (initial size, resized each frame)
+                dpg.add_drawlist(width=800, height=500, tag="board_drawlist")
+
+    # ── Modal dialogs ────────────────────────────────────────────
+    with dpg.window(modal=True, show=False, tag="add_user_modal",
+                    label="Nouvel utilisateur", width=300, height=100,
+                    no_resize=True):
+        dpg.add_input_text(tag="add_user_input", hint="Nom...", width=-1,
+                           on_enter=True, callback=_do_add_user)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="OK", callback=_do_add_user, width=120)
+            dpg.add_button(label="Annuler", width=120,
+                           callback=lambda s, a, u: dpg.configure_item(
+                               "add_user_modal", show=False))
+
+    with dpg.window(modal=True, show=False, tag="add_plat_modal",
+                    label="Nouvelle plateforme", width=300, height=100,
+                    no_resize=True):
+        dpg.add_input_text(tag="add_plat_input", hint="Nom...", width=-1,
+                           on_enter=True, callback=_do_add_plat)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="OK", callback=_do_add_plat, width=120)
+            dpg.add_button(label="Annuler", width=120,
+                           callback=lambda s, a, u: dpg.configure_item(
+                               "add_plat_modal", show=False))
+
+    with dpg.window(modal=True, show=False, tag="del_confirm_modal",
+                    label="Confirmer suppression", width=350, height=120,
+                    no_resize=True):
+        dpg.add_text("", tag="del_confirm_text", wrap=320)
+        dpg.add_spacer(height=8)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Supprimer", tag="del_confirm_ok",
+                           callback=_do_delete_confirmed, width=140)
+            dpg.add_button(label="Annuler", width=140,
+                           callback=lambda s, a, u: dpg.configure_item(
+                               "del_confirm_modal", show=False))
+
+    _apply_accent_colors()
 
 # ============================================================
 # ACCENT COLOR APPLICATION
@@ -961,7 +997,6 @@ def _apply_accent_colors():
         dpg.bind_item_theme(f"btn_cal_{i}",
                             _btn_theme(_t("cal_bg"), _t("cal_hover"), _sc(i)))
 
-_apply_accent_colors()
 
 # ============================================================
 # BOARD DRAWING
@@ -1104,6 +1139,14 @@ def _update_board_size():
 # PROCESS RESPONSES
 # ============================================================
 def _process_responses():
+    global serial_conn
+    if _acq is not None:
+        status = _acq.poll_status()
+        if serial_conn is not None and not serial_conn.is_open:
+            dpg.set_value("label_conn_info", serial_conn.error or "Deconnecte")
+            serial_conn = None
+        with resp_lock:
+            response_queue.extend(status)
     with resp_lock:
         responses = list(response_queue)
         response_queue.clear()
@@ -1143,7 +1186,8 @@ def _frame_update():
     _process_responses()
     _update_board_size()
 
-    weight = list(raw_w)
+    last = samples.latest()
+    weight = list(last[1:]) if last else [0.0] * 4
     total  = sum(weight)
     total_gt = total >= 1000
 
@@ -1162,10 +1206,26 @@ def _frame_update():
     if _prev_total != total:
         _prev_total = total
         dpg.set_value("label_total", f"{total/1000:.2f} kg")
-    f_str = f"{freq:.0f} Hz"
+    f_str = f"{samples.rate():.0f} Hz"
     if f_str != _prev_freq_str:
         _prev_freq_str = f_str
         dpg.set_value("label_freq", f_str)
+        ing = _ingest
+        if ing is not None:
+            if ing.frames:
+                txt = (f"Lecture serie (binaire) : {ing.rate:.0f} trames/s, "
+                       f"capacite ~{ing.capacity:,.0f} trames/s\n"
+                       f"Echantillons perdus : {ing.dropped}, "
+                       f"trames CRC invalide : {ing.crc_errors}")
+            else:
+                txt = (f"Lecture serie (JSON) : {ing.rate:.0f} lignes/s, "
+                       f"capacite ~{ing.capacity:,.0f} lignes/s")
+            rec_ring = (_acq.stats.ring_dropped if _acq is not None else
+                        _ring_lost("enregistrement"))
+            txt += (f"\nAnneau depasse : {rec_ring} (enregistrement), "
+                    f"{_ring_lost('direct')} (direct) ; "
+                    f"non enregistres (session) : {recorder.dropped_samples}")
+            dpg.set_value("label_ingest", txt)
 
     # Center of mass
     b = _board
@@ -1174,8 +1234,7 @@ def _frame_update():
         x_mm, y_mm = 0.0, 0.0
         xr, yr = 0.0, 0.0
     else:
-        xr = (weight[0]+weight[2]-weight[1]-weight[3]) / total
-        yr = (weight[2]+weight[3]-weight[0]-weight[1]) / total
+        xr, yr = _com_ratio(weight)
         half_w = (b["right"] - b["left"]) / 2
         half_h = (b["bottom"] - b["top"]) / 2
         x_pos = max(b["left"], min(b["right"], b["cx"] + xr * half_w))
@@ -1185,16 +1244,15 @@ def _frame_update():
 
     dpg.set_value("label_coords", f"X: {x_mm:+.1f} mm   Y: {y_mm:+.1f} mm")
 
-    # Recording
+    # Recording status (samples are recorded by the serial thread)
     if recorder.is_recording:
-        t_ms = int((time.time() - recorder.start_time) * 1000)
-        recorder.record(t_ms, weight[0], weight[1], weight[2], weight[3],
-                        xr, yr)
         elapsed = recorder.elapsed
         mins = int(elapsed // 60)
         secs = elapsed % 60
         dpg.set_value("lbl_rec_time", f"{mins:02d}:{secs:05.2f}")
-        dpg.set_value("lbl_rec_samples", f"{recorder.sample_count} samples")
+        lost = recorder.dropped_samples
+        dpg.set_value("lbl_rec_samples", f"{recorder.sample_count} samples"
+                      + (f", {lost} perdus" if lost else ""))
 
     # Trail (pre-computed colors/sizes from _trail_colors/_trail_sizes)
     com_trail.append((x_pos, y_pos))
@@ -1226,7 +1284,7 @@ def _frame_update():
                            color=_t("com_color"))
 
     # Status
-    elapsed_t = time.time() - last_received
+    elapsed_t = time.time() - (last[0] if last else _t_boot)
     is_connected = False
     if serial_conn is None:
         st = ("DECONNECTE", "accent_red")
@@ -1255,46 +1313,93 @@ def _frame_update():
 # ============================================================
 # VIEWPORT + MAIN LOOP
 # ============================================================
-_icon_path = None
-for _p in ([os.path.join(getattr(sys, '_MEIPASS', ''), 'icon.ico')] if getattr(sys, 'frozen', False) else []) + \
-          [os.path.join(_app_dir(), 'icon.ico')]:
-    if os.path.isfile(_p):
-        _icon_path = _p
-        break
-
-dpg.create_viewport(title="Centre de Masse -- Plateforme de Force",
-                    width=1280, height=800,
-                    small_icon=_icon_path or "",
-                    large_icon=_icon_path or "")
-dpg.setup_dearpygui()
-dpg.show_viewport()
-dpg.set_primary_window("main_window", True)
-dpg.maximize_viewport()
-
-_refresh_users()
-_refresh_platforms()
-_refresh_ports()
-
-def _on_update_ready():
-    global _update_ready_flag
-    _update_ready_flag = True
-
-remote_sync.on_update_ready = _on_update_ready
-remote_sync.start()
-
-# Main render loop — runs at GPU vsync (60-144+ fps)
-while dpg.is_dearpygui_running():
-    _frame_update()
-    dpg.render_dearpygui_frame()
-
-# ── Clean shutdown ───────────────────────────────────────────
-if recorder.is_recording:
-    recorder.stop()
-if remote_sync.is_running:
-    remote_sync.stop()
-if serial_conn:
-    try:
-        serial_conn.close()
-    except Exception:
-        pass
-dpg.destroy_context()
+def main():
+    """Run the application. Everything with a side effect (database, GUI,
+    threads, acquisition process) starts here, never at import."""
+    global dpg, current_theme, samples, _settings, _filter, recorder, \
+        remote_sync, _acq, _ingest, _sink_thread
+    import dearpygui.dearpygui as dpg
+
+    _settings = _load_settings()
+    current_theme = _settings.get("theme", "dark")
+    if current_theme not in THEMES:
+        current_theme = "dark"
+    _refresh_theme_cache()
+    # Median + slew clamp per sensor (cm_settings.json: median_window, max_delta)
+    _filter = filters.MedianClamp(
+        window=_settings.get("median_window", filters.MEDIAN_WINDOW),
+        max_delta=_settings.get("max_delta", filters.MAX_DELTA))
+    db.init_db()
+    remote_sync = RemoteSync(server_url=_REMOTE_URL, api_key=_REMOTE_KEY,
+                             app_version=APP_VERSION)
+    _build_gui()
+
+    # Convert sessions recorded in the legacy row format, one per transaction
+    threading.Thread(target=db.migrate_samples_to_chunks, daemon=True).start()
+    if _settings.get("acquisition_process"):
+        # Serial reading + recording in their own process, samples through
+        # shared memory: their timing no longer depends on GUI / web load
+        _acq = acquisition.AcquisitionProcess(window=_filter.window,
+                                              max_delta=_filter.max_delta)
+        _acq.start()
+        samples, recorder, _ingest = _acq.samples, _acq.recorder, _acq.stats
+    else:
+        samples = ring_buffer.SampleRing()
+        recorder = SessionRecorder()
+        threading.Thread(target=_read_loop, daemon=True).start()
+    _sink_thread = threading.Thread(target=_sink_loop, args=(_acq is None,),
+                                    daemon=True)
+    _sink_thread.start()
+
+    _icon_path = None
+    for _p in ([os.path.join(getattr(sys, '_MEIPASS', ''), 'icon.ico')] if getattr(sys, 'frozen', False) else []) + \
+              [os.path.join(_app_dir(), 'icon.ico')]:
+        if os.path.isfile(_p):
+            _icon_path = _p
+            break
+
+    dpg.create_viewport(title="Centre de Masse -- Plateforme de Force",
+                        width=1280, height=800,
+                        small_icon=_icon_path or "",
+                        large_icon=_icon_path or "")
+    dpg.setup_dearpygui()
+    dpg.show_viewport()
+    dpg.set_primary_window("main_window", True)
+    dpg.maximize_viewport()
+
+    _refresh_users()
+    _refresh_platforms()
+    _refresh_ports()
+
+    def _on_update_ready():
+        global _update_ready_flag
+        _update_ready_flag = True
+
+    remote_sync.on_update_ready = _on_update_ready
+    remote_sync.start()
+
+    # Main render loop — runs at GPU vsync (60-144+ fps)
+    while dpg.is_dearpygui_running():
+        _frame_update()
+        dpg.render_dearpygui_frame()
+
+    # ── Clean shutdown ───────────────────────────────────────────
+    if recorder.is_recording:
+        recorder.stop()
+    if remote_sync.is_running:
+        remote_sync.stop()
+    if web_server_running:
+        from web_dashboard import stop_web_server
+        stop_web_server(grace=1.0)
+    if serial_conn:
+        release_port(serial_conn)
+    _sink_stop.set()
+    _sink_thread.join(1.0)
+    if _acq is not None:
+        _acq.close()
+    db.close_all()
+    dpg.destroy_context()
+
+
+if __name__ == "__main__":
+    main()
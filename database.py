@@ -5,8 +5,21 @@ import sqlite3
 import sys
 import os
 import time
+import math
+import zlib
+import struct
+import atexit
+import operator
+import threading
+from array import array
+from itertools import accumulate, chain, repeat
 from datetime import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def _app_dir():
     """Return the directory where the exe (or script) lives.
@@ -19,15 +32,96 @@ def _app_dir():
 
 _DB_PATH = os.path.join(_app_dir(), "cm_data.db")
 
+# Prepared statements kept per connection (sqlite3 LRU cache keyed on SQL)
+_STATEMENT_CACHE = 256
 
-def _connect():
-    conn = sqlite3.connect(_DB_PATH)
+
+# ── Connection manager ───────────────────────────────────────
+# One long-lived connection per thread, tuned once when opened.
+# Connections of finished threads are closed when the next one opens.
+
+_local = threading.local()
+_pool = {}                     # thread ident -> (thread, path, connection)
+_pool_lock = threading.Lock()
+_generation = 0                # bumped by close_all() to invalidate caches
+
+
+def _open(path):
+    # check_same_thread=False only so close_all() can close connections
+    # from the shutdown thread; each connection is used by a single thread.
+    conn = sqlite3.connect(path, check_same_thread=False,
+                           cached_statements=_STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")       # safe with WAL
     conn.execute("PRAGMA foreign_keys=ON")
-    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA cache_size=-16000")        # 16 MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")      # 256 MB memory map
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
 
+def _reap_locked():
+    """Close connections owned by threads that have exited."""
+    for ident, (thread, _path, conn) in list(_pool.items()):
+        if not thread.is_alive():
+            del _pool[ident]
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _connect():
+    """Return the calling thread's connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        if _local.path == _DB_PATH and _local.generation == _generation:
+            return conn
+        close_connection()
+    conn = _open(_DB_PATH)
+    _local.conn = conn
+    _local.path = _DB_PATH
+    _local.generation = _generation
+    with _pool_lock:
+        _reap_locked()
+        _pool[threading.get_ident()] = (threading.current_thread(),
+                                        _DB_PATH, conn)
+    return conn
+
+
+def close_connection():
+    """Close the calling thread's connection (worker threads on exit)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    with _pool_lock:
+        _pool.pop(threading.get_ident(), None)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def close_all():
+    """Close every pooled connection. Called at application shutdown."""
+    global _generation
+    with _pool_lock:
+        entries = list(_pool.values())
+        _pool.clear()
+        _generation += 1
+    for _thread, _path, conn in entries:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    _local.conn = None
+
+
+atexit.register(close_all)
+
+
 def init_db():
     """Create tables if they don't exist."""
     conn = _connect()
@@ -74,47 +168,257 @@ def init_db():
             ON samples(session_id, t_ms);
     """)
     conn.commit()
-    conn.close()
+    _migrate(conn)
+
+
+# ── Schema migrations ────────────────────────────────────────
+# PRAGMA user_version records the last applied step. Each step runs in
+# its own transaction together with the version bump.
+
+_STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS stats_totals (
+        id             INTEGER PRIMARY KEY CHECK (id = 1),
+        user_count     INTEGER NOT NULL DEFAULT 0,
+        platform_count INTEGER NOT NULL DEFAULT 0,
+        session_count  INTEGER NOT NULL DEFAULT 0,
+        sample_count   INTEGER NOT NULL DEFAULT 0,
+        duration_sec   REAL    NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_users (
+        user_id      INTEGER PRIMARY KEY,
+        sessions     INTEGER NOT NULL DEFAULT 0,
+        samples      INTEGER NOT NULL DEFAULT 0,
+        duration_sec REAL    NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_platforms (
+        platform_id  INTEGER PRIMARY KEY,
+        sessions     INTEGER NOT NULL DEFAULT 0,
+        samples      INTEGER NOT NULL DEFAULT 0,
+        duration_sec REAL    NOT NULL DEFAULT 0
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_sessions_started
+        ON sessions(started_at);
+
+    CREATE TRIGGER IF NOT EXISTS trg_users_ins AFTER INSERT ON users BEGIN
+        UPDATE stats_totals SET user_count = user_count + 1 WHERE id = 1;
+        INSERT OR IGNORE INTO stats_users (user_id) VALUES (NEW.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_users_del AFTER DELETE ON users BEGIN
+        UPDATE stats_totals SET user_count = user_count - 1 WHERE id = 1;
+        DELETE FROM stats_users WHERE user_id = OLD.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_platforms_ins AFTER INSERT ON platforms BEGIN
+        UPDATE stats_totals SET platform_count = platform_count + 1 WHERE id = 1;
+        INSERT OR IGNORE INTO stats_platforms (platform_id) VALUES (NEW.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_platforms_del AFTER DELETE ON platforms BEGIN
+        UPDATE stats_totals SET platform_count = platform_count - 1 WHERE id = 1;
+        DELETE FROM stats_platforms WHERE platform_id = OLD.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_ins AFTER INSERT ON sessions BEGIN
+        UPDATE stats_totals SET
+            session_count = session_count + 1,
+            sample_count  = sample_count + COALESCE(NEW.sample_count, 0),
+            duration_sec  = duration_sec + COALESCE(NEW.duration_sec, 0)
+        WHERE id = 1;
+        UPDATE stats_users SET
+            sessions     = sessions + 1,
+            samples      = samples + COALESCE(NEW.sample_count, 0),
+            duration_sec = duration_sec + COALESCE(NEW.duration_sec, 0)
+        WHERE user_id = NEW.user_id;
+        UPDATE stats_platforms SET
+            sessions     = sessions + 1,
+            samples      = samples + COALESCE(NEW.sample_count, 0),
+            duration_sec = duration_sec + COALESCE(NEW.duration_sec, 0)
+        WHERE platform_id = NEW.platform_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_del AFTER DELETE ON sessions BEGIN
+        UPDATE stats_totals SET
+            session_count = session_count - 1,
+            sample_count  = sample_count - COALESCE(OLD.sample_count, 0),
+            duration_sec  = duration_sec - COALESCE(OLD.duration_sec, 0)
+        WHERE id = 1;
+        UPDATE stats_users SET
+            sessions     = sessions - 1,
+            samples      = samples - COALESCE(OLD.sample_count, 0),
+            duration_sec = duration_sec - COALESCE(OLD.duration_sec, 0)
+        WHERE user_id = OLD.user_id;
+        UPDATE stats_platforms SET
+            sessions     = sessions - 1,
+            samples      = samples - COALESCE(OLD.sample_count, 0),
+            duration_sec = duration_sec - COALESCE(OLD.duration_sec, 0)
+        WHERE platform_id = OLD.platform_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_sessions_upd
+    AFTER UPDATE OF user_id, platform_id, sample_count, duration_sec ON sessions
+    BEGIN
+        UPDATE stats_totals SET
+            sample_count = sample_count - COALESCE(OLD.sample_count, 0)
+                                        + COALESCE(NEW.sample_count, 0),
+            duration_sec = duration_sec - COALESCE(OLD.duration_sec, 0)
+                                        + COALESCE(NEW.duration_sec, 0)
+        WHERE id = 1;
+        UPDATE stats_users SET
+            sessions     = sessions - 1,
+            samples      = samples - COALESCE(OLD.sample_count, 0),
+            duration_sec = duration_sec - COALESCE(OLD.duration_sec, 0)
+        WHERE user_id = OLD.user_id;
+        UPDATE stats_users SET
+            sessions     = sessions + 1,
+            samples      = samples + COALESCE(NEW.sample_count, 0),
+            duration_sec = duration_sec + COALESCE(NEW.duration_sec, 0)
+        WHERE user_id = NEW.user_id;
+        UPDATE stats_platforms SET
+            sessions     = sessions - 1,
+            samples      = samples - COALESCE(OLD.sample_count, 0),
+            duration_sec = duration_sec - COALESCE(OLD.duration_sec, 0)
+        WHERE platform_id = OLD.platform_id;
+        UPDATE stats_platforms SET
+            sessions     = sessions + 1,
+            samples      = samples + COALESCE(NEW.sample_count, 0),
+            duration_sec = duration_sec + COALESCE(NEW.duration_sec, 0)
+        WHERE platform_id = NEW.platform_id;
+    END;
+"""
+
+_STATS_REBUILD = """
+    DELETE FROM stats_totals;
+    DELETE FROM stats_users;
+    DELETE FROM stats_platforms;
+
+    INSERT INTO stats_totals
+        (id, user_count, platform_count, session_count, sample_count, duration_sec)
+    SELECT 1,
+           (SELECT COUNT(*) FROM users),
+           (SELECT COUNT(*) FROM platforms),
+           COUNT(*),
+           COALESCE(SUM(sample_count), 0),
+           COALESCE(SUM(duration_sec), 0)
+    FROM sessions;
+
+    INSERT INTO stats_users (user_id, sessions, samples, duration_sec)
+    SELECT u.id, COUNT(s.id),
+           COALESCE(SUM(s.sample_count), 0),
+           COALESCE(SUM(s.duration_sec), 0)
+    FROM users u LEFT JOIN sessions s ON s.user_id = u.id
+    GROUP BY u.id;
+
+    INSERT INTO stats_platforms (platform_id, sessions, samples, duration_sec)
+    SELECT p.id, COUNT(s.id),
+           COALESCE(SUM(s.sample_count), 0),
+           COALESCE(SUM(s.duration_sec), 0)
+    FROM platforms p LEFT JOIN sessions s ON s.platform_id = p.id
+    GROUP BY p.id;
+"""
+
+_CHUNKS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sample_chunks (
+        id         INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+        chunk_idx  INTEGER NOT NULL,
+        t_start    INTEGER NOT NULL,
+        t_end      INTEGER NOT NULL,
+        n          INTEGER NOT NULL,
+        data       BLOB    NOT NULL,
+        UNIQUE (session_id, chunk_idx)
+    );
+"""
+
+_OVERVIEW_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sample_overview (
+        session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+        level      INTEGER NOT NULL,
+        part       INTEGER NOT NULL,
+        t_start    INTEGER NOT NULL,
+        t_end      INTEGER NOT NULL,
+        n          INTEGER NOT NULL,
+        data       BLOB    NOT NULL,
+        PRIMARY KEY (session_id, level, part)
+    );
+"""
+
+_SESSION_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_sessions_user_started
+        ON sessions(user_id, started_at);
+    CREATE INDEX IF NOT EXISTS idx_sessions_platform_started
+        ON sessions(platform_id, started_at);
+"""
+
+# Sessions never finalized (recording, crash) had sample_count 0 until
+# insert_samples kept it up to date: count what they have stored
+_UNFINALIZED_COUNTS = """
+    UPDATE sessions SET sample_count =
+        (SELECT COUNT(*) FROM samples WHERE session_id = sessions.id)
+        + (SELECT COALESCE(SUM(n), 0) FROM sample_chunks
+           WHERE session_id = sessions.id)
+    WHERE ended_at IS NULL;
+"""
+
+_MIGRATIONS = [
+    (1, _STATS_SCHEMA + _STATS_REBUILD),   # incremental stats rollups
+    (2, _CHUNKS_SCHEMA),                   # columnar sample chunks
+    (3, _OVERVIEW_SCHEMA),                 # downsample pyramid
+    (4, _SESSION_INDEXES),                 # filtered, paginated listing
+    (5, _UNFINALIZED_COUNTS),              # running sample counts
+]
+
+
+def _migrate(conn):
+    """Apply pending schema steps (cheap no-op once up to date)."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, script in _MIGRATIONS:
+        if version < target:
+            conn.executescript(
+                f"BEGIN; {script} PRAGMA user_version={target}; COMMIT;")
+            version = target
+
+
+def rebuild_stats():
+    """Recompute the stats rollups from the sessions table (repair tool;
+    triggers keep them up to date during normal operation)."""
+    conn = _connect()
+    conn.executescript(f"BEGIN; {_STATS_REBUILD} COMMIT;")
 
 
 # ── Users ────────────────────────────────────────────────────
 
 def add_user(name: str) -> int:
     conn = _connect()
-    try:
+    with conn:
         c = conn.execute("INSERT INTO users (name) VALUES (?)", (name,))
-        conn.commit()
-        return c.lastrowid
-    finally:
-        conn.close()
+    return c.lastrowid
 
 
 def list_users() -> list:
     conn = _connect()
     rows = conn.execute("SELECT id, name FROM users ORDER BY name").fetchall()
-    conn.close()
     return [(r["id"], r["name"]) for r in rows]
 
 
 def delete_user(user_id: int):
     conn = _connect()
-    conn.execute("DELETE FROM users WHERE id=?", (user_id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM users WHERE id=?", (user_id,))
 
 
 # ── Platforms ────────────────────────────────────────────────
 
 def add_platform(name: str, width_cm: float = 50, height_cm: float = 30) -> int:
     conn = _connect()
-    try:
+    with conn:
         c = conn.execute(
             "INSERT INTO platforms (name, board_width_cm, board_height_cm) VALUES (?,?,?)",
             (name, width_cm, height_cm))
-        conn.commit()
-        return c.lastrowid
-    finally:
-        conn.close()
+    return c.lastrowid
 
 
 def list_platforms() -> list:
@@ -122,58 +426,53 @@ def list_platforms() -> list:
     rows = conn.execute(
         "SELECT id, name, board_width_cm, board_height_cm FROM platforms ORDER BY name"
     ).fetchall()
-    conn.close()
     return [(r["id"], r["name"], r["board_width_cm"], r["board_height_cm"]) for r in rows]
 
 
 def delete_platform(platform_id: int):
     conn = _connect()
-    conn.execute("DELETE FROM platforms WHERE id=?", (platform_id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM platforms WHERE id=?", (platform_id,))
 
 
 # ── Statistics (for remote monitoring) ───────────────────────
 
 def get_stats() -> dict:
-    """Return aggregate stats for remote monitoring."""
+    """Return aggregate stats for remote monitoring.
+    Reads the trigger-maintained rollups: cost does not grow with the
+    number of recorded samples. Sample counts include sessions still
+    being recorded (kept up to date by insert_samples); durations come
+    from finalized sessions (set by end_session)."""
     conn = _connect()
-    user_count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-    plat_count = conn.execute("SELECT COUNT(*) FROM platforms").fetchone()[0]
-    session_count = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
-    sample_count = conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
-
-    # Total recording duration
-    row = conn.execute(
-        "SELECT COALESCE(SUM(duration_sec),0) AS total_dur FROM sessions"
-    ).fetchone()
-    total_duration = row[0]
+    totals = conn.execute("""
+        SELECT user_count, platform_count, session_count,
+               sample_count, duration_sec
+        FROM stats_totals WHERE id = 1
+    """).fetchone()
+    if totals is None:
+        totals = (0, 0, 0, 0, 0.0)
 
     # Sessions per user
     rows = conn.execute("""
-        SELECT u.name, COUNT(s.id) AS cnt,
-               COALESCE(SUM(s.sample_count),0) AS samples,
-               COALESCE(SUM(s.duration_sec),0) AS dur
-        FROM users u
-        LEFT JOIN sessions s ON s.user_id = u.id
-        GROUP BY u.id ORDER BY cnt DESC
+        SELECT u.name, su.sessions, su.samples, su.duration_sec
+        FROM stats_users su
+        JOIN users u ON u.id = su.user_id
+        ORDER BY su.sessions DESC
     """).fetchall()
     users_detail = [{"name": r[0], "sessions": r[1],
                      "samples": r[2], "duration_sec": r[3]} for r in rows]
 
     # Sessions per platform
     rows = conn.execute("""
-        SELECT p.name, COUNT(s.id) AS cnt,
-               COALESCE(SUM(s.sample_count),0) AS samples,
-               COALESCE(SUM(s.duration_sec),0) AS dur
-        FROM platforms p
-        LEFT JOIN sessions s ON s.platform_id = p.id
-        GROUP BY p.id ORDER BY cnt DESC
+        SELECT p.name, sp.sessions, sp.samples, sp.duration_sec
+        FROM stats_platforms sp
+        JOIN platforms p ON p.id = sp.platform_id
+        ORDER BY sp.sessions DESC
     """).fetchall()
     platforms_detail = [{"name": r[0], "sessions": r[1],
                          "samples": r[2], "duration_sec": r[3]} for r in rows]
 
-    # Last 10 sessions
+    # Last 10 sessions (idx_sessions_started)
     rows = conn.execute("""
         SELECT s.id, s.started_at, s.duration_sec, s.sample_count,
                u.name AS user_name, p.name AS platform_name
@@ -184,13 +483,12 @@ def get_stats() -> dict:
     """).fetchall()
     recent = [dict(r) for r in rows]
 
-    conn.close()
     return {
-        "user_count": user_count,
-        "platform_count": plat_count,
-        "session_count": session_count,
-        "sample_count": sample_count,
-        "total_duration_sec": total_duration,
+        "user_count": totals[0],
+        "platform_count": totals[1],
+        "session_count": totals[2],
+        "sample_count": totals[3],
+        "total_duration_sec": totals[4],
         "users": users_detail,
         "platforms": platforms_detail,
         "recent_sessions": recent,
@@ -202,13 +500,11 @@ def get_stats() -> dict:
 def start_session(user_id: int, platform_id: int) -> int:
     conn = _connect()
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c = conn.execute(
-        "INSERT INTO sessions (user_id, platform_id, started_at) VALUES (?,?,?)",
-        (user_id, platform_id, now))
-    conn.commit()
-    sid = c.lastrowid
-    conn.close()
-    return sid
+    with conn:
+        c = conn.execute(
+            "INSERT INTO sessions (user_id, platform_id, started_at) VALUES (?,?,?)",
+            (user_id, platform_id, now))
+    return c.lastrowid
 
 
 def end_session(session_id: int, sample_count: int):
@@ -224,11 +520,10 @@ def end_session(session_id: int, sample_count: int):
             duration = (datetime.now() - t0).total_seconds()
         except Exception:
             pass
-    conn.execute(
-        "UPDATE sessions SET ended_at=?, duration_sec=?, sample_count=? WHERE id=?",
-        (now, duration, sample_count, session_id))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "UPDATE sessions SET ended_at=?, duration_sec=?, sample_count=? WHERE id=?",
+            (now, duration, sample_count, session_id))
 
 
 def get_session(session_id: int) -> dict:
@@ -240,56 +535,364 @@ def get_session(session_id: int) -> dict:
         LEFT JOIN platforms p ON s.platform_id = p.id
         WHERE s.id=?
     """, (session_id,)).fetchone()
-    conn.close()
     if row is None:
         return None
     return dict(row)
 
 
-def list_sessions(platform_id: int = None, user_id: int = None) -> list:
-    conn = _connect()
-    query = """
+_SESSION_COLUMNS = """
         SELECT s.id, s.started_at, s.ended_at, s.duration_sec, s.sample_count,
                s.notes, u.name AS user_name, p.name AS platform_name
         FROM sessions s
         LEFT JOIN users u ON s.user_id = u.id
         LEFT JOIN platforms p ON s.platform_id = p.id
-        WHERE 1=1
-    """
+"""
+
+SESSION_PAGE = 100  # default page size of list_sessions_page
+
+
+def _session_filter(platform_id, user_id, date_from, date_to):
+    """WHERE clause (and its parameters) shared by the session listings."""
+    where = ["1=1"]
     params = []
     if platform_id is not None:
-        query += " AND s.platform_id=?"
+        where.append("s.platform_id=?")
         params.append(platform_id)
     if user_id is not None:
-        query += " AND s.user_id=?"
+        where.append("s.user_id=?")
         params.append(user_id)
-    query += " ORDER BY s.started_at DESC"
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
+    if date_from:
+        where.append("s.started_at >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("s.started_at < date(?, '+1 day')")
+        params.append(date_to)
+    return " AND ".join(where), params
+
+
+def list_sessions(platform_id: int = None, user_id: int = None,
+                  date_from: str = None, date_to: str = None) -> list:
+    """Sessions, newest first. date_from / date_to ("YYYY-MM-DD",
+    inclusive) filter on the start date."""
+    conn = _connect()
+    where, params = _session_filter(platform_id, user_id, date_from, date_to)
+    rows = conn.execute(
+        f"{_SESSION_COLUMNS} WHERE {where} ORDER BY s.started_at DESC",
+        params).fetchall()
     return [dict(r) for r in rows]
 
 
+def list_sessions_page(platform_id: int = None, user_id: int = None,
+                       date_from: str = None, date_to: str = None,
+                       limit: int = SESSION_PAGE, cursor: str = None,
+                       order: str = "desc") -> tuple:
+    """One page of sessions, same filters as list_sessions, sorted by
+    (started_at, id) in `order` ("desc": newest first, or "asc").
+    Returns (rows, next_cursor): pass next_cursor back as `cursor` for
+    the following page; None on the last page. Keyset pagination: every
+    page costs the same whatever its position. Raises ValueError on a
+    malformed cursor or order."""
+    if order not in ("asc", "desc"):
+        raise ValueError(f"bad order: {order!r}")
+    where, params = _session_filter(platform_id, user_id, date_from, date_to)
+    if cursor:
+        started_at, sep, last_id = cursor.rpartition("|")
+        if not sep or not last_id.isdigit():
+            raise ValueError(f"bad cursor: {cursor!r}")
+        where += f" AND (s.started_at, s.id) {'<' if order == 'desc' else '>'} (?, ?)"
+        params += [started_at, int(last_id)]
+    direction = order.upper()
+    conn = _connect()
+    rows = conn.execute(
+        f"{_SESSION_COLUMNS} WHERE {where}"
+        f" ORDER BY s.started_at {direction}, s.id {direction} LIMIT ?",
+        params + [limit + 1]).fetchall()
+    rows = [dict(r) for r in rows]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1]['started_at']}|{rows[-1]['id']}"
+    return rows, next_cursor
+
+
+def count_sessions(platform_id: int = None, user_id: int = None,
+                   date_from: str = None, date_to: str = None) -> int:
+    """Number of sessions matching the list_sessions filters."""
+    where, params = _session_filter(platform_id, user_id, date_from, date_to)
+    return _connect().execute(
+        f"SELECT COUNT(*) FROM sessions s WHERE {where}", params).fetchone()[0]
+
+
 def delete_session(session_id: int):
     conn = _connect()
-    conn.execute("DELETE FROM samples WHERE session_id=?", (session_id,))
-    conn.execute("DELETE FROM sessions WHERE id=?", (session_id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM samples WHERE session_id=?", (session_id,))
+        conn.execute("DELETE FROM sample_chunks WHERE session_id=?", (session_id,))
+        conn.execute("DELETE FROM sample_overview WHERE session_id=?", (session_id,))
+        conn.execute("DELETE FROM sessions WHERE id=?", (session_id,))
 
 
-# ── Samples ──────────────────────────────────────────────────
+# ── Sample storage ───────────────────────────────────────
+# Two engines share the public API below:
+#   "chunks" (default) — fixed-size chunks of CHUNK_SIZE samples per
+#            session, each one zlib-compressed blob of encoded columns;
+#   "rows"   — legacy table with one row per sample.
+# Reads always merge both, so databases written by older versions keep
+# working; migrate_samples_to_chunks() converts them.
+#
+# Chunk blob = header (format, n, one encoding per column) + zlib body.
+# Columns are 8-byte little-endian words whose bytes are shuffled (all
+# byte 0s, then all byte 1s, ...) so slowly varying values compress well:
+#   _ENC_INT    integer values, delta from the previous value
+#   _ENC_CENTI  values with at most 2 decimals (the board sends grams with
+#               2 decimals), stored as hundredths, delta from the previous
+#   _ENC_FLOAT  float64, IEEE bits XORed with the previous value
+#   _ENC_COM    com_x/com_y, IEEE bits XORed with the ratio derived from
+#               the weights (same formula as the acquisition loop), so the
+#               column is almost all zeros whenever they agree
+# A column holding NULLs (nullable legacy REAL columns) is stored as
+# _ENC_FLOAT or _ENC_COM with the _ENC_NULLS flag, each NULL as the NaN
+# _NULL_BITS (None again from get_samples, NaN in get_samples_array).
+# Every encoding is lossless.
+
+SAMPLE_STORAGE = "chunks"
+CHUNK_SIZE = 1024
+
+_CHUNK_FORMAT = 1
+_CHUNK_HEADER = struct.Struct("<BI7B")
+_ENC_INT, _ENC_CENTI, _ENC_FLOAT, _ENC_COM = 0, 1, 2, 3
+_ENC_NULLS = 0x80                   # flag: column has NULLs
+_NULL_BITS = 0x7FF8_0000_4E55_4C4C  # quiet NaN, payload "NULL"
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _derived_coms(w0, w1, w2, w3):
+    """CoM ratios derived from weight columns, with the operation order of
+    the acquisition loop: (w0 + w2 - w1 - w3) / total and
+    (w2 + w3 - w0 - w1) / total, or 0 below 1 kg.
+    Returns (com_x list, com_y list)."""
+    cols = list(zip(w0, w1, w2, w3))
+    totals = [a + b + c + d for a, b, c, d in cols]
+    xs = [0.0 if t < 1000 else (a + c - b - d) / t
+          for (a, b, c, d), t in zip(cols, totals)]
+    ys = [0.0 if t < 1000 else (c + d - a - b) / t
+          for (a, b, c, d), t in zip(cols, totals)]
+    return xs, ys
+
+
+def _int_words(values):
+    """Values as exact integers, or None if any is not one."""
+    try:
+        ints = list(map(int, values))
+        if (max(map(abs, ints), default=0) < 2 ** 53
+                and _float_bits(ints) == _float_bits(values)):
+            return ints
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return None
+
+
+def _centi_words(values):
+    """Values as exact hundredths, or None if any does not round-trip."""
+    try:
+        cents = list(map(round, map(operator.mul, values, repeat(100))))
+        back = list(map(operator.truediv, cents, repeat(100)))
+        if (max(map(abs, cents), default=0) < 2 ** 53
+                and _float_bits(back) == _float_bits(values)):
+            return cents
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return None
+
+
+def _float_bits(values) -> array:
+    bits = array("q")
+    bits.frombytes(array("d", values).tobytes())
+    return bits
+
+
+def _null_bits(values) -> array:
+    """_float_bits() of a column with None values (as _NULL_BITS)."""
+    bits = _float_bits([0.0 if v is None else v for v in values])
+    for i, v in enumerate(values):
+        if v is None:
+            bits[i] = _NULL_BITS
+    return bits
+
+
+def _nulls_to_zero(values) -> list:
+    """Weights as the CoM prediction sees them (NULL counts as 0)."""
+    return [0.0 if v is None else v for v in values]
+
+
+def _bits_to_floats(bits) -> array:
+    out = array("d")
+    out.frombytes(array("q", bits).tobytes())
+    return out
+
+
+def _shuffle(words) -> bytes:
+    words = array("q", words)
+    if not _LITTLE_ENDIAN:
+        words.byteswap()
+    raw = words.tobytes()
+    return b"".join(raw[i::8] for i in range(8))
+
+
+def _unshuffle(buf, n) -> array:
+    raw = bytearray(8 * n)
+    for i in range(8):
+        raw[i::8] = buf[i * n:(i + 1) * n]
+    words = array("q")
+    words.frombytes(raw)
+    if not _LITTLE_ENDIAN:
+        words.byteswap()
+    return words
+
+
+def _delta(ints):
+    return [b - a for a, b in zip(chain((0,), ints), ints)]
+
+
+def _encode_chunk(rows) -> bytes:
+    """Encode a list of (t_ms, w0, w1, w2, w3, com_x, com_y) tuples."""
+    cols = list(zip(*rows))
+    nulls = {j for j in range(1, 7) if None in cols[j]}
+    encs = []
+    parts = []
+    for j in range(5):
+        ints = _int_words(cols[j])
+        if ints is not None:
+            encs.append(_ENC_INT)
+            parts.append(_shuffle(_delta(ints)))
+            continue
+        if j == 0:
+            raise ValueError("t_ms must be integers")
+        centi = _centi_words(cols[j])
+        if centi is not None:
+            encs.append(_ENC_CENTI)
+            parts.append(_shuffle(_delta(centi)))
+            continue
+        if j in nulls:
+            encs.append(_ENC_FLOAT | _ENC_NULLS)
+            bits = _null_bits(cols[j])
+        else:
+            encs.append(_ENC_FLOAT)
+            bits = _float_bits(cols[j])
+        parts.append(_shuffle([b ^ a for a, b in zip(chain((0,), bits), bits)]))
+    derived = _derived_coms(*[list(map(float, _nulls_to_zero(c)))
+                              for c in cols[1:5]])
+    for j in (5, 6):
+        if j in nulls:
+            encs.append(_ENC_COM | _ENC_NULLS)
+            bits = _null_bits(cols[j])
+        else:
+            encs.append(_ENC_COM)
+            bits = _float_bits(cols[j])
+        parts.append(_shuffle(map(operator.xor, bits,
+                                  _float_bits(derived[j - 5]))))
+    return (_CHUNK_HEADER.pack(_CHUNK_FORMAT, len(rows), *encs)
+            + zlib.compress(b"".join(parts), 6))
+
+
+def _chunk_body(blob):
+    """Validate a chunk header. Returns (n, encodings, decompressed body)."""
+    fmt, n, *encs = _CHUNK_HEADER.unpack_from(blob)
+    if fmt != _CHUNK_FORMAT:
+        raise ValueError(f"unsupported sample chunk format {fmt}")
+    if n == 0:
+        return 0, encs, b""
+    return n, encs, zlib.decompress(memoryview(blob)[_CHUNK_HEADER.size:])
+
+
+def _decode_chunk(blob) -> list:
+    """Decode a chunk blob back into a list of sample tuples."""
+    n, encs, body = _chunk_body(blob)
+    if n == 0:
+        return []
+    cols = []
+    nulls = False
+    for j, enc in enumerate(encs):
+        words = _unshuffle(body[j * 8 * n:(j + 1) * 8 * n], n)
+        has_nulls = enc & _ENC_NULLS
+        nulls = nulls or has_nulls
+        enc &= ~_ENC_NULLS
+        if enc == _ENC_INT:
+            col = list(accumulate(words))
+            if j:
+                col = list(map(float, col))
+        elif enc == _ENC_CENTI:
+            col = list(map(operator.truediv, accumulate(words), repeat(100)))
+        elif enc == _ENC_FLOAT:
+            bits = array("q", accumulate(words, operator.xor))
+            col = _bits_to_floats(bits)
+        else:
+            if j == 5:
+                weights = cols[1:5]
+                if nulls:
+                    weights = map(_nulls_to_zero, weights)
+                derived = _derived_coms(*weights)
+            bits = array("q", map(operator.xor, words,
+                                  _float_bits(derived[j - 5])))
+            col = _bits_to_floats(bits)
+        if has_nulls:
+            col = [None if b == _NULL_BITS else v for b, v in zip(bits, col)]
+        cols.append(col)
+    return list(zip(*cols))
+
+
+def _write_chunks(conn, session_id: int, rows: list, first_idx: int):
+    """Store rows as consecutive chunks starting at chunk_idx first_idx
+    (caller handles the transaction)."""
+    params = []
+    idx = first_idx
+    for off in range(0, len(rows), CHUNK_SIZE):
+        part = rows[off:off + CHUNK_SIZE]
+        times = [r[0] for r in part]
+        params.append((session_id, idx, min(times), max(times), len(part),
+                       _encode_chunk(part)))
+        idx += 1
+    conn.executemany(
+        "INSERT OR REPLACE INTO sample_chunks "
+        "(session_id, chunk_idx, t_start, t_end, n, data) VALUES (?,?,?,?,?,?)",
+        params)
+
+
+def _append_chunks(conn, session_id: int, data: list):
+    """Append samples to a session, refilling its last partial chunk."""
+    last = conn.execute(
+        "SELECT chunk_idx, n, data FROM sample_chunks WHERE session_id=? "
+        "ORDER BY chunk_idx DESC LIMIT 1", (session_id,)).fetchone()
+    rows = [tuple(r) for r in data]
+    first_idx = 0
+    if last is not None:
+        if last["n"] < CHUNK_SIZE:
+            rows = _decode_chunk(last["data"]) + rows
+            first_idx = last["chunk_idx"]
+        else:
+            first_idx = last["chunk_idx"] + 1
+    _write_chunks(conn, session_id, rows, first_idx)
+
 
 def insert_samples(session_id: int, data: list):
     """Bulk insert samples. data = list of (t_ms, w0, w1, w2, w3, com_x, com_y)."""
     if not data:
         return
     conn = _connect()
-    conn.executemany(
-        "INSERT INTO samples (session_id, t_ms, w0, w1, w2, w3, com_x, com_y) "
-        "VALUES (?,?,?,?,?,?,?,?)",
-        [(session_id, *row) for row in data])
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM sample_overview WHERE session_id=?", (session_id,))
+        if SAMPLE_STORAGE == "chunks":
+            _append_chunks(conn, session_id, data)
+        else:
+            conn.executemany(
+                "INSERT INTO samples (session_id, t_ms, w0, w1, w2, w3, com_x, com_y) "
+                "VALUES (?,?,?,?,?,?,?,?)",
+                [(session_id, *row) for row in data])
+        # Running count (stats rollups follow through the triggers), so an
+        # unfinished or never finalized session is counted too
+        conn.execute(
+            "UPDATE sessions SET sample_count = COALESCE(sample_count, 0) + ? "
+            "WHERE id=?", (len(data), session_id))
 
 
 def get_samples(session_id: int) -> list:
@@ -299,19 +902,399 @@ def get_samples(session_id: int) -> list:
         "SELECT t_ms, w0, w1, w2, w3, com_x, com_y "
         "FROM samples WHERE session_id=? ORDER BY t_ms",
         (session_id,)).fetchall()
-    conn.close()
-    return [tuple(r) for r in rows]
+    legacy = [tuple(r) for r in rows]
+    chunked = []
+    for (blob,) in conn.execute(
+            "SELECT data FROM sample_chunks WHERE session_id=? ORDER BY chunk_idx",
+            (session_id,)):
+        chunked.extend(_decode_chunk(blob))
+    if legacy and chunked:
+        return sorted(legacy + chunked, key=lambda r: r[0])
+    return chunked or legacy
 
 
 def get_sample_count(session_id: int) -> int:
     conn = _connect()
     row = conn.execute(
-        "SELECT COUNT(*) AS cnt FROM samples WHERE session_id=?",
-        (session_id,)).fetchone()
-    conn.close()
+        "SELECT (SELECT COUNT(*) FROM samples WHERE session_id=?) + "
+        "(SELECT COALESCE(SUM(n), 0) FROM sample_chunks WHERE session_id=?) AS cnt",
+        (session_id, session_id)).fetchone()
     return row["cnt"] if row else 0
 
 
+# ── NumPy access ─────────────────────────────────────────────
+# Optional: numpy is only needed by callers of get_samples_array().
+# Chunks are decoded column-wise with vectorised cumsum / XOR-accumulate,
+# without building per-sample Python tuples.
+
+SAMPLE_DTYPE = [("t_ms", "<i8"), ("w0", "<f8"), ("w1", "<f8"), ("w2", "<f8"),
+                ("w3", "<f8"), ("com_x", "<f8"), ("com_y", "<f8")]
+
+
+def _np_derived_coms(w0, w1, w2, w3):
+    """Vectorised _derived_coms (same operation order, bit-identical)."""
+    total = w0 + w1 + w2 + w3
+    low = total < 1000
+    safe = np.where(low, 1.0, total)
+    xs = np.where(low, 0.0, (w0 + w2 - w1 - w3) / safe)
+    ys = np.where(low, 0.0, (w2 + w3 - w0 - w1) / safe)
+    return xs, ys
+
+
+def _decode_chunk_np(blob, out):
+    """Decode a chunk blob into the structured array slice `out`."""
+    n, encs, body = _chunk_body(blob)
+    if n == 0:
+        return
+    # (column, byte plane, sample) -> (column, sample, byte) -> int64 words
+    planes = np.frombuffer(body, dtype=np.uint8).reshape(len(encs), 8, n)
+    words = np.ascontiguousarray(planes.transpose(0, 2, 1)).view("<i8")
+    words = words.reshape(len(encs), n)
+    names = out.dtype.names
+    null_masks = {}  # weight column -> where it holds a NULL
+    for j, enc in enumerate(encs):
+        col = out[names[j]]
+        has_nulls = enc & _ENC_NULLS
+        enc &= ~_ENC_NULLS
+        if enc == _ENC_INT:
+            col[:] = np.cumsum(words[j])
+        elif enc == _ENC_CENTI:
+            col[:] = np.cumsum(words[j]) / 100
+        elif enc == _ENC_FLOAT:
+            bits = np.bitwise_xor.accumulate(words[j])
+            col[:] = bits.view("<f8")  # a NULL reads as NaN
+            if has_nulls:
+                null_masks[j] = bits == _NULL_BITS
+        else:
+            if j == 5:
+                weights = [out[names[k]] for k in range(1, 5)]
+                for k, mask in null_masks.items():
+                    weights[k - 1] = np.where(mask, 0.0, weights[k - 1])
+                derived = _np_derived_coms(*weights)
+            col[:] = (words[j] ^ derived[j - 5].view("<i8")).view("<f8")
+
+
+def get_samples_array(session_id: int, t_start: int = None, t_end: int = None):
+    """Samples of a session as a NumPy structured array (SAMPLE_DTYPE),
+    sorted by time, optionally limited to t_start <= t_ms <= t_end.
+    Columns are accessible by name: arr["t_ms"], arr["com_x"], ...
+    Raises RuntimeError if numpy is not installed."""
+    if np is None:
+        raise RuntimeError("numpy is required: pip install numpy")
+    lo, hi = _time_bounds(t_start, t_end)
+    conn = _connect()
+    chunks = conn.execute(
+        "SELECT n, data FROM sample_chunks WHERE session_id=? "
+        "AND t_end >= ? AND t_start <= ? ORDER BY chunk_idx",
+        (session_id, lo, hi)).fetchall()
+    arr = np.empty(sum(c["n"] for c in chunks), dtype=SAMPLE_DTYPE)
+    pos = 0
+    for c in chunks:
+        _decode_chunk_np(c["data"], arr[pos:pos + c["n"]])
+        pos += c["n"]
+    legacy = conn.execute(
+        "SELECT t_ms, w0, w1, w2, w3, com_x, com_y FROM samples "
+        "WHERE session_id=? AND t_ms BETWEEN ? AND ? ORDER BY t_ms, id",
+        (session_id, lo, hi)).fetchall()
+    if legacy:
+        old = np.array([tuple(r) for r in legacy], dtype=SAMPLE_DTYPE)
+        arr = np.concatenate([old, arr]) if len(arr) else old
+        if pos:
+            arr = arr[np.argsort(arr["t_ms"], kind="stable")]
+    if t_start is not None or t_end is not None:
+        arr = arr[(arr["t_ms"] >= lo) & (arr["t_ms"] <= hi)]
+    return arr
+
+
+# ── Streaming reads ──────────────────────────────────────────
+# Keyset pagination: every batch is a fresh query resuming after the last
+# (t_ms, id) row or chunk_idx seen, so no cursor stays open between
+# batches and memory stays bounded whatever the session length.
+
+SAMPLE_BATCH = 4096
+
+_NO_LIMIT = 2 ** 62
+
+
+def _time_bounds(t_start, t_end):
+    lo = -_NO_LIMIT if t_start is None else int(t_start)
+    hi = _NO_LIMIT if t_end is None else int(t_end)
+    return lo, hi
+
+
+def count_samples(session_id: int, t_start: int = None, t_end: int = None) -> int:
+    """Number of samples with t_start <= t_ms <= t_end (bounds optional)."""
+    if t_start is None and t_end is None:
+        return get_sample_count(session_id)
+    lo, hi = _time_bounds(t_start, t_end)
+    conn = _connect()
+    total = conn.execute(
+        "SELECT COUNT(*) FROM samples WHERE session_id=? AND t_ms BETWEEN ? AND ?",
+        (session_id, lo, hi)).fetchone()[0]
+    for r in conn.execute(
+            "SELECT t_start, t_end, n, data FROM sample_chunks "
+            "WHERE session_id=? AND t_end >= ? AND t_start <= ?",
+            (session_id, lo, hi)):
+        if lo <= r["t_start"] and r["t_end"] <= hi:
+            total += r["n"]
+        else:  # boundary chunk
+            total += sum(1 for row in _decode_chunk(r["data"])
+                         if lo <= row[0] <= hi)
+    return total
+
+
+def _iter_range_batches(conn, session_id, lo, hi, batch_size):
+    """Undecimated batches: legacy rows first, then chunks (a session is
+    stored entirely in one format)."""
+    last_t, last_id = -_NO_LIMIT - 1, 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, t_ms, w0, w1, w2, w3, com_x, com_y FROM samples "
+            "WHERE session_id=? AND t_ms BETWEEN ? AND ? "
+            "AND (t_ms, id) > (?, ?) "
+            "ORDER BY t_ms, id LIMIT ?",
+            (session_id, max(lo, last_t), hi, last_t, last_id,
+             batch_size)).fetchall()
+        if not rows:
+            break
+        last_t, last_id = rows[-1]["t_ms"], rows[-1]["id"]
+        yield [tuple(r)[1:] for r in rows]
+        if len(rows) < batch_size:
+            break
+
+    per_query = max(1, batch_size // CHUNK_SIZE)
+    last_idx = -1
+    while True:
+        chunks = conn.execute(
+            "SELECT chunk_idx, t_start, t_end, data FROM sample_chunks "
+            "WHERE session_id=? AND chunk_idx > ? AND t_end >= ? AND t_start <= ? "
+            "ORDER BY chunk_idx LIMIT ?",
+            (session_id, last_idx, lo, hi, per_query)).fetchall()
+        if not chunks:
+            break
+        last_idx = chunks[-1]["chunk_idx"]
+        batch = []
+        for c in chunks:
+            rows = _decode_chunk(c["data"])
+            if c["t_start"] < lo or c["t_end"] > hi:
+                rows = [r for r in rows if lo <= r[0] <= hi]
+            batch.extend(rows)
+        if batch:
+            yield batch
+        if len(chunks) < per_query:
+            break
+
+
+def iter_sample_batches(session_id: int, t_start: int = None, t_end: int = None,
+                        stride: int = None, max_points: int = None,
+                        batch_size: int = SAMPLE_BATCH):
+    """Yield lists of (t_ms, w0, w1, w2, w3, com_x, com_y) in time order.
+
+    t_start / t_end bound t_ms (inclusive). stride keeps one sample out of
+    every `stride`; max_points picks the stride that returns at most that
+    many samples. Batches hold at most about batch_size samples."""
+    lo, hi = _time_bounds(t_start, t_end)
+    step = max(1, int(stride or 1))
+    if max_points:
+        n = count_samples(session_id, t_start, t_end)
+        step = max(step, -(-n // max(1, int(max_points))))
+    conn = _connect()
+    pos = 0
+    for batch in _iter_range_batches(conn, session_id, lo, hi, batch_size):
+        if step > 1:
+            out = batch[(-pos) % step::step]
+            pos += len(batch)
+            if out:
+                yield out
+        else:
+            yield batch
+
+
+def iter_samples(session_id: int, t_start: int = None, t_end: int = None,
+                 stride: int = None, max_points: int = None):
+    """Sample-by-sample variant of iter_sample_batches()."""
+    for batch in iter_sample_batches(session_id, t_start, t_end,
+                                     stride, max_points):
+        yield from batch
+
+
+# ── Downsample pyramid ───────────────────────────────────────
+# Per session, min/max/mean envelopes of every value column over buckets
+# of 16, 256 and 4096 consecutive samples. Each level is stored in parts
+# of OVERVIEW_PART buckets (zlib-compressed float64 records), so an
+# overview of any time range reads a handful of small blobs.
+# Bucket record: t_start, t_end, n, then min, max, mean of each column.
+
+OVERVIEW_LEVELS = (16, 256, 4096)
+OVERVIEW_PART = 512
+
+_OVERVIEW_COLS = ("w0", "w1", "w2", "w3", "com_x", "com_y")
+_BUCKET_WIDTH = 3 + 3 * len(_OVERVIEW_COLS)
+
+
+def _bucket(rows) -> tuple:
+    """Envelope of a list of sample tuples."""
+    cols = list(zip(*rows))
+    out = [rows[0][0], rows[-1][0], len(rows)]
+    for col in cols[1:]:
+        out += (min(col), max(col), math.fsum(col) / len(col))
+    return tuple(out)
+
+
+def _merge_buckets(buckets, factor) -> list:
+    """Combine every `factor` consecutive buckets into one."""
+    merged = []
+    for i in range(0, len(buckets), factor):
+        group = buckets[i:i + factor]
+        n = sum(b[2] for b in group)
+        out = [group[0][0], group[-1][1], n]
+        for k in range(3, _BUCKET_WIDTH, 3):
+            out += (min(b[k] for b in group),
+                    max(b[k + 1] for b in group),
+                    math.fsum(b[k + 2] * b[2] for b in group) / n)
+        merged.append(tuple(out))
+    return merged
+
+
+def _compute_overview(session_id: int) -> dict:
+    """Build every pyramid level from the samples. Returns {level: buckets}."""
+    base = OVERVIEW_LEVELS[0]
+    buckets = []
+    pending = []
+    for batch in iter_sample_batches(session_id):
+        pending.extend(batch)
+        full = len(pending) - len(pending) % base
+        buckets.extend(_bucket(pending[i:i + base]) for i in range(0, full, base))
+        del pending[:full]
+    if pending:
+        buckets.append(_bucket(pending))
+    levels = {base: buckets}
+    for prev, level in zip(OVERVIEW_LEVELS, OVERVIEW_LEVELS[1:]):
+        buckets = _merge_buckets(buckets, level // prev)
+        levels[level] = buckets
+    return levels
+
+
+def _pack_buckets(buckets) -> bytes:
+    """Column by column, byte-shuffled like sample chunks."""
+    cols = list(zip(*buckets))
+    words = chain(_delta(cols[0]), _delta(cols[1]), cols[2],
+                  *map(_float_bits, cols[3:]))
+    return zlib.compress(_shuffle(words), 6)
+
+
+def _unpack_buckets(blob, n) -> list:
+    words = _unshuffle(zlib.decompress(blob), _BUCKET_WIDTH * n)
+    cols = [list(accumulate(words[:n])), list(accumulate(words[n:2 * n])),
+            words[2 * n:3 * n]]
+    cols += [_bits_to_floats(words[k * n:(k + 1) * n])
+             for k in range(3, _BUCKET_WIDTH)]
+    return list(zip(*cols))
+
+
+def build_overview(session_id: int):
+    """(Re)build and store the downsample pyramid of a session. Called in
+    the background when a recording stops; get_overview() also builds it
+    on first use for older sessions."""
+    levels = _compute_overview(session_id)
+    params = []
+    for level, buckets in levels.items():
+        for part, off in enumerate(range(0, len(buckets), OVERVIEW_PART)):
+            chunk = buckets[off:off + OVERVIEW_PART]
+            params.append((session_id, level, part, chunk[0][0], chunk[-1][1],
+                           len(chunk), _pack_buckets(chunk)))
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM sample_overview WHERE session_id=?", (session_id,))
+        conn.executemany(
+            "INSERT INTO sample_overview "
+            "(session_id, level, part, t_start, t_end, n, data) "
+            "VALUES (?,?,?,?,?,?,?)", params)
+
+
+def _overview_buckets(session_id, level, lo, hi) -> list:
+    conn = _connect()
+    if conn.execute("SELECT 1 FROM sample_overview WHERE session_id=? LIMIT 1",
+                    (session_id,)).fetchone() is None:
+        row = conn.execute("SELECT ended_at FROM sessions WHERE id=?",
+                           (session_id,)).fetchone()
+        if row is None or row["ended_at"] is None:
+            # Still recording: compute without storing
+            buckets = _compute_overview(session_id)[level]
+            return [b for b in buckets if b[1] >= lo and b[0] <= hi]
+        build_overview(session_id)
+    buckets = []
+    for n, blob in conn.execute(
+            "SELECT n, data FROM sample_overview WHERE session_id=? AND level=? "
+            "AND t_end >= ? AND t_start <= ? ORDER BY part",
+            (session_id, level, lo, hi)):
+        buckets.extend(b for b in _unpack_buckets(blob, n)
+                       if b[1] >= lo and b[0] <= hi)
+    return buckets
+
+
+def get_overview(session_id: int, points: int = 1000,
+                 t_start: int = None, t_end: int = None) -> dict:
+    """Min/max/mean envelope of a session (or of t_start..t_end) in at most
+    `points` buckets, read from the coarsest pyramid level that still has
+    at least `points` buckets and merged down from there. With few enough
+    samples, every sample is its own bucket (level 1). Buckets overlapping
+    a bound are kept whole.
+
+    Returns {"level", "count", "t_start": [...], "t_end": [...], "n": [...],
+             "min": {col: [...]}, "max": {col: [...]}, "mean": {col: [...]}}
+    with col in w0, w1, w2, w3, com_x, com_y."""
+    points = max(1, int(points))
+    lo, hi = _time_bounds(t_start, t_end)
+    count = count_samples(session_id, t_start, t_end)
+    if count <= points:
+        level = 1
+        buckets = [_bucket([r]) for r in iter_samples(session_id, t_start, t_end)]
+    else:
+        level = next((lv for lv in reversed(OVERVIEW_LEVELS)
+                      if -(-count // lv) >= points), OVERVIEW_LEVELS[0])
+        buckets = _overview_buckets(session_id, level, lo, hi)
+        if len(buckets) > points:
+            factor = -(-len(buckets) // points)
+            buckets = _merge_buckets(buckets, factor)
+            level *= factor
+    cols = list(zip(*buckets)) or [()] * _BUCKET_WIDTH
+    return {
+        "level": level,
+        "count": count,
+        "t_start": list(cols[0]),
+        "t_end": list(cols[1]),
+        "n": list(cols[2]),
+        "min": {c: list(cols[3 + 3 * i]) for i, c in enumerate(_OVERVIEW_COLS)},
+        "max": {c: list(cols[4 + 3 * i]) for i, c in enumerate(_OVERVIEW_COLS)},
+        "mean": {c: list(cols[5 + 3 * i]) for i, c in enumerate(_OVERVIEW_COLS)},
+    }
+
+
+def migrate_samples_to_chunks(vacuum: bool = False) -> int:
+    """Move legacy one-row-per-sample data into chunk storage, one session
+    per transaction (readers always see a complete session). VACUUM
+    afterwards to give the freed pages back to the filesystem.
+    Returns the number of sessions migrated."""
+    conn = _connect()
+    sids = [r[0] for r in conn.execute(
+        "SELECT DISTINCT session_id FROM samples WHERE session_id IS NOT NULL")]
+    migrated = 0
+    for sid in sids:
+        try:
+            with conn:
+                rows = get_samples(sid)
+                conn.execute("DELETE FROM sample_chunks WHERE session_id=?", (sid,))
+                _write_chunks(conn, sid, rows, 0)
+                conn.execute("DELETE FROM samples WHERE session_id=?", (sid,))
+            migrated += 1
+        except Exception as e:
+            print(f"[DB] chunk migration failed for session {sid}: {e}")
+    if vacuum and migrated:
+        conn.execute("VACUUM")
+    return migrated
+
+
 # ── Self-test ────────────────────────────────────────────────
 if __name__ == "__main__":
     init_db()
@@ -345,8 +1328,6 @@ if __name__ == "__main__":
     # Clean up test data
     delete_session(sid)
     delete_user(uid)
-    conn = _connect()
-    conn.execute("DELETE FROM platforms WHERE id=?", (pid,))
-    conn.commit()
-    conn.close()
+    delete_platform(pid)
+    close_all()
     print("[OK] Test data cleaned up")
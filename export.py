@@ -0,0 +1,488 @@
+# ============================================================
+#  export.py — Session export (CSV / TXT / NPZ), streamed
+# ============================================================
+# Shared by the desktop session browser and the web dashboard. Samples
+# are read batch by batch (database.iter_sample_batches) and formatted
+# into text chunks, so memory use does not depend on session length.
+import ast
+import csv
+import io
+import os
+import sys
+import json
+import shutil
+import struct
+import zipfile
+import tempfile
+import threading
+from array import array
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import database as db
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EXPORT_HEADER = [
+    "timecode", "t_ms", "t_sec",
+    "w0_g", "w1_g", "w2_g", "w3_g", "total_g",
+    "com_x", "com_y"
+]
+
+FORMATS = ("csv", "txt")
+
+
+def format_timecode(t_ms: int) -> str:
+    """Convert milliseconds to HH:MM:SS.mmm timecode string."""
+    total_s = t_ms / 1000.0
+    h = int(total_s // 3600)
+    m = int((total_s % 3600) // 60)
+    s = total_s % 60
+    return f"{h:02d}:{m:02d}:{s:06.3f}"
+
+
+def export_row(sample) -> list:
+    """One (t_ms, w0, w1, w2, w3, com_x, com_y) sample as an export row."""
+    t_ms, w0, w1, w2, w3, cx, cy = sample
+    total = w0 + w1 + w2 + w3
+    return [
+        format_timecode(t_ms),
+        t_ms,
+        round(t_ms / 1000.0, 3),
+        round(w0, 1), round(w1, 1), round(w2, 1), round(w3, 1),
+        round(total, 1),
+        round(cx, 6), round(cy, 6),
+    ]
+
+
+def _drain(buf: io.StringIO) -> str:
+    text = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return text
+
+
+def _iter_csv(session_id, session, count):
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    # Metadata comment lines
+    buf.write(f"# Session #{session_id}\n")
+    buf.write(f"# Utilisateur: {session.get('user_name', '?')}\n")
+    buf.write(f"# Plateforme: {session.get('platform_name', '?')}\n")
+    buf.write(f"# Date: {session.get('started_at', '')}\n")
+    buf.write(f"# Duree: {session.get('duration_sec') or 0:.1f}s\n")
+    buf.write(f"# Samples: {count}\n")
+    writer.writerow(EXPORT_HEADER)
+    yield _drain(buf)
+    for batch in db.iter_sample_batches(session_id):
+        writer.writerows(map(export_row, batch))
+        yield _drain(buf)
+
+
+def _iter_txt(session_id, session, count):
+    yield (f"Session #{session_id}\n"
+           f"Utilisateur: {session.get('user_name', '?')}\n"
+           f"Plateforme: {session.get('platform_name', '?')}\n"
+           f"Date: {session.get('started_at', '')}\n"
+           f"Duree: {session.get('duration_sec') or 0:.1f}s\n"
+           f"Samples: {count}\n"
+           + "-" * 90 + "\n"
+           + "\t".join(EXPORT_HEADER) + "\n"
+           + "-" * 90 + "\n")
+    for batch in db.iter_sample_batches(session_id):
+        yield "".join("\t".join(map(str, export_row(s))) + "\n" for s in batch)
+
+
+def iter_session_export(session_id: int, fmt: str):
+    """Text chunks of a session export ("csv" or "txt"), or None if the
+    session does not exist or has no samples."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    session = db.get_session(session_id)
+    if session is None:
+        return None
+    count = db.count_samples(session_id)
+    if count == 0:
+        return None
+    if fmt == "csv":
+        return _iter_csv(session_id, session, count)
+    return _iter_txt(session_id, session, count)
+
+
+def _write_chunks(chunks, filepath: str, binary: bool, newline=None,
+                  cancel=None) -> bool:
+    """Write chunks to filepath. If the `cancel` event gets set, stop and
+    remove the partial file (returns False)."""
+    if binary:
+        f = open(filepath, "wb")
+    else:
+        f = open(filepath, "w", newline=newline, encoding="utf-8")
+    with f:
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                break
+            f.write(chunk)
+        else:
+            return True
+    os.remove(filepath)
+    return False
+
+
+def write_session_export(session_id: int, fmt: str, filepath: str,
+                         cancel=None) -> bool:
+    """Write a session export to filepath, batch by batch.
+    Returns False if there is nothing to export."""
+    chunks = iter_session_export(session_id, fmt)
+    if chunks is None:
+        return False
+    # csv module writes its own \r\n line endings
+    newline = "" if fmt == "csv" else None
+    return _write_chunks(chunks, filepath, False, newline, cancel)
+
+
+def export_session_csv(session_id: int, filepath: str) -> bool:
+    """Export a session to CSV file."""
+    return write_session_export(session_id, "csv", filepath)
+
+
+def export_session_txt(session_id: int, filepath: str) -> bool:
+    """Export a session to tab-separated TXT file."""
+    return write_session_export(session_id, "txt", filepath)
+
+
+# ── NPZ (columnar binary) ────────────────────────────────────
+# A standard NumPy .npz archive written with the stdlib: one .npy member
+# per column and session ("session_<id>/t_ms.npy", ...) plus "meta.json"
+# holding the session metadata. np.load() opens it directly; load_npz()
+# below also works without numpy. Members are stored uncompressed so
+# columns load with a single read and no parsing.
+
+NPZ_FORMAT = "gravicore-npz"
+NPZ_VERSION = 1
+# (name, .npy dtype, array typecode)
+NPZ_COLUMNS = [("t_ms", "<i8", "q"), ("w0", "<f8", "d"), ("w1", "<f8", "d"),
+               ("w2", "<f8", "d"), ("w3", "<f8", "d"),
+               ("com_x", "<f8", "d"), ("com_y", "<f8", "d")]
+
+_NPY_MAGIC = b"\x93NUMPY"
+_SPOOL_MAX = 4 * 1024 * 1024   # per column, then spilled to a temp file
+_COPY_BLOCK = 1024 * 1024
+_BIG_ENDIAN = sys.byteorder != "little"
+
+
+def _npy_header(descr: str, n: int) -> bytes:
+    """.npy v1.0 header for a 1-D array of n items (padded to 64 bytes)."""
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, n)
+    header += " " * (-(len(_NPY_MAGIC) + 4 + len(header) + 1) % 64) + "\n"
+    return _NPY_MAGIC + b"\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def _session_meta(session: dict) -> dict:
+    meta = {k: session.get(k) for k in (
+        "id", "user_id", "user_name", "platform_id", "platform_name",
+        "started_at", "ended_at", "duration_sec", "notes")}
+    for pid, _name, width, height in db.list_platforms():
+        if pid == session.get("platform_id"):
+            meta["board_width_cm"], meta["board_height_cm"] = width, height
+    return meta
+
+
+def _spool_columns(session_id):
+    """One pass over the samples into per-column little-endian buffers.
+    Returns (sample count, list of file objects)."""
+    files = [tempfile.SpooledTemporaryFile(_SPOOL_MAX) for _ in NPZ_COLUMNS]
+    if db.np is not None:
+        # Vectorised chunk decode; holds one session in memory
+        arr = db.get_samples_array(session_id)
+        for f, (name, descr, _) in zip(files, NPZ_COLUMNS):
+            f.write(arr[name].astype(descr, copy=False).tobytes())
+        return len(arr), files
+    n = 0
+    for batch in db.iter_sample_batches(session_id):
+        for f, (_, _, code), values in zip(files, NPZ_COLUMNS, zip(*batch)):
+            col = array(code, values)
+            if _BIG_ENDIAN:
+                col.byteswap()
+            f.write(col.tobytes())
+        n += len(batch)
+    return n, files
+
+
+class _ZipSink:
+    """Write-only stream that ZipFile writes into; take() hands back what
+    was written since the last call (ZipFile adds data descriptors when
+    the output cannot seek)."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _iter_npz(sessions):
+    sink = _ZipSink()
+    metas = []
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for session in sessions:
+            sid = session["id"]
+            n, files = _spool_columns(sid)
+            meta = _session_meta(session)
+            meta["sample_count"] = n
+            metas.append(meta)
+            for f, (name, descr, _) in zip(files, NPZ_COLUMNS):
+                header = _npy_header(descr, n)
+                info = zipfile.ZipInfo(f"session_{sid}/{name}.npy")
+                with zf.open(info, "w", force_zip64=len(header) + 8 * n > 2 ** 31 - 1) as out:
+                    out.write(header)
+                    f.seek(0)
+                    while True:
+                        block = f.read(_COPY_BLOCK)
+                        if not block:
+                            break
+                        out.write(block)
+                        yield sink.take()
+                f.close()
+            yield sink.take()
+        zf.writestr("meta.json", json.dumps({
+            "format": NPZ_FORMAT,
+            "version": NPZ_VERSION,
+            "columns": [name for name, _, _ in NPZ_COLUMNS],
+            "sessions": metas,
+        }, ensure_ascii=False, indent=1))
+    yield sink.take()
+
+
+def iter_sessions_npz(session_ids):
+    """Byte chunks of an .npz archive holding the given sessions, or None
+    if none of them exists or has samples."""
+    sessions = []
+    for sid in session_ids:
+        session = db.get_session(sid)
+        if session is not None and db.get_sample_count(sid) > 0:
+            sessions.append(session)
+    if not sessions:
+        return None
+    return _iter_npz(sessions)
+
+
+def write_sessions_npz(session_ids, filepath: str, cancel=None) -> bool:
+    """Write sessions to an .npz file. Returns False if there is nothing
+    to export."""
+    chunks = iter_sessions_npz(session_ids)
+    if chunks is None:
+        return False
+    return _write_chunks(chunks, filepath, True, cancel=cancel)
+
+
+def export_session_npz(session_id: int, filepath: str) -> bool:
+    """Export a session to a NumPy .npz archive."""
+    return write_sessions_npz([session_id], filepath)
+
+
+def _read_npy(data: bytes):
+    """Parse a 1-D .npy member: numpy array if numpy is installed,
+    array.array otherwise."""
+    if data[:6] != _NPY_MAGIC:
+        raise ValueError("not a .npy member")
+    if data[6] == 1:
+        hlen, start = struct.unpack_from("<H", data, 8)[0], 10
+    else:
+        hlen, start = struct.unpack_from("<I", data, 8)[0], 12
+    header = ast.literal_eval(data[start:start + hlen].decode("latin1"))
+    offset = start + hlen
+    descr = header["descr"]
+    if np is not None:
+        return np.frombuffer(data, dtype=descr, offset=offset)
+    col = array("q" if descr[1:] == "i8" else "d")
+    col.frombytes(data[offset:])
+    if (descr[0] == "<") == _BIG_ENDIAN:
+        col.byteswap()
+    return col
+
+
+def load_npz(filepath: str) -> dict:
+    """Load an export written by write_sessions_npz().
+    Returns {session_id: {"meta": {...}, "t_ms": ..., "w0": ..., ...}}."""
+    sessions = {}
+    with zipfile.ZipFile(filepath) as zf:
+        meta = json.loads(zf.read("meta.json"))
+        if meta.get("format") != NPZ_FORMAT:
+            raise ValueError(f"{filepath}: not a {NPZ_FORMAT} archive")
+        for smeta in meta["sessions"]:
+            sid = smeta["id"]
+            entry = {"meta": smeta}
+            for name in meta["columns"]:
+                entry[name] = _read_npy(zf.read(f"session_{sid}/{name}.npy"))
+            sessions[sid] = entry
+    return sessions
+
+
+# ── Batch export ─────────────────────────────────────────────
+# Many sessions at once: one task per session on a process pool (the
+# formatting is CPU-bound), driven by a background thread that collects
+# finished files into a .zip archive or leaves them in a directory.
+# The GUI/web poll progress() and may cancel() at any time.
+
+BATCH_FORMATS = ("csv", "txt", "npz")
+
+
+def select_sessions(user_id: int = None, platform_id: int = None,
+                    date_from: str = None, date_to: str = None) -> list:
+    """Ids of the sessions matching a filter (dates "YYYY-MM-DD")."""
+    return [s["id"] for s in db.list_sessions(platform_id=platform_id,
+                                              user_id=user_id,
+                                              date_from=date_from,
+                                              date_to=date_to)]
+
+
+_worker_cancel = None
+
+
+def _init_worker(db_path: str, cancel):
+    """Process-pool initializer: same database, shared cancel event."""
+    global _worker_cancel
+    db._DB_PATH = db_path
+    _worker_cancel = cancel
+
+
+def _export_task(session_id: int, fmt: str, filepath: str) -> bool:
+    """Process-pool task: export one session to filepath."""
+    if fmt == "npz":
+        return write_sessions_npz([session_id], filepath, _worker_cancel)
+    return write_session_export(session_id, fmt, filepath, _worker_cancel)
+
+
+class BatchExport:
+    """Export a list of sessions in the background.
+
+    output ending in ".zip" builds one archive (written next to it as
+    ".part" and renamed when complete); anything else is a directory that
+    receives session_<id>.<fmt> files."""
+
+    def __init__(self, session_ids, fmt: str, output: str, workers: int = None):
+        if fmt not in BATCH_FORMATS:
+            raise ValueError(f"unknown export format: {fmt}")
+        self.session_ids = list(dict.fromkeys(session_ids))
+        self.fmt = fmt
+        self.output = output
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._cancel = multiprocessing.Event()   # also seen by the workers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._state = "pending"
+        self._done = 0
+        self._failed = 0
+        self._skipped = 0
+        self._error = None
+
+    @property
+    def to_zip(self) -> bool:
+        return self.output.lower().endswith(".zip")
+
+    def start(self):
+        self._state = "running"
+        self._thread = threading.Thread(target=self._run, name="batch-export",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for the job to end. Returns True if it has."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished
+
+    @property
+    def finished(self) -> bool:
+        return self._state in ("done", "cancelled", "error")
+
+    def progress(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "total": len(self.session_ids),
+                "done": self._done,
+                "failed": self._failed,
+                "skipped": self._skipped,
+                "error": self._error,
+                "output": self.output,
+            }
+
+    def _collect(self, fut, sid, path, zf):
+        """Account for one finished task (and move its file into the zip)."""
+        try:
+            ok = fut.result()
+            if ok and zf is not None:
+                zf.write(path, os.path.basename(path))
+                os.remove(path)
+        except Exception as e:
+            print(f"[EXPORT] session {sid}: {e}")
+            ok = None
+        with self._lock:
+            self._done += 1
+            if ok is None:
+                self._failed += 1
+            elif not ok:
+                self._skipped += 1
+
+    def _run(self):
+        workdir = tempfile.mkdtemp(prefix="gravicore_export_") if self.to_zip else self.output
+        part = self.output + ".part"
+        zf = None
+        try:
+            os.makedirs(workdir, exist_ok=True)
+            if self.to_zip:
+                compression = zipfile.ZIP_STORED if self.fmt == "npz" else zipfile.ZIP_DEFLATED
+                zf = zipfile.ZipFile(part, "w", compression, allowZip64=True)
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     initializer=_init_worker,
+                                     initargs=(db._DB_PATH, self._cancel)) as pool:
+                futures = {}
+                for sid in self.session_ids:
+                    path = os.path.join(workdir, f"session_{sid}.{self.fmt}")
+                    futures[pool.submit(_export_task, sid, self.fmt, path)] = (sid, path)
+                pending = set(futures)
+                while pending and not self._cancel.is_set():
+                    finished, pending = wait(pending, timeout=0.2,
+                                             return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        self._collect(fut, *futures[fut], zf)
+                if self._cancel.is_set():
+                    pool.shutdown(wait=True, cancel_futures=True)
+            if zf is not None:
+                zf.close()
+                zf = None
+                if self._cancel.is_set():
+                    os.remove(part)
+                else:
+                    os.replace(part, self.output)
+            state = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e:
+            print(f"[EXPORT] batch error: {e}")
+            with self._lock:
+                self._error = str(e)
+            state = "error"
+            if zf is not None:
+                zf.close()
+            if os.path.exists(part):
+                os.remove(part)
+        finally:
+            if self.to_zip:
+                shutil.rmtree(workdir, ignore_errors=True)
+        with self._lock:
+            self._state = state
@@ -0,0 +1,125 @@
+# ============================================================
+#  filters.py — Sensor smoothing stages (live and offline)
+# ============================================================
+from bisect import bisect_left, insort
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHANNELS = 4
+MEDIAN_WINDOW = 5    # samples in the running median
+MAX_DELTA = 3000     # grams a channel may move per sample after the median
+FLOOR = 0.0          # negative readings are clipped to this
+
+
+class MedianClamp:
+    """Running median of the last `window` samples, then a slew clamp of
+    `max_delta` per sample, on all channels at once.
+
+    The median is kept incrementally: each channel holds its window in
+    arrival order and in sorted order, so a new sample costs one removal
+    and one insertion (bisect) instead of a full sort. While the window
+    is filling up the median is taken over the samples seen so far (upper
+    median for an even count). Same output live (step) and offline
+    (apply / apply_array) for the same input."""
+
+    def __init__(self, window: int = MEDIAN_WINDOW, max_delta: float = MAX_DELTA,
+                 floor: float = FLOOR, channels: int = CHANNELS):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = int(window)
+        self.max_delta = max_delta
+        self.floor = floor
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        """Forget the history (e.g. after a reconnection)."""
+        self._order = [deque() for _ in range(self.channels)]
+        self._sorted = [[] for _ in range(self.channels)]
+        self.last = [0.0] * self.channels
+
+    def step(self, values) -> list:
+        """Filter one sample (one value per channel); returns the new
+        filtered values (also kept in `last`)."""
+        w, d, floor = self.window, self.max_delta, self.floor
+        last = self.last
+        for c, v in enumerate(values):
+            if v < floor:
+                v = floor
+            order, srt = self._order[c], self._sorted[c]
+            if len(order) == w:
+                del srt[bisect_left(srt, order.popleft())]
+            order.append(v)
+            insort(srt, v)
+            med = srt[len(srt) // 2]
+            prev = last[c]
+            if med - prev > d:
+                med = prev + d
+            elif prev - med > d:
+                med = prev - d
+            last[c] = med
+        return last
+
+    def apply(self, rows) -> list:
+        """Filter a sequence of samples, continuing from the current
+        state; returns a list of tuples."""
+        return [tuple(self.step(r)) for r in rows]
+
+    def apply_array(self, block):
+        """Vectorised apply() for an (n, channels) array (numpy needed):
+        medians of all samples and channels in one sort, then the clamp
+        only where a jump exceeds max_delta. Continues from, and updates,
+        the current state."""
+        if np is None:
+            raise RuntimeError("numpy is required: pip install numpy")
+        block = np.maximum(np.asarray(block, dtype=np.float64), self.floor)
+        n, w = len(block), self.window
+        if n == 0:
+            return block.reshape(0, self.channels)
+        # Window of each sample = history (up to w - 1) + samples so far
+        hist = np.array([list(o)[-(w - 1):] if w > 1 else []
+                         for o in self._order], dtype=np.float64).T
+        hist = hist.reshape(-1, self.channels)
+        full = np.concatenate([hist, block])
+        k = len(hist)
+        med = np.empty_like(block)
+        # Rows whose window is still filling up: plain step() semantics
+        head = min(n, max(0, w - 1 - k))
+        for i in range(head):
+            win = np.sort(full[:k + i + 1], axis=0)
+            med[i] = win[len(win) // 2]
+        if head < n:
+            view = np.lib.stride_tricks.sliding_window_view(
+                full[k + head - w + 1:], w, axis=0)
+            med[head:] = np.sort(view, axis=-1)[..., w // 2]
+        # Slew clamp: a recurrence, but only active after a jump > d
+        d = self.max_delta
+        out = med.copy()
+        prev = np.array(self.last, dtype=np.float64)
+        diff = np.abs(np.diff(med, axis=0, prepend=prev[None]))
+        done = 0
+        for j in np.flatnonzero((diff > d).any(axis=1)):
+            if j < done:
+                continue
+            y = out[j - 1] if j else prev
+            i = j
+            while i < n:
+                y = np.clip(med[i], y - d, y + d)
+                out[i] = y
+                i += 1
+                if (y == med[i - 1]).all():
+                    break
+            done = i
+        # Carry the state over to the next call
+        for c in range(self.channels):
+            order = deque(list(self._order[c]) + block[:, c].tolist())
+            while len(order) > w:
+                order.popleft()
+            self._order[c] = order
+            self._sorted[c] = sorted(order)
+        self.last = out[-1].tolist()
+        return out
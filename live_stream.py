@@ -0,0 +1,88 @@
+# ============================================================
+#  live_stream.py — Live sample fan-out (acquisition -> web clients)
+# ============================================================
+import threading
+
+RING_SIZE = 256  # frames kept for late readers (~3 s at 80 Hz)
+
+
+class LiveBroadcaster:
+    """Single-producer broadcast ring.
+
+    publish() stores the frame in a fixed slot and wakes the readers, so
+    its cost does not depend on the number of clients. Every subscriber
+    keeps its own cursor; one that falls more than `size` frames behind
+    skips ahead (the frames are counted as dropped) instead of holding
+    the producer back."""
+
+    def __init__(self, size: int = RING_SIZE):
+        self._size = size
+        self._ring = [None] * size
+        self._seq = 0  # frames published so far
+        self._cond = threading.Condition(threading.Lock())
+        self._subscribers = 0
+
+    @property
+    def has_subscribers(self) -> bool:
+        return self._subscribers > 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._subscribers
+
+    def publish(self, frame):
+        """Append one frame (called from the acquisition thread)."""
+        with self._cond:
+            self._ring[self._seq % self._size] = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def subscribe(self) -> "Subscription":
+        """New reader positioned at the live edge."""
+        with self._cond:
+            self._subscribers += 1
+            return Subscription(self, self._seq)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+
+class Subscription:
+    """One reader of a LiveBroadcaster (use as a context manager)."""
+
+    def __init__(self, hub: LiveBroadcaster, cursor: int):
+        self._hub = hub
+        self.cursor = cursor
+        self.dropped = 0
+        self._closed = False
+
+    def read(self, timeout: float = 1.0) -> list:
+        """Frames published since the last read, oldest first. Waits up
+        to `timeout` seconds when there is nothing new ([] on timeout)."""
+        hub = self._hub
+        with hub._cond:
+            if hub._seq == self.cursor:
+                hub._cond.wait(timeout)
+            seq = hub._seq
+            start = max(self.cursor, seq - hub._size)
+            self.dropped += start - self.cursor
+            ring, size = hub._ring, hub._size
+            frames = [ring[i % size] for i in range(start, seq)]
+            self.cursor = seq
+        return frames
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._hub._unsubscribe()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Shared by the acquisition loop and the web dashboard
+broadcaster = LiveBroadcaster()
@@ -2,14 +2,21 @@
 #  recorder.py — Session recording engine
 # ============================================================
 import time
+import queue
 import threading
 import database as db
 
-FLUSH_THRESHOLD = 500  # flush buffer every N samples
+FLUSH_THRESHOLD = 500  # hand a batch to the writer every N samples
+QUEUE_MAX_BATCHES = 64  # bounded writer queue (~32k samples in flight)
+FLUSH_TIMEOUT = 0.5     # s record() may wait on a full queue before dropping
 
 
 class SessionRecorder:
-    """Records force platform samples into the database."""
+    """Records force platform samples into the database.
+
+    record() only appends to an in-memory batch; full batches are handed
+    to a dedicated writer thread that owns one SQLite connection for the
+    whole session."""
 
     def __init__(self):
         self._session_id = None
@@ -20,6 +27,15 @@ class SessionRecorder:
         self._total_samples = 0
         self._lock = threading.Lock()
         self._recording = False
+        self._queue = None
+        self._writer = None
+        # Writer counters (updated by the writer thread)
+        self._flush_count = 0
+        self._flush_errors = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._flush_timeouts = 0
+        self._dropped_samples = 0
 
     # ── Properties ───────────────────────────────────────────
 
@@ -45,6 +61,30 @@ class SessionRecorder:
     def sample_count(self) -> int:
         return self._total_samples
 
+    @property
+    def dropped_samples(self) -> int:
+        """Samples of this session lost before reaching the database
+        (writer queue full, or overwritten in the sample ring)."""
+        return self._dropped_samples
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of batches waiting for the writer thread."""
+        q = self._queue
+        return q.qsize() if q is not None else 0
+
+    @property
+    def writer_stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "flush_count": self._flush_count,
+            "flush_errors": self._flush_errors,
+            "last_flush_ms": self._last_flush_ms,
+            "max_flush_ms": self._max_flush_ms,
+            "flush_timeouts": self._flush_timeouts,
+            "dropped_samples": self._dropped_samples,
+        }
+
     # ── Control ──────────────────────────────────────────────
 
     def start(self, user_id: int, platform_id: int) -> int:
@@ -59,46 +99,127 @@ class SessionRecorder:
         self._start_time = time.time()
         self._buffer = []
         self._total_samples = 0
+        self._flush_count = 0
+        self._flush_errors = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._flush_timeouts = 0
+        self._dropped_samples = 0
+        self._queue = queue.Queue(maxsize=QUEUE_MAX_BATCHES)
+        self._writer = threading.Thread(
+            target=self._writer_loop, args=(self._session_id, self._queue),
+            name="recorder-writer", daemon=True)
+        self._writer.start()
         self._recording = True
         return self._session_id
 
     def record(self, t_ms: int, w0: float, w1: float, w2: float, w3: float,
                com_x: float, com_y: float):
-        """Add a sample to the buffer. Call from the UI update loop."""
+        """Add a sample to the buffer (t_ms relative to the session start)."""
         if not self._recording:
             return
         with self._lock:
+            if not self._recording:
+                return
             self._buffer.append((t_ms, w0, w1, w2, w3, com_x, com_y))
             self._total_samples += 1
             if len(self._buffer) >= FLUSH_THRESHOLD:
                 self._flush_locked()
 
+    def count_lost(self, n: int):
+        """Account for n samples the caller lost before record()."""
+        with self._lock:
+            self._dropped_samples += n
+
+    def record_at(self, timestamp: float, w0: float, w1: float, w2: float,
+                  w3: float, com_x: float, com_y: float):
+        """Add a sample stamped with its arrival time (time.time()).
+        Called once per decoded sample, in order (sample ring reader)."""
+        t_ms = int((timestamp - self._start_time) * 1000)
+        if t_ms < 0:
+            return
+        self.record(t_ms, w0, w1, w2, w3, com_x, com_y)
+
     def flush(self):
-        """Flush buffer to database."""
+        """Hand the current buffer to the writer thread."""
         with self._lock:
             self._flush_locked()
 
     def _flush_locked(self):
-        """Internal flush (caller must hold the lock)."""
-        if not self._buffer or self._session_id is None:
+        """Internal flush (caller must hold the lock).
+        Enqueued under the lock so batches keep their order; put() only
+        blocks if the writer is QUEUE_MAX_BATCHES behind, and for at most
+        FLUSH_TIMEOUT: the batch is then dropped (and counted) rather than
+        stalling the caller."""
+        if not self._buffer or self._queue is None:
             return
         try:
-            db.insert_samples(self._session_id, self._buffer)
-        except Exception as e:
-            print(f"[RECORDER] flush error: {e}")
+            self._queue.put(self._buffer, timeout=FLUSH_TIMEOUT)
+        except queue.Full:
+            n = len(self._buffer)
+            self._flush_timeouts += 1
+            self._dropped_samples += n
+            self._total_samples -= n
+            print(f"[RECORDER] writer {QUEUE_MAX_BATCHES} batches behind, "
+                  f"{n} samples dropped")
         self._buffer = []
 
+    def _writer_loop(self, session_id, q):
+        """Writer thread: insert batches until the None sentinel.
+        database.py keeps one connection per thread, so the writer reuses
+        the same connection for every batch and closes it on exit."""
+        while True:
+            batch = q.get()
+            if batch is None:
+                break
+            t0 = time.perf_counter()
+            try:
+                db.insert_samples(session_id, batch)
+            except Exception as e:
+                # Batch lost: same accounting as a dropped batch
+                with self._lock:
+                    self._flush_errors += 1
+                    self._dropped_samples += len(batch)
+                    self._total_samples -= len(batch)
+                print(f"[RECORDER] flush error, {len(batch)} samples lost: {e}")
+            ms = (time.perf_counter() - t0) * 1000
+            self._flush_count += 1
+            self._last_flush_ms = ms
+            if ms > self._max_flush_ms:
+                self._max_flush_ms = ms
+        db.close_connection()
+
     def stop(self) -> int:
-        """Stop recording and finalize the session. Returns session_id."""
+        """Stop recording, wait for the writer to drain and finalize the
+        session. Returns session_id."""
         if not self._recording:
             return None
-        self._recording = False
-        self.flush()
+        with self._lock:
+            self._recording = False
+            self._flush_locked()
+        # Outside the lock: the writer takes it to count a failed batch
+        if self._queue is not None:
+            self._queue.put(None)
+        if self._writer is not None:
+            self._writer.join()
+        self._writer = None
+        self._queue = None
         sid = self._session_id
         if sid is not None:
             try:
                 db.end_session(sid, self._total_samples)
             except Exception as e:
                 print(f"[RECORDER] end_session error: {e}")
+            threading.Thread(target=self._build_overview, args=(sid,),
+                             name="recorder-overview", daemon=True).start()
         self._session_id = None
         return sid
+
+    @staticmethod
+    def _build_overview(session_id):
+        """Background thread: precompute the replay overview pyramid."""
+        try:
+            db.build_overview(session_id)
+        except Exception as e:
+            print(f"[RECORDER] overview error: {e}")
+        db.close_connection()
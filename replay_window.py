@@ -3,92 +3,23 @@
 # ============================================================
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import csv
-import io
 import os
+import time
+import queue
+import threading
+from bisect import bisect_right
+from collections import deque
 import database as db
-
-
-# ── Export helpers ────────────────────────────────────────────
-
-def _format_timecode(t_ms: int) -> str:
-    """Convert milliseconds to HH:MM:SS.mmm timecode string."""
-    total_s = t_ms / 1000.0
-    h = int(total_s // 3600)
-    m = int((total_s % 3600) // 60)
-    s = total_s % 60
-    return f"{h:02d}:{m:02d}:{s:06.3f}"
-
-
-def _build_export_rows(session_id: int):
-    """Return (session_info, header, rows) for export."""
-    session = db.get_session(session_id)
-    samples = db.get_samples(session_id)
-    if not session or not samples:
-        return None, None, None
-
-    header = [
-        "timecode", "t_ms", "t_sec",
-        "w0_g", "w1_g", "w2_g", "w3_g", "total_g",
-        "com_x", "com_y"
-    ]
-
-    rows = []
-    for t_ms, w0, w1, w2, w3, cx, cy in samples:
-        total = w0 + w1 + w2 + w3
-        rows.append([
-            _format_timecode(t_ms),
-            t_ms,
-            round(t_ms / 1000.0, 3),
-            round(w0, 1), round(w1, 1), round(w2, 1), round(w3, 1),
-            round(total, 1),
-            round(cx, 6), round(cy, 6),
-        ])
-    return session, header, rows
-
-
-def export_session_csv(session_id: int, filepath: str):
-    """Export a session to CSV file."""
-    session, header, rows = _build_export_rows(session_id)
-    if rows is None:
-        return False
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f, delimiter=";")
-        # Metadata comment lines
-        f.write(f"# Session #{session_id}\n")
-        f.write(f"# Utilisateur: {session.get('user_name', '?')}\n")
-        f.write(f"# Plateforme: {session.get('platform_name', '?')}\n")
-        f.write(f"# Date: {session.get('started_at', '')}\n")
-        f.write(f"# Duree: {session.get('duration_sec', 0):.1f}s\n")
-        f.write(f"# Samples: {len(rows)}\n")
-        writer.writerow(header)
-        writer.writerows(rows)
-    return True
-
-
-def export_session_txt(session_id: int, filepath: str):
-    """Export a session to tab-separated TXT file."""
-    session, header, rows = _build_export_rows(session_id)
-    if rows is None:
-        return False
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(f"Session #{session_id}\n")
-        f.write(f"Utilisateur: {session.get('user_name', '?')}\n")
-        f.write(f"Plateforme: {session.get('platform_name', '?')}\n")
-        f.write(f"Date: {session.get('started_at', '')}\n")
-        f.write(f"Duree: {session.get('duration_sec', 0):.1f}s\n")
-        f.write(f"Samples: {len(rows)}\n")
-        f.write("-" * 90 + "\n")
-        f.write("\t".join(header) + "\n")
-        f.write("-" * 90 + "\n")
-        for row in rows:
-            f.write("\t".join(str(v) for v in row) + "\n")
-    return True
+from datetime import datetime
+from export import (export_session_csv, export_session_txt, export_session_npz,
+                    write_sessions_npz, select_sessions, BatchExport)
 
 
 class SessionBrowser(tk.Toplevel):
     """Window listing all recorded sessions with filters."""
 
+    PAGE_SIZE = 200  # sessions fetched per "Plus" click
+
     def __init__(self, master, themes, current_theme, settings_funcs):
         super().__init__(master)
         self.title("Historique des sessions")
@@ -138,13 +69,20 @@ class SessionBrowser(tk.Toplevel):
                                     fg=t["text_dim"], bg=t["bg_card"])
         self._lbl_count.pack(side="right")
 
+        self._btn_more = tk.Button(fbar, text="Plus...", font=("Segoe UI", 9),
+                                   fg=t["text_primary"], bg=t["tare_bg"],
+                                   activebackground=t["tare_hover"],
+                                   relief="flat", cursor="hand2", padx=8,
+                                   command=self._load_page)
+        self._btn_more.pack(side="right", padx=(0, 8))
+
         # ── Session list ─────────────────────────────────────
         list_frame = tk.Frame(self, bg=t["bg"])
         list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
         columns = ("id", "date", "user", "platform", "duration", "samples")
         self._tree = ttk.Treeview(list_frame, columns=columns, show="headings",
-                                   selectmode="browse")
+                                   selectmode="extended")
         self._tree.heading("id", text="ID")
         self._tree.heading("date", text="Date")
         self._tree.heading("user", text="Utilisateur")
@@ -199,6 +137,20 @@ class SessionBrowser(tk.Toplevel):
                                     command=lambda: self._export_session("csv"))
         btn_export_csv.pack(side="left", padx=(0, 4))
 
+        btn_export_npz = tk.Button(bbar, text="EXPORT NPZ", font=("Segoe UI", 10, "bold"),
+                                    fg=t["text_primary"], bg=t["accent_teal"],
+                                    activebackground=t["accent_blue"],
+                                    relief="flat", cursor="hand2", padx=14, pady=6,
+                                    command=self._export_npz)
+        btn_export_npz.pack(side="left", padx=(0, 4))
+
+        btn_export_batch = tk.Button(bbar, text="EXPORT LOT", font=("Segoe UI", 10, "bold"),
+                                      fg=t["text_primary"], bg=t["accent_blue"],
+                                      activebackground=t["accent_teal"],
+                                      relief="flat", cursor="hand2", padx=14, pady=6,
+                                      command=self._open_batch_export)
+        btn_export_batch.pack(side="left", padx=(0, 4))
+
     def _refresh_filters(self):
         users = db.list_users()
         self._users_map = {u[1]: u[0] for u in users}
@@ -214,10 +166,16 @@ class SessionBrowser(tk.Toplevel):
 
         user_name = self._user_var.get()
         plat_name = self._plat_var.get()
-        uid = self._users_map.get(user_name)
-        pid = self._plats_map.get(plat_name)
-
-        sessions = db.list_sessions(platform_id=pid, user_id=uid)
+        self._filter = dict(user_id=self._users_map.get(user_name),
+                            platform_id=self._plats_map.get(plat_name))
+        self._total = db.count_sessions(**self._filter)
+        self._next_cursor = None
+        self._load_page()
+
+    def _load_page(self):
+        """Append the next PAGE_SIZE sessions (keyset pagination)."""
+        sessions, self._next_cursor = db.list_sessions_page(
+            limit=self.PAGE_SIZE, cursor=self._next_cursor, **self._filter)
         for s in sessions:
             dur = s.get("duration_sec") or 0
             if dur >= 60:
@@ -232,7 +190,9 @@ class SessionBrowser(tk.Toplevel):
                 dur_str,
                 s.get("sample_count", 0),
             ))
-        self._lbl_count.config(text=f"{len(sessions)} session(s)")
+        shown = len(self._tree.get_children())
+        self._lbl_count.config(text=f"{shown} / {self._total} session(s)")
+        self._btn_more.config(state="normal" if self._next_cursor else "disabled")
 
     def _get_selected_id(self) -> int:
         sel = self._tree.selection()
@@ -241,6 +201,10 @@ class SessionBrowser(tk.Toplevel):
         values = self._tree.item(sel[0], "values")
         return int(values[0])
 
+    def _get_selected_ids(self) -> list:
+        return [int(self._tree.item(iid, "values")[0])
+                for iid in self._tree.selection()]
+
     def _on_double_click(self, event):
         self._open_replay()
 
@@ -276,6 +240,33 @@ class SessionBrowser(tk.Toplevel):
         else:
             messagebox.showerror("Erreur", "Aucun echantillon a exporter.", parent=self)
 
+    def _export_npz(self):
+        """Export every selected session into one NumPy .npz archive."""
+        sids = self._get_selected_ids()
+        if not sids:
+            messagebox.showwarning("Export", "Selectionnez une ou plusieurs sessions.",
+                                   parent=self)
+            return
+        name = f"session_{sids[0]}.npz" if len(sids) == 1 else "sessions.npz"
+        filepath = filedialog.asksaveasfilename(
+            parent=self, title="Exporter en NPZ",
+            defaultextension=".npz",
+            initialfile=name,
+            filetypes=[("NumPy NPZ", "*.npz"), ("Tous", "*.*")])
+        if not filepath:
+            return
+        if write_sessions_npz(sids, filepath):
+            messagebox.showinfo("Export", f"{len(sids)} session(s) exportee(s) :\n{filepath}",
+                                parent=self)
+        else:
+            messagebox.showerror("Erreur", "Aucun echantillon a exporter.", parent=self)
+
+    def _open_batch_export(self):
+        BatchExportDialog(self, self._themes[self._current_theme],
+                          self._users_map.get(self._user_var.get()),
+                          self._plats_map.get(self._plat_var.get()),
+                          self._user_var.get(), self._plat_var.get())
+
     def _delete_session(self):
         sid = self._get_selected_id()
         if sid is None:
@@ -286,6 +277,146 @@ class SessionBrowser(tk.Toplevel):
             self._refresh_list()
 
 
+# ============================================================
+#  Batch export
+# ============================================================
+
+class BatchExportDialog(tk.Toplevel):
+    """Export every session matching the browser filters (plus a date
+    range) to a ZIP archive or a folder, with progress and cancel."""
+
+    def __init__(self, master, t, user_id, platform_id, user_label, plat_label):
+        super().__init__(master)
+        self.title("Export par lot")
+        self.geometry("460x260")
+        self.resizable(False, False)
+        self.configure(bg=t["bg"])
+        self._t = t
+        self._user_id = user_id
+        self._platform_id = platform_id
+        self._job = None
+
+        body = tk.Frame(self, bg=t["bg_card"], padx=12, pady=10)
+        body.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def label(text, row):
+            tk.Label(body, text=text, font=("Segoe UI", 10),
+                     fg=t["text_secondary"], bg=t["bg_card"]).grid(
+                row=row, column=0, sticky="w", pady=3)
+
+        label("Utilisateur:", 0)
+        tk.Label(body, text=user_label, font=("Segoe UI", 10),
+                 fg=t["text_primary"], bg=t["bg_card"]).grid(row=0, column=1, sticky="w")
+        label("Plateforme:", 1)
+        tk.Label(body, text=plat_label, font=("Segoe UI", 10),
+                 fg=t["text_primary"], bg=t["bg_card"]).grid(row=1, column=1, sticky="w")
+
+        label("Du (AAAA-MM-JJ):", 2)
+        self._from_var = tk.StringVar()
+        tk.Entry(body, textvariable=self._from_var, width=12).grid(row=2, column=1, sticky="w")
+        label("Au (AAAA-MM-JJ):", 3)
+        self._to_var = tk.StringVar()
+        tk.Entry(body, textvariable=self._to_var, width=12).grid(row=3, column=1, sticky="w")
+
+        label("Format:", 4)
+        self._fmt_var = tk.StringVar(value="csv")
+        ttk.Combobox(body, textvariable=self._fmt_var, state="readonly", width=8,
+                     values=["csv", "txt", "npz"]).grid(row=4, column=1, sticky="w")
+
+        label("Destination:", 5)
+        self._dest_var = tk.StringVar(value="zip")
+        dest = tk.Frame(body, bg=t["bg_card"])
+        dest.grid(row=5, column=1, sticky="w")
+        for value, text in (("zip", "Archive ZIP"), ("dir", "Dossier")):
+            tk.Radiobutton(dest, text=text, value=value, variable=self._dest_var,
+                           font=("Segoe UI", 9), fg=t["text_primary"],
+                           bg=t["bg_card"], selectcolor=t["bg"],
+                           activebackground=t["bg_card"]).pack(side="left")
+
+        self._progress = ttk.Progressbar(body, mode="determinate", length=300)
+        self._progress.grid(row=6, column=0, columnspan=2, sticky="we", pady=(8, 2))
+        self._lbl_status = tk.Label(body, text="", font=("Segoe UI", 9),
+                                    fg=t["text_dim"], bg=t["bg_card"])
+        self._lbl_status.grid(row=7, column=0, columnspan=2, sticky="w")
+
+        bbar = tk.Frame(self, bg=t["bg"])
+        bbar.pack(fill="x", padx=10, pady=(0, 10))
+        self._btn_start = tk.Button(bbar, text="EXPORTER", font=("Segoe UI", 10, "bold"),
+                                    fg=t["text_primary"], bg=t["accent_teal"],
+                                    activebackground=t["accent_blue"],
+                                    relief="flat", cursor="hand2", padx=14, pady=4,
+                                    command=self._start)
+        self._btn_start.pack(side="left")
+        self._btn_cancel = tk.Button(bbar, text="ANNULER", font=("Segoe UI", 10, "bold"),
+                                     fg=t["text_primary"], bg=t["accent_red"],
+                                     activebackground=t["accent_amber"],
+                                     relief="flat", cursor="hand2", padx=14, pady=4,
+                                     state="disabled", command=self._cancel)
+        self._btn_cancel.pack(side="right")
+
+    def _date(self, var):
+        value = var.get().strip()
+        if value:
+            datetime.strptime(value, "%Y-%m-%d")
+        return value or None
+
+    def _start(self):
+        try:
+            date_from = self._date(self._from_var)
+            date_to = self._date(self._to_var)
+        except ValueError:
+            messagebox.showwarning("Export", "Date invalide (AAAA-MM-JJ).", parent=self)
+            return
+        sids = select_sessions(self._user_id, self._platform_id, date_from, date_to)
+        if not sids:
+            messagebox.showwarning("Export", "Aucune session pour ce filtre.", parent=self)
+            return
+        fmt = self._fmt_var.get()
+        if self._dest_var.get() == "zip":
+            output = filedialog.asksaveasfilename(
+                parent=self, title="Archive d'export",
+                defaultextension=".zip", initialfile=f"sessions_{fmt}.zip",
+                filetypes=[("Archive ZIP", "*.zip")])
+        else:
+            output = filedialog.askdirectory(parent=self, title="Dossier d'export")
+        if not output:
+            return
+        self._job = BatchExport(sids, fmt, output).start()
+        self._progress.configure(maximum=len(sids), value=0)
+        self._btn_start.configure(state="disabled")
+        self._btn_cancel.configure(state="normal")
+        self._poll()
+
+    def _poll(self):
+        p = self._job.progress()
+        self._progress.configure(value=p["done"])
+        self._lbl_status.configure(text=f"{p['done']} / {p['total']} session(s)")
+        if not self._job.finished:
+            self.after(200, self._poll)
+            return
+        self._btn_start.configure(state="normal")
+        self._btn_cancel.configure(state="disabled")
+        if p["state"] == "done":
+            msg = f"{p['done'] - p['failed'] - p['skipped']} session(s) exportee(s) :\n{p['output']}"
+            if p["failed"]:
+                msg += f"\n{p['failed']} echec(s)"
+            messagebox.showinfo("Export", msg, parent=self)
+        elif p["state"] == "cancelled":
+            self._lbl_status.configure(text="Export annule")
+        else:
+            messagebox.showerror("Erreur", f"Export echoue : {p['error']}", parent=self)
+
+    def _cancel(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._lbl_status.configure(text="Annulation...")
+
+    def destroy(self):
+        if self._job is not None and not self._job.finished:
+            self._job.cancel()
+        super().destroy()
+
+
 # ============================================================
 #  Replay Viewer
 # ============================================================
@@ -296,6 +427,10 @@ SENSOR_NAMES = ["Haut-Droit", "Haut-Gauche", "Bas-Droit", "Bas-Gauche"]
 class ReplayViewer(tk.Toplevel):
     """Replay a recorded session with animated board."""
 
+    FRAME_MS = 16  # display period while playing (~60 fps)
+    POLL_MS = 50  # loader queue polling period
+    OVERVIEW_POINTS = 800
+
     def __init__(self, master, session_id: int, themes: dict, current_theme: str):
         super().__init__(master)
         self._themes = themes
@@ -309,12 +444,20 @@ class ReplayViewer(tk.Toplevel):
             return
 
         self._session = session
-        self._samples = db.get_samples(session_id)
-        if not self._samples:
+        self._total = db.count_samples(session_id)
+        if not self._total:
             messagebox.showinfo("Vide", "Aucun echantillon dans cette session",
                                parent=self)
             self.destroy()
             return
+        # Filled by _poll_loader from the loader thread, in time order
+        self._samples = []
+        self._times = []  # t_ms, for bisect
+        self._overview = None
+        self._loaded = False
+        self._closing = False
+        self._load_queue = queue.Queue()
+        self._poll_id = None
 
         self.title(f"Relecture — Session #{session_id}")
         self.geometry("1000x700")
@@ -326,8 +469,12 @@ class ReplayViewer(tk.Toplevel):
         self._playing = False
         self._frame_idx = 0
         self._speed = 1.0
-        self._trail = []
+        # Playback clock: session time clock_ms was on screen at clock_t0
+        # (perf_counter seconds); frames show the sample at clock time
+        self._clock_t0 = 0.0
+        self._clock_ms = 0
         self.TRAIL_LENGTH = 15
+        self._trail = deque(maxlen=self.TRAIL_LENGTH)
         self._after_id = None
 
         self._board_w_cm = session.get("board_width_cm") or 50
@@ -348,7 +495,9 @@ class ReplayViewer(tk.Toplevel):
 
         self._build_ui(t)
         self._draw_board()
-        self._show_frame(0)
+        threading.Thread(target=self._load_overview, daemon=True).start()
+        threading.Thread(target=self._load_samples, daemon=True).start()
+        self._poll_id = self.after(self.POLL_MS, self._poll_loader)
 
     def _build_ui(self, t):
         # ── Info bar ─────────────────────────────────────────
@@ -358,7 +507,7 @@ class ReplayViewer(tk.Toplevel):
         user_name = self._session.get("user_name", "?")
         plat_name = self._session.get("platform_name", "?")
         date_str  = self._session.get("started_at", "")
-        n_samples = len(self._samples)
+        n_samples = self._total
         dur = self._session.get("duration_sec") or 0
 
         tk.Label(info, text=f"Session #{self._session_id}",
@@ -413,15 +562,56 @@ class ReplayViewer(tk.Toplevel):
                                      fg=t["text_secondary"], bg=t["bg"])
         self._time_label.pack(pady=(4, 0))
 
-        self._frame_label = tk.Label(left, text=f"0 / {len(self._samples)}",
+        self._frame_label = tk.Label(left, text=f"0 / {self._total}",
                                       font=("Segoe UI", 9),
                                       fg=t["text_dim"], bg=t["bg"])
         self._frame_label.pack(pady=(2, 0))
 
-        # Right: canvas
-        self._canvas = tk.Canvas(main, bg=t["bg_canvas"], highlightthickness=1,
+        self._load_label = tk.Label(left, text="Chargement...",
+                                     font=("Segoe UI", 9),
+                                     fg=t["accent_amber"], bg=t["bg"])
+        self._load_label.pack(pady=(8, 0))
+
+        # Right: canvas + overview strip
+        right = tk.Frame(main, bg=t["bg"])
+        right.pack(side="right", fill="both", expand=True)
+
+        self._canvas = tk.Canvas(right, bg=t["bg_canvas"], highlightthickness=1,
                                   highlightbackground=t["board_outline"])
-        self._canvas.pack(side="right", fill="both", expand=True)
+        self._canvas.pack(fill="both", expand=True)
+
+        # CoM X / Y envelope of the whole session, loaded part and playhead;
+        # click or drag to seek (within the loaded part)
+        self._strip = tk.Canvas(right, height=40, bg=t["bg_canvas"],
+                                 highlightthickness=1,
+                                 highlightbackground=t["board_outline"],
+                                 cursor="hand2")
+        self._strip.pack(fill="x", pady=(4, 0))
+        self._strip_head = self._strip.create_line(0, 0, 0, 0,
+                                                    fill=t["text_primary"])
+        self._strip_loaded = self._strip.create_line(0, 0, 0, 0,
+                                                      fill=t["accent_teal"],
+                                                      width=3)
+        self._strip.bind("<Configure>", lambda e: self._draw_strip())
+        self._strip.bind("<Button-1>", self._on_strip_click)
+        self._strip.bind("<B1-Motion>", self._on_strip_click)
+
+        # Trail: a fixed pool of dots (oldest first), created once with
+        # their faded colour and size; frames only move and show/hide them
+        bg_rgb = _hex_to_rgb(t["bg_canvas"])
+        cr_rgb = _hex_to_rgb(t["cross_color"])
+        self._trail_items = []
+        self._trail_sizes = []
+        for ti in range(self.TRAIL_LENGTH - 1):
+            alpha = ti / self.TRAIL_LENGTH
+            r = int(bg_rgb[0] + (cr_rgb[0] - bg_rgb[0]) * alpha)
+            g = int(bg_rgb[1] + (cr_rgb[1] - bg_rgb[1]) * alpha)
+            b = int(bg_rgb[2] + (cr_rgb[2] - bg_rgb[2]) * alpha)
+            self._trail_items.append(self._canvas.create_oval(
+                0, 0, 0, 0, fill=f"#{r:02x}{g:02x}{b:02x}", outline="",
+                state="hidden", tags="trail"))
+            self._trail_sizes.append(1.5 + alpha * 3)
+        self._trail_shown = 0
 
         self._com_h = self._canvas.create_line(0, 0, 0, 0,
                                                 fill=t["cross_color"], width=2)
@@ -453,7 +643,7 @@ class ReplayViewer(tk.Toplevel):
 
         # Speed buttons
         for spd, label in [(0.25, "0.25x"), (0.5, "0.5x"), (1.0, "1x"),
-                           (2.0, "2x"), (4.0, "4x")]:
+                           (2.0, "2x"), (4.0, "4x"), (8.0, "8x")]:
             b = tk.Button(ctrl, text=label, font=("Segoe UI", 9),
                           fg=t["text_secondary"], bg=t["tare_bg"],
                           activebackground=t["tare_hover"],
@@ -476,9 +666,16 @@ class ReplayViewer(tk.Toplevel):
                             command=lambda: self._export("txt"))
         btn_txt.pack(side="left", padx=2)
 
+        btn_npz = tk.Button(ctrl, text="NPZ", font=("Segoe UI", 9),
+                            fg=t["text_secondary"], bg=t["tare_bg"],
+                            activebackground=t["tare_hover"],
+                            relief="flat", cursor="hand2", padx=6,
+                            command=lambda: self._export("npz"))
+        btn_npz.pack(side="left", padx=2)
+
         # Slider
         self._slider_var = tk.IntVar(value=0)
-        self._slider = tk.Scale(ctrl, from_=0, to=max(0, len(self._samples) - 1),
+        self._slider = tk.Scale(ctrl, from_=0, to=max(0, self._total - 1),
                                  orient="horizontal", variable=self._slider_var,
                                  showvalue=False, bg=t["bg_card"], fg=t["text_primary"],
                                  troughcolor=t["bg"], highlightthickness=0,
@@ -564,10 +761,121 @@ class ReplayViewer(tk.Toplevel):
             c.create_text(sx, sy, text=str(idx + 1), fill="white",
                           font=("Segoe UI", 8, "bold"), tags="board_static")
 
+        c.tag_raise("trail")
         c.tag_raise(self._com_h)
         c.tag_raise(self._com_v)
         c.tag_raise(self._com_lbl)
 
+    # ── Background loading ───────────────────────────────────
+
+    def _load_overview(self):
+        """Loader thread: overview strip data (the pyramid may have to be
+        built for old sessions, so it does not hold up the samples)."""
+        try:
+            self._load_queue.put(("overview", db.get_overview(
+                self._session_id, points=self.OVERVIEW_POINTS)))
+        except Exception as e:
+            print(f"[REPLAY] overview error: {e}")
+        finally:
+            db.close_connection()
+
+    def _load_samples(self):
+        """Loader thread: the samples batch by batch, in time order, handed
+        to the Tk thread through _load_queue."""
+        try:
+            for batch in db.iter_sample_batches(self._session_id):
+                if self._closing:
+                    return
+                self._load_queue.put(("batch", batch))
+            self._load_queue.put(("done", None))
+        except Exception as e:
+            print(f"[REPLAY] load error: {e}")
+            self._load_queue.put(("error", str(e)))
+        finally:
+            db.close_connection()
+
+    def _poll_loader(self):
+        self._poll_id = None
+        first = not self._samples
+        while True:
+            try:
+                kind, data = self._load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "overview":
+                self._overview = data
+                self._draw_strip()
+            elif kind == "batch":
+                self._samples.extend(data)
+                self._times.extend(s[0] for s in data)
+            elif kind == "done":
+                self._loaded = True
+                self._total = len(self._samples)
+                self._slider.config(to=max(0, self._total - 1))
+            else:
+                self._loaded = True
+                self._load_label.config(text=f"Erreur de chargement : {data}")
+                return
+        if first and self._samples:
+            self._show_frame(0)
+        self._move_loaded_bar()
+        if self._loaded:
+            self._load_label.config(text="")
+        else:
+            pct = len(self._samples) * 100 // max(1, self._total)
+            self._load_label.config(text=f"Chargement... {pct} %")
+            self._poll_id = self.after(self.POLL_MS, self._poll_loader)
+
+    # ── Overview strip ───────────────────────────────────────
+
+    def _strip_x(self, t_ms) -> float:
+        ov = self._overview
+        t0, t1 = ov["t_start"][0], ov["t_end"][-1]
+        w = self._strip.winfo_width()
+        return (t_ms - t0) / max(1, t1 - t0) * (w - 1)
+
+    def _draw_strip(self):
+        t = self._themes[self._theme]
+        c = self._strip
+        c.delete("envelope")
+        if not self._overview or not self._overview["n"]:
+            return
+        ov = self._overview
+        h = c.winfo_height()
+        xs = [self._strip_x(ts) for ts in ov["t_start"]]
+        for col, color in (("com_x", t["sensor_colors"][0]),
+                           ("com_y", t["sensor_colors"][3])):
+            upper = [(x, h / 2 - v * h / 2) for x, v in zip(xs, ov["max"][col])]
+            lower = [(x, h / 2 - v * h / 2) for x, v in zip(xs, ov["min"][col])]
+            pts = upper + lower[::-1]
+            if len(pts) >= 3:
+                c.create_polygon(*[v for p in pts for v in p], fill="",
+                                 outline=color, tags="envelope")
+        c.tag_raise(self._strip_loaded)
+        c.tag_raise(self._strip_head)
+        self._move_loaded_bar()
+        if self._samples:
+            self._move_playhead(self._times[self._frame_idx])
+
+    def _move_playhead(self, t_ms):
+        if self._overview and self._overview["n"]:
+            x = self._strip_x(t_ms)
+            self._strip.coords(self._strip_head, x, 0, x, self._strip.winfo_height())
+
+    def _move_loaded_bar(self):
+        if self._overview and self._overview["n"] and self._times:
+            h = self._strip.winfo_height() - 2
+            x = self._strip.winfo_width() if self._loaded else self._strip_x(self._times[-1])
+            self._strip.coords(self._strip_loaded, 0, h, x, h)
+
+    def _on_strip_click(self, event):
+        if not self._overview or not self._overview["n"] or not self._times:
+            return
+        ov = self._overview
+        t0, t1 = ov["t_start"][0], ov["t_end"][-1]
+        t_ms = t0 + event.x / max(1, self._strip.winfo_width() - 1) * (t1 - t0)
+        self._seek(max(0, bisect_right(self._times, t_ms) - 1))
+
     # ── Playback ─────────────────────────────────────────────
 
     def _show_frame(self, idx):
@@ -577,7 +885,6 @@ class ReplayViewer(tk.Toplevel):
         self._slider_var.set(idx)
 
         t_ms, w0, w1, w2, w3, com_x, com_y = self._samples[idx]
-        t = self._themes[self._theme]
 
         weights = [w0, w1, w2, w3]
         total = sum(weights)
@@ -586,7 +893,8 @@ class ReplayViewer(tk.Toplevel):
             self._weight_labels[i].config(text=f"{weights[i]/1000:.3f} kg")
         self._total_label.config(text=f"{total/1000:.3f} kg")
         self._time_label.config(text=f"{t_ms / 1000:.3f} s")
-        self._frame_label.config(text=f"{idx + 1} / {len(self._samples)}")
+        self._frame_label.config(text=f"{idx + 1} / {self._total}")
+        self._move_playhead(t_ms)
         self._coord_label.config(text=f"X: {com_x*100:+.1f}%   Y: {com_y*100:+.1f}%")
 
         # Canvas sensor values
@@ -605,33 +913,26 @@ class ReplayViewer(tk.Toplevel):
             else:
                 x_pos, y_pos = self._bcx, self._bcy
 
-            # Trail
+            # Trail (every point but the current one, oldest first)
             self._trail.append((x_pos, y_pos))
-            if len(self._trail) > self.TRAIL_LENGTH:
-                self._trail = self._trail[-self.TRAIL_LENGTH:]
-
-            self._canvas.delete("trail")
-            bg_rgb = _hex_to_rgb(t["bg_canvas"])
-            cr_rgb = _hex_to_rgb(t["cross_color"])
-            for ti, (tx, ty) in enumerate(self._trail[:-1]):
-                alpha = ti / self.TRAIL_LENGTH
-                r = int(bg_rgb[0] + (cr_rgb[0] - bg_rgb[0]) * alpha)
-                g = int(bg_rgb[1] + (cr_rgb[1] - bg_rgb[1]) * alpha)
-                b = int(bg_rgb[2] + (cr_rgb[2] - bg_rgb[2]) * alpha)
-                sz = 1.5 + alpha * 3
-                self._canvas.create_oval(tx - sz, ty - sz, tx + sz, ty + sz,
-                                         fill=f"#{r:02x}{g:02x}{b:02x}",
-                                         outline="", tags="trail")
+            c = self._canvas
+            shown = len(self._trail) - 1
+            for item, sz, (tx, ty) in zip(self._trail_items, self._trail_sizes,
+                                          self._trail):
+                c.coords(item, tx - sz, ty - sz, tx + sz, ty + sz)
+            if shown != self._trail_shown:
+                for ti in range(min(shown, self._trail_shown),
+                                max(shown, self._trail_shown)):
+                    c.itemconfigure(self._trail_items[ti],
+                                    state="normal" if ti < shown else "hidden")
+                self._trail_shown = shown
 
             cross_sz = 14
-            self._canvas.coords(self._com_h, x_pos - cross_sz, y_pos,
-                                x_pos + cross_sz, y_pos)
-            self._canvas.coords(self._com_v, x_pos, y_pos - cross_sz,
-                                x_pos, y_pos + cross_sz)
-            self._canvas.coords(self._com_lbl, x_pos, y_pos - cross_sz - 10)
-            self._canvas.tag_raise(self._com_h)
-            self._canvas.tag_raise(self._com_v)
-            self._canvas.tag_raise(self._com_lbl)
+            c.coords(self._com_h, x_pos - cross_sz, y_pos,
+                     x_pos + cross_sz, y_pos)
+            c.coords(self._com_v, x_pos, y_pos - cross_sz,
+                     x_pos, y_pos + cross_sz)
+            c.coords(self._com_lbl, x_pos, y_pos - cross_sz - 10)
 
     def _toggle_play(self):
         t = self._themes[self._theme]
@@ -642,47 +943,67 @@ class ReplayViewer(tk.Toplevel):
                 self.after_cancel(self._after_id)
                 self._after_id = None
         else:
-            if self._frame_idx >= len(self._samples) - 1:
+            if not self._samples:
+                return
+            if self._loaded and self._frame_idx >= len(self._samples) - 1:
                 self._frame_idx = 0
-                self._trail = []
+                self._trail.clear()
             self._playing = True
             self._btn_play.config(text="PAUSE", bg=t["accent_amber"])
-            self._play_step()
+            self._show_frame(self._frame_idx)
+            self._reset_clock()
+            self._after_id = self.after(self.FRAME_MS, self._play_step)
+
+    def _reset_clock(self):
+        """Anchor the playback clock on the frame on screen."""
+        self._clock_t0 = time.perf_counter()
+        self._clock_ms = self._times[self._frame_idx]
+
+    def _clock_now(self) -> float:
+        return self._clock_ms + (time.perf_counter() - self._clock_t0) * 1000 * self._speed
 
     def _play_step(self):
+        """One display tick: show the latest sample at or before the
+        clock time (samples in between are skipped)."""
+        self._after_id = None
         if not self._playing:
             return
-        if self._frame_idx >= len(self._samples) - 1:
+        idx = max(0, bisect_right(self._times, self._clock_now()) - 1)
+        last = len(self._samples) - 1
+        if idx >= last and not self._loaded:
+            # Caught up with the loader: hold the clock until more arrives
+            idx = last
+            if idx != self._frame_idx:
+                self._show_frame(idx)
+            self._reset_clock()
+        elif idx != self._frame_idx:
+            self._show_frame(min(idx, last))
+        if idx >= last and self._loaded:
             self._playing = False
             t = self._themes[self._theme]
             self._btn_play.config(text="PLAY", bg=t["accent_green"])
             return
-
-        self._show_frame(self._frame_idx)
-
-        # Calculate delay based on actual sample timing
-        curr_t = self._samples[self._frame_idx][0]
-        next_idx = self._frame_idx + 1
-        if next_idx < len(self._samples):
-            next_t = self._samples[next_idx][0]
-            delay_ms = max(1, int((next_t - curr_t) / self._speed))
-        else:
-            delay_ms = 16
-
-        self._frame_idx += 1
-        self._after_id = self.after(delay_ms, self._play_step)
+        self._after_id = self.after(self.FRAME_MS, self._play_step)
 
     def _set_speed(self, speed):
+        if self._playing:
+            self._clock_ms = self._clock_now()
+            self._clock_t0 = time.perf_counter()
         self._speed = speed
 
     def _seek(self, idx):
-        self._trail = []
-        self._show_frame(int(idx))
+        if not self._samples:
+            return
+        self._trail.clear()
+        self._show_frame(min(int(idx), len(self._samples) - 1))
+        if self._playing:
+            self._reset_clock()
 
     def _on_slider(self, val):
-        if not self._playing:
-            self._trail = []
-            self._show_frame(int(val))
+        if not self._playing and self._samples:
+            # Only the loaded part can be shown: the slider snaps back to it
+            self._trail.clear()
+            self._show_frame(min(int(val), len(self._samples) - 1))
 
     def _export(self, fmt: str):
         sid = self._session_id
@@ -692,6 +1013,12 @@ class ReplayViewer(tk.Toplevel):
                 defaultextension=".csv",
                 initialfile=f"session_{sid}.csv",
                 filetypes=[("CSV (point-virgule)", "*.csv"), ("Tous", "*.*")])
+        elif fmt == "npz":
+            filepath = filedialog.asksaveasfilename(
+                parent=self, title="Exporter en NPZ",
+                defaultextension=".npz",
+                initialfile=f"session_{sid}.npz",
+                filetypes=[("NumPy NPZ", "*.npz"), ("Tous", "*.*")])
         else:
             filepath = filedialog.asksaveasfilename(
                 parent=self, title="Exporter en TXT",
@@ -700,7 +1027,12 @@ class ReplayViewer(tk.Toplevel):
                 filetypes=[("Fichier texte", "*.txt"), ("Tous", "*.*")])
         if not filepath:
             return
-        ok = export_session_csv(sid, filepath) if fmt == "csv" else export_session_txt(sid, filepath)
+        if fmt == "csv":
+            ok = export_session_csv(sid, filepath)
+        elif fmt == "npz":
+            ok = export_session_npz(sid, filepath)
+        else:
+            ok = export_session_txt(sid, filepath)
         if ok:
             messagebox.showinfo("Export", f"Session #{sid} exportee :\n{filepath}",
                                 parent=self)
@@ -709,8 +1041,11 @@ class ReplayViewer(tk.Toplevel):
 
     def destroy(self):
         self._playing = False
-        if self._after_id:
+        self._closing = True
+        if getattr(self, "_after_id", None):
             self.after_cancel(self._after_id)
+        if getattr(self, "_poll_id", None):
+            self.after_cancel(self._poll_id)
         super().destroy()
 
 
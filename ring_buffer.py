@@ -0,0 +1,132 @@
+# ============================================================
+#  ring_buffer.py — Single-producer sample ring, many readers
+# ============================================================
+RING_CAPACITY = 8192   # samples kept (~100 s at 80 Hz)
+SAMPLE_WIDTH = 5       # t (s, epoch), w0, w1, w2, w3
+HEADER = 16            # write index (int64) + capacity (int64)
+
+
+class SampleRing:
+    """Preallocated ring of fixed-width float64 samples.
+
+    One producer appends with push(); the write index only grows (slot =
+    index % capacity) and is published after the slot is filled, so
+    readers never see a half-written sample. Readers keep their own
+    cursor (RingReader) and take no lock: a reader that was lapped
+    detects it from the write index and skips what was overwritten.
+
+    The ring lives in one flat buffer (header + samples): a bytearray by
+    default, or any writable buffer of nbytes(capacity, width) bytes."""
+
+    def __init__(self, capacity: int = RING_CAPACITY, width: int = SAMPLE_WIDTH,
+                 buf=None):
+        size = self.nbytes(capacity, width)
+        if buf is None:
+            buf = bytearray(size)
+        self._buf = buf  # keeps the memory alive
+        self._mv = mv = memoryview(buf)
+        self._head = mv[:HEADER].cast("q")
+        self._data = mv[HEADER:size].cast("d")
+        self.capacity = capacity
+        self.width = width
+        if self._head[1] == 0:
+            self._head[1] = capacity
+        elif self._head[1] != capacity:
+            raise ValueError("ring buffer was created with another capacity")
+
+    @staticmethod
+    def nbytes(capacity: int = RING_CAPACITY, width: int = SAMPLE_WIDTH) -> int:
+        return HEADER + capacity * width * 8
+
+    def close(self):
+        """Release the views on the buffer (shared memory can only be
+        closed once nothing points into it). The ring is unusable after."""
+        self._head.release()
+        self._data.release()
+        self._mv.release()
+
+    @property
+    def write_index(self) -> int:
+        """Samples pushed so far."""
+        return self._head[0]
+
+    def push(self, row):
+        """Append one sample (producer only)."""
+        head = self._head
+        i = head[0]
+        w = self.width
+        base = (i % self.capacity) * w
+        data = self._data
+        for k in range(w):
+            data[base + k] = row[k]
+        head[0] = i + 1
+
+    def _rows(self, start: int, end: int) -> list:
+        cap, w = self.capacity, self.width
+        s, e = start % cap, end % cap
+        if end - start == 0:
+            return []
+        if s < e:
+            flat = self._data[s * w:e * w].tolist()
+        else:  # wraps around
+            flat = self._data[s * w:].tolist() + self._data[:e * w].tolist()
+        return [tuple(flat[k:k + w]) for k in range(0, len(flat), w)]
+
+    def latest(self):
+        """Last sample pushed (tuple), None while empty."""
+        while True:
+            i = self._head[0] - 1
+            if i < 0:
+                return None
+            row = self._rows(i, i + 1)[0]
+            if self._head[0] - self.capacity < i:
+                return row
+
+    def rate(self, n: int = 50) -> float:
+        """Samples per second over the last n samples (column 0 = time)."""
+        end = self._head[0]
+        n = min(n, end, self.capacity - 1)
+        if n < 2:
+            return 0.0
+        span = self._data[((end - 1) % self.capacity) * self.width] - \
+            self._data[((end - n) % self.capacity) * self.width]
+        return (n - 1) / span if span > 0 else 0.0
+
+    def reader(self, from_start: bool = False) -> "RingReader":
+        """New reader at the live edge (or at the oldest kept sample)."""
+        end = self._head[0]
+        return RingReader(self, max(0, end - self.capacity) if from_start else end)
+
+
+class RingReader:
+    """One consumer's cursor into a SampleRing."""
+
+    def __init__(self, ring: SampleRing, cursor: int):
+        self._ring = ring
+        self.cursor = cursor
+        self.dropped = 0  # samples overwritten before this reader got them
+
+    @property
+    def pending(self) -> int:
+        return self._ring._head[0] - self.cursor
+
+    def read(self, max_n: int = None) -> list:
+        """Samples pushed since the last read, oldest first (tuples)."""
+        ring = self._ring
+        cap = ring.capacity
+        end = ring._head[0]
+        start = self.cursor
+        if end - start > cap:
+            self.dropped += end - start - cap
+            start = end - cap
+        if max_n is not None and end - start > max_n:
+            end = start + max_n
+        rows = ring._rows(start, end)
+        # Slot i is reused once the producer starts on index i + cap
+        lost = ring._head[0] - cap - start + 1
+        if lost > 0:
+            lost = min(lost, len(rows))
+            del rows[:lost]
+            self.dropped += lost
+        self.cursor = end
+        return rows
@@ -0,0 +1,365 @@
+# ============================================================
+#  serial_ingest.py — Bulk serial reads + fast line / frame parsing
+# ============================================================
+import binascii
+import json
+import math
+import struct
+import time
+
+MAX_LINE = 4096  # longer garbage without a newline is dropped
+MAX_STATUS = 512  # a status line inside a binary stream is shorter than this
+
+# ── Binary frames ───────────────────────────────────────────
+# Little-endian, 26 bytes (a JSON sample line is ~70):
+#   A5 5A | seq u16 | t_us u32 | w1 w2 w3 w4 int32 (g) | crc u16
+# crc = CRC-16/CCITT-FALSE (binascii.crc_hqx, init 0xFFFF) of seq..w4.
+# Asked for with BINARY_REQUEST; a device that supports it answers
+# {"status": "binary_ok"} and sends frames from the next byte on
+# (status replies stay JSON lines). Without that answer the port stays
+# in JSON mode. JSON_REQUEST switches the device back before the port is
+# closed; a device left in binary mode anyway (crash, BT drop) is still
+# recognised: by probe(), and by a JSON-mode reader that meets a frame.
+FRAME_SYNC = b"\xa5\x5a"
+_FRAME = struct.Struct("<2sHI4iH")
+FRAME_SIZE = _FRAME.size
+BINARY_VERSION = 1
+BINARY_REQUEST = {"cmd": "binary", "version": BINARY_VERSION}
+BINARY_ACK = "binary_ok"
+JSON_REQUEST = {"cmd": "json"}
+PROBE_BUFFER = 4 * MAX_LINE  # bytes kept while probing a port
+RESYNC_S = 0.5  # device clock re-anchored when it drifts this far from ours
+MAX_FRAME_HZ = 1000  # no device sends faster: a bigger seq jump is a restart
+
+# Fast path for the sample line the ESP32 sends, in this exact key order:
+# {"weight1": 1234, "weight2": 5678, "weight3": 9012, "weight4": 3456}
+_SAMPLE_PREFIX = b'{"weight1":'
+
+
+def _parse_sample(line: bytes):
+    """(w1, w2, w3, w4) of a standard sample line, None if it is not one."""
+    if not (line.startswith(_SAMPLE_PREFIX) and line.endswith(b"}")):
+        return None
+    try:
+        w1, f2, f3, f4 = line[len(_SAMPLE_PREFIX):-1].split(b",")
+        k2, _, w2 = f2.partition(b":")
+        k3, _, w3 = f3.partition(b":")
+        k4, _, w4 = f4.partition(b":")
+        if (k2.strip() != b'"weight2"' or k3.strip() != b'"weight3"'
+                or k4.strip() != b'"weight4"'):
+            return None
+        weights = float(w1), float(w2), float(w3), float(w4)
+    except ValueError:
+        return None
+    return weights if math.isfinite(sum(weights)) else None
+
+
+def encode_frame(seq: int, t_us: int, weights) -> bytes:
+    """One binary frame (what the firmware sends; used for tests/sims)."""
+    body = struct.pack("<HI4i", seq & 0xFFFF, t_us & 0xFFFFFFFF,
+                       *(int(round(w)) for w in weights))
+    return FRAME_SYNC + body + struct.pack(
+        "<H", binascii.crc_hqx(body, 0xFFFF))
+
+
+def find_frame(buf) -> int:
+    """Offset of the first CRC-valid frame in buf, -1 if there is none."""
+    i = buf.find(FRAME_SYNC)
+    while 0 <= i <= len(buf) - FRAME_SIZE:
+        if binascii.crc_hqx(buf[i + 2:i + FRAME_SIZE - 2], 0xFFFF) == \
+                _FRAME.unpack_from(buf, i)[-1]:
+            return i
+        i = buf.find(FRAME_SYNC, i + 1)
+    return -1
+
+
+def parse_line(line: bytes):
+    """Parse one line (without its newline).
+
+    Returns ("w", (w1, w2, w3, w4)) for a sample, ("status", dict) for
+    a status message, or None for anything else."""
+    weights = _parse_sample(line)
+    if weights is not None:
+        return "w", weights
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    if "weight1" in data:  # same sample, other key order / spacing
+        try:
+            return "w", tuple(float(data[k]) for k in
+                              ("weight1", "weight2", "weight3", "weight4"))
+        except (KeyError, TypeError, ValueError):
+            return None
+    if "status" in data:
+        return "status", data
+    return None
+
+
+class IngestStats:
+    """Counters of one LineReader.
+
+    rate: messages (lines + frames) received per second (wall clock);
+    capacity: messages the parser could handle per second (messages /
+    time spent splitting and parsing), i.e. the ceiling of this ingest
+    path on this machine. In binary mode `dropped` is the exact number
+    of samples lost on the way (sequence gaps), `crc_errors` the frames
+    rejected by their CRC."""
+
+    WINDOW = 2.0  # seconds of history behind `rate`
+
+    def __init__(self):
+        self.lines = 0
+        self.frames = 0
+        self.bad = 0
+        self.dropped = 0
+        self.crc_errors = 0
+        self.parse_s = 0.0
+        self.rate = 0.0
+        self._mark_t = time.perf_counter()
+        self._mark_lines = 0
+
+    @property
+    def capacity(self) -> float:
+        return self.received / self.parse_s if self.parse_s > 0 else 0.0
+
+    @property
+    def received(self) -> int:
+        return self.lines + self.frames
+
+    def _tick(self, now):
+        span = now - self._mark_t
+        if span >= self.WINDOW:
+            self.rate = (self.received - self._mark_lines) / span
+            self._mark_t = now
+            self._mark_lines = self.received
+
+
+class LineReader:
+    """Reads everything the port has buffered in one call and splits it
+    into lines (JSON mode) or frames (binary mode, see FRAME_SYNC) inside
+    one reusable buffer."""
+
+    def __init__(self, port):
+        self.port = port
+        self.stats = IngestStats()
+        self.binary = False
+        self._buf = bytearray()
+        self._seq = None     # last frame sequence number
+        self._t_us = 0       # last device timestamp (wraps at 2**32)
+        self._dev_s = 0.0    # unwrapped device time, seconds
+        self._t_anchor = None  # host time of device time 0
+
+    def _fill(self) -> bool:
+        """Append what the port has to the buffer (blocks up to the port
+        timeout while nothing has arrived)."""
+        port = self.port
+        waiting = port.in_waiting
+        data = port.read(waiting if waiting else 1)
+        if not data:
+            return False
+        if not waiting and port.in_waiting:
+            data += port.read(port.in_waiting)
+        self._buf += data
+        return True
+
+    def _take_lines(self) -> list:
+        buf = self._buf
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if len(buf) > MAX_LINE:
+                del buf[:]
+            return []
+        lines = bytes(buf[:end]).replace(b"\r", b"").split(b"\n")
+        del buf[:end + 1]
+        return [ln for ln in lines if ln]
+
+    def read_lines(self) -> list:
+        """Complete lines available now (JSON mode). Lines are stripped
+        of CR/LF."""
+        if not self._fill():
+            return []
+        t0 = time.perf_counter()
+        lines = self._take_lines()
+        self.stats.parse_s += time.perf_counter() - t0
+        return lines
+
+    def read_messages(self) -> list:
+        """Messages available now: ("w", (w1, w2, w3, w4), t) for a sample,
+        with t its host time from the device clock (binary mode) or None,
+        and ("status", dict, None) for a status message."""
+        if not self._fill():
+            return []
+        t0 = time.perf_counter()
+        out = []
+        if not self.binary:
+            self._parse_lines(out)
+        if self.binary:
+            self._parse_frames(out, time.time())
+        now = time.perf_counter()
+        st = self.stats
+        st.parse_s += now - t0
+        st._tick(now)
+        return out
+
+    def _parse_lines(self, out: list):
+        st = self.stats
+        buf = self._buf
+        if FRAME_SYNC in buf:  # never in JSON text
+            k = find_frame(buf)
+            if k >= 0:
+                # Device still in binary mode (earlier connection)
+                del buf[:k]
+                self.binary = True
+                return
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if len(buf) > MAX_LINE:
+                del buf[:]
+            return
+        used = 0
+        for line in bytes(buf[:end]).split(b"\n"):
+            used += len(line) + 1
+            line = line.rstrip(b"\r")
+            if not line:
+                continue
+            st.lines += 1
+            msg = parse_line(line)
+            if msg is None:
+                st.bad += 1
+                continue
+            kind, data = msg
+            out.append((kind, data, None))
+            if kind == "status" and data.get("status") == BINARY_ACK:
+                # Frames start right after this line
+                self.binary = True
+                break
+        del buf[:used]
+
+    def _parse_frames(self, out: list, now: float):
+        """Frames (and the odd JSON status line) at the head of the
+        buffer; resynchronises on the next sync / '{' after garbage."""
+        st = self.stats
+        buf = self._buf
+        n = len(buf)
+        i = 0
+        while i < n:
+            head = buf[i]
+            if head == 0xA5 and buf[i + 1:i + 2] in (b"\x5a", b""):
+                if n - i < FRAME_SIZE:
+                    break
+                _, seq, t_us, w1, w2, w3, w4, crc = _FRAME.unpack_from(buf, i)
+                if binascii.crc_hqx(buf[i + 2:i + FRAME_SIZE - 2], 0xFFFF) != crc:
+                    st.crc_errors += 1
+                    i += 1
+                    continue
+                i += FRAME_SIZE
+                st.frames += 1
+                if self._seq is not None:
+                    gap = (seq - self._seq) & 0xFFFF
+                    dt_us = (t_us - self._t_us) & 0xFFFFFFFF
+                    if (dt_us >= 1 << 31
+                            or gap - 1 > dt_us * MAX_FRAME_HZ / 1e6 + 1):
+                        # Clock went back, or more frames missing than the
+                        # device can send meanwhile: it restarted, new
+                        # sequence and clock (nothing was lost)
+                        self._t_anchor = None
+                        self._dev_s = 0.0
+                    elif gap == 0:
+                        continue  # repeated frame
+                    else:
+                        st.dropped += gap - 1
+                self._seq = seq
+                out.append(("w", (w1, w2, w3, w4), self._host_time(t_us, now)))
+                continue
+            if head == 0x7B:  # '{': JSON line between frames
+                end = buf.find(b"\n", i, i + MAX_STATUS)
+                if end < 0:
+                    if n - i < MAX_STATUS:
+                        break  # wait for the rest of the line
+                    st.bad += 1
+                    i += 1
+                    continue
+                msg = parse_line(bytes(buf[i:end]).rstrip(b"\r"))
+                if msg is None:
+                    st.bad += 1
+                    i += 1
+                    continue
+                i = end + 1
+                st.lines += 1
+                kind, data = msg
+                if kind == "w":
+                    self._seq = None  # device restarted in JSON mode
+                out.append((kind, data, None))
+                continue
+            # Garbage: skip to the next candidate start
+            nxt = [k for k in (buf.find(b"\xa5", i + 1), buf.find(b"{", i + 1))
+                   if k >= 0]
+            st.bad += 1
+            i = min(nxt) if nxt else n
+        del buf[:i]
+
+    def _host_time(self, t_us: int, now: float) -> float:
+        """Host time of a device timestamp: device clock spacing, pinned
+        to the host clock (re-anchored when they drift apart)."""
+        if self._t_anchor is None:
+            self._t_anchor = now
+        else:
+            self._dev_s += ((t_us - self._t_us) & 0xFFFFFFFF) / 1e6
+        self._t_us = t_us
+        t = self._t_anchor + self._dev_s
+        if abs(t - now) > RESYNC_S:
+            self._t_anchor = now - self._dev_s
+            t = now
+        return t
+
+
+def probe(port, timeout: float = 2.5) -> bool:
+    """True if a force platform talks on `port` within `timeout` seconds:
+    a sample or status JSON line, or a CRC-valid binary frame (device left
+    in binary mode by an earlier connection)."""
+    reader = LineReader(port)
+    buf = reader._buf
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not reader._fill():
+            continue
+        if find_frame(buf) >= 0:
+            return True
+        for line in bytes(buf).split(b"\n")[:-1]:
+            if parse_line(line.strip()) is not None:
+                return True
+        if len(buf) > PROBE_BUFFER:
+            del buf[:-FRAME_SIZE]
+    return False
+
+
+def benchmark(n: int = 100000) -> float:
+    """Lines/second the parser handles on typical sample lines."""
+    lines = [b'{"weight1": %d, "weight2": %d, "weight3": %d, "weight4": %d}'
+             % (1000 + i % 97, 2000 + i % 89, 3000 + i % 83, 4000 + i % 79)
+             for i in range(n)]
+    t0 = time.perf_counter()
+    for line in lines:
+        parse_line(line)
+    return n / (time.perf_counter() - t0)
+
+
+def benchmark_frames(n: int = 100000) -> float:
+    """Frames/second the binary path handles."""
+    reader = LineReader(None)
+    reader.binary = True
+    data = b"".join(encode_frame(i, i * 12500, (1000 + i % 97, 2000, 3000, 4000))
+                    for i in range(n))
+    out = []
+    t0 = time.perf_counter()
+    reader._buf += data
+    reader._parse_frames(out, time.time())
+    return len(out) / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    print(f"[INGEST] {benchmark():,.0f} lignes/s, "
+          f"{benchmark_frames():,.0f} trames/s")
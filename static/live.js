@@ -0,0 +1,253 @@
+// ============================================================
+//  live.js — Live platform view (Server-Sent Events)
+// ============================================================
+
+const COLORS = {
+    bgCanvas: '#0f172a',
+    grid: '#1e293b',
+    boardOutline: '#334155',
+    boardFill: '#1e293b',
+    cross: '#f85149',
+    textDim: '#475569',
+    textPrimary: '#f1f5f9',
+    sensors: ['#38bdf8', '#fb7185', '#4ade80', '#fbbf24'],
+};
+
+const TRAIL_LEN = 15;
+const STALE_MS = 2000;          // no frame for this long -> "en attente"
+const REFUSED_RETRY_MS = 5000;  // stream refused (503: too many live views)
+let trail = [];
+let last = null;                // latest frame [t, w0, w1, w2, w3, cx, cy]
+let lastArrival = 0;
+let dropped = 0;
+let drawPending = false;
+
+// Board geometry (computed on resize)
+let bl, br, bt, bb, bcx, bcy;
+
+const canvas = document.getElementById('liveCanvas');
+const ctx = canvas.getContext('2d');
+const statusEl = document.getElementById('liveStatus');
+
+// ── Stream ──────────────────────────────────────────────────
+// Each event carries every frame received since the previous one; all
+// of them feed the trail, only the newest is drawn.
+let source = null;
+
+function connect() {
+    source = new EventSource('/api/live');
+    source.onmessage = onFrames;
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            // Refused by the server: the browser does not retry on its own
+            setStatus('Trop de vues en direct ouvertes, nouvel essai...', 'var(--accent-amber)');
+            setTimeout(connect, REFUSED_RETRY_MS);
+        } else {
+            setStatus('Connexion perdue, reconnexion...', 'var(--accent-red)');
+        }
+    };
+}
+
+function onFrames(ev) {
+    const msg = JSON.parse(ev.data);
+    for (const f of msg.frames) {
+        trail.push(comPos(f));
+        last = f;
+    }
+    if (trail.length > TRAIL_LEN) trail = trail.slice(-TRAIL_LEN);
+    dropped = msg.dropped;
+    lastArrival = performance.now();
+    setStatus('En direct', 'var(--accent-green)');
+    if (!drawPending) {
+        drawPending = true;
+        requestAnimationFrame(() => { drawPending = false; draw(); });
+    }
+}
+
+connect();
+
+setInterval(() => {
+    if (source.readyState === EventSource.OPEN &&
+        performance.now() - lastArrival > STALE_MS) {
+        setStatus('En attente de donnees (capteur deconnecte ?)', 'var(--accent-amber)');
+    }
+}, 500);
+
+function setStatus(text, color) {
+    statusEl.textContent = text;
+    statusEl.style.color = color;
+}
+
+// ── Resize ──────────────────────────────────────────────────
+function resize() {
+    const wrap = canvas.parentElement;
+    canvas.width = wrap.clientWidth;
+    canvas.height = wrap.clientHeight;
+    computeBoard();
+    trail = [];
+    draw();
+}
+window.addEventListener('resize', resize);
+
+function computeBoard() {
+    const cw = canvas.width, ch = canvas.height;
+    const margin = 50;
+    const availW = cw - 2 * margin;
+    const availH = ch - 2 * margin;
+    const ratio = BOARD_W / BOARD_H;
+
+    let bw, bh;
+    if (availW / availH > ratio) {
+        bh = availH; bw = bh * ratio;
+    } else {
+        bw = availW; bh = bw / ratio;
+    }
+    bcx = cw / 2; bcy = ch / 2;
+    bl = bcx - bw / 2; br = bcx + bw / 2;
+    bt = bcy - bh / 2; bb = bcy + bh / 2;
+}
+
+function comPos(f) {
+    const total = f[1] + f[2] + f[3] + f[4];
+    if (total <= 1) return [bcx, bcy];
+    return [Math.max(bl, Math.min(br, bcx + f[5] * (br - bl) / 2)),
+            Math.max(bt, Math.min(bb, bcy + f[6] * (bb - bt) / 2))];
+}
+
+// ── Drawing ─────────────────────────────────────────────────
+function draw() {
+    drawBoard();
+    if (!last) return;
+    const weights = last.slice(1, 5);
+    const total = weights.reduce((a, b) => a + b, 0);
+
+    for (let i = 0; i < 4; i++) {
+        document.getElementById('w' + i).textContent = (weights[i] / 1000).toFixed(3) + ' kg';
+    }
+    document.getElementById('total').textContent = (total / 1000).toFixed(3) + ' kg';
+    document.getElementById('coords').textContent =
+        `X: ${(last[5] * 100).toFixed(1)}%  Y: ${(last[6] * 100).toFixed(1)}%`;
+    document.getElementById('dropInfo').textContent =
+        dropped ? `${dropped} trames sautees` : '';
+
+    drawSensorValues(weights);
+    const pos = trail.length ? trail[trail.length - 1] : [bcx, bcy];
+    drawTrailAndCross(pos[0], pos[1]);
+}
+
+function drawBoard() {
+    const cw = canvas.width, ch = canvas.height;
+    ctx.fillStyle = COLORS.bgCanvas;
+    ctx.fillRect(0, 0, cw, ch);
+
+    // Board fill
+    ctx.fillStyle = COLORS.boardFill;
+    ctx.fillRect(bl, bt, br - bl, bb - bt);
+
+    // Grid
+    const nCols = BOARD_W / 5;
+    const nRows = BOARD_H / 5;
+    const stepX = (br - bl) / nCols;
+    const stepY = (bb - bt) / nRows;
+
+    ctx.strokeStyle = COLORS.grid;
+    ctx.lineWidth = 1;
+    for (let i = 1; i < nCols; i++) {
+        const gx = bl + i * stepX;
+        ctx.beginPath(); ctx.moveTo(gx, bt); ctx.lineTo(gx, bb); ctx.stroke();
+    }
+    for (let i = 1; i < nRows; i++) {
+        const gy = bt + i * stepY;
+        ctx.beginPath(); ctx.moveTo(bl, gy); ctx.lineTo(br, gy); ctx.stroke();
+    }
+
+    // Center dashes
+    ctx.strokeStyle = COLORS.boardOutline;
+    ctx.setLineDash([6, 4]);
+    ctx.beginPath(); ctx.moveTo(bcx, bt); ctx.lineTo(bcx, bb); ctx.stroke();
+    ctx.beginPath(); ctx.moveTo(bl, bcy); ctx.lineTo(br, bcy); ctx.stroke();
+    ctx.setLineDash([]);
+
+    // Outline
+    ctx.strokeStyle = COLORS.boardOutline;
+    ctx.lineWidth = 2;
+    ctx.strokeRect(bl, bt, br - bl, bb - bt);
+
+    // Corner sensors
+    const corners = [[br, bt], [bl, bt], [br, bb], [bl, bb]];
+    corners.forEach((pos, idx) => {
+        ctx.fillStyle = COLORS.sensors[idx];
+        ctx.beginPath();
+        ctx.arc(pos[0], pos[1], 12, 0, Math.PI * 2);
+        ctx.fill();
+        ctx.strokeStyle = COLORS.textPrimary;
+        ctx.lineWidth = 1;
+        ctx.stroke();
+
+        ctx.fillStyle = '#fff';
+        ctx.font = 'bold 9px Segoe UI';
+        ctx.textAlign = 'center'; ctx.textBaseline = 'middle';
+        ctx.fillText(String(idx + 1), pos[0], pos[1]);
+    });
+
+    // Dimension labels
+    ctx.fillStyle = COLORS.textDim;
+    ctx.font = '9px Segoe UI';
+    ctx.textAlign = 'center'; ctx.textBaseline = 'top';
+    ctx.fillText(`${BOARD_W} cm`, bcx, bt - 18);
+    ctx.textBaseline = 'middle';
+    ctx.fillText(`${BOARD_H} cm`, br + 24, bcy);
+
+    ctx.textBaseline = 'top';
+    ctx.fillText('Gauche                    Droite', bcx, bb + 12);
+}
+
+function drawSensorValues(weights) {
+    const corners = [[br, bt], [bl, bt], [br, bb], [bl, bb]];
+    ctx.font = '9px Consolas';
+    ctx.textBaseline = 'middle';
+    corners.forEach((pos, idx) => {
+        const txOff = (idx % 2 === 0) ? -28 : 28;
+        const tyOff = (idx < 2) ? -18 : 18;
+        ctx.fillStyle = COLORS.sensors[idx];
+        ctx.textAlign = 'center';
+        ctx.fillText((weights[idx] / 1000).toFixed(2) + ' kg', pos[0] + txOff, pos[1] + tyOff);
+    });
+}
+
+function drawTrailAndCross(xPos, yPos) {
+    const bgRgb = hexToRgb(COLORS.bgCanvas);
+    const crRgb = hexToRgb(COLORS.cross);
+    trail.forEach((pt, i) => {
+        if (i >= trail.length - 1) return;
+        const alpha = i / TRAIL_LEN;
+        const r = Math.round(bgRgb[0] + (crRgb[0] - bgRgb[0]) * alpha);
+        const g = Math.round(bgRgb[1] + (crRgb[1] - bgRgb[1]) * alpha);
+        const b = Math.round(bgRgb[2] + (crRgb[2] - bgRgb[2]) * alpha);
+        ctx.fillStyle = `rgb(${r},${g},${b})`;
+        ctx.beginPath();
+        ctx.arc(pt[0], pt[1], 1.5 + alpha * 3, 0, Math.PI * 2);
+        ctx.fill();
+    });
+
+    const cs = 14;
+    ctx.strokeStyle = COLORS.cross;
+    ctx.lineWidth = 2;
+    ctx.beginPath(); ctx.moveTo(xPos - cs, yPos); ctx.lineTo(xPos + cs, yPos); ctx.stroke();
+    ctx.beginPath(); ctx.moveTo(xPos, yPos - cs); ctx.lineTo(xPos, yPos + cs); ctx.stroke();
+
+    ctx.fillStyle = COLORS.cross;
+    ctx.font = 'bold 9px Segoe UI';
+    ctx.textAlign = 'center'; ctx.textBaseline = 'bottom';
+    ctx.fillText('CoM', xPos, yPos - cs - 4);
+}
+
+// ── Utility ─────────────────────────────────────────────────
+function hexToRgb(h) {
+    h = h.replace('#', '');
+    return [parseInt(h.substr(0, 2), 16),
+            parseInt(h.substr(2, 2), 16),
+            parseInt(h.substr(4, 2), 16)];
+}
+
+resize();
@@ -17,9 +17,18 @@ const COLORS = {
 
 const SENSOR_NAMES = ['Haut-Droit', 'Haut-Gauche', 'Bas-Droit', 'Bas-Gauche'];
 
-let samples = [];
+// Samples are fetched by time windows around the playhead. Each window
+// is a column store: w.t (Int32Array), w.w0..w3, cx, cy (Float32Array).
+const SAMPLE_COLS = ['t', 'w0', 'w1', 'w2', 'w3', 'cx', 'cy'];
+const WINDOW_MS = 30000;        // time span of one samples request
+const PREFETCH_WINDOWS = 2;     // windows kept loaded ahead of the playhead
+const MAX_WINDOWS = 12;         // cached windows (farthest evicted first)
+const windows = new Map();      // window index -> samples, or pending Promise
+let tStart = 0, tEnd = 0, sampleCount = 0;
+let overview = null;
 let playing = false;
-let frameIdx = 0;
+let playT = 0;                  // playhead (ms)
+let current = null;             // { w, i } sample on screen
 let speed = 1.0;
 let trail = [];
 const TRAIL_LEN = 15;
@@ -32,16 +41,120 @@ let bl, br, bt, bb, bcx, bcy;
 const canvas = document.getElementById('replayCanvas');
 const ctx = canvas.getContext('2d');
 const timeline = document.getElementById('timeline');
+const strip = document.getElementById('overviewStrip');
+const stripCtx = strip.getContext('2d');
+const stripImg = document.createElement('canvas');
 
 // ── Load samples ────────────────────────────────────────────
-fetch(`/api/session/${SESSION_ID}/samples`)
+// Binary format (web_dashboard.encode_samples_binary): 16-byte header
+// then little-endian columns t (int32), w0..w3, cx, cy (float32).
+function parseSamples(buf) {
+    const view = new DataView(buf);
+    const magic = String.fromCharCode(...new Uint8Array(buf, 0, 4));
+    if (magic !== 'GCSB') throw new Error('Format de samples inconnu');
+    const nCols = view.getUint16(6, true);
+    const n = view.getUint32(8, true);
+    const s = { length: n };
+    // Typed arrays use host byte order: read through DataView on big-endian hosts
+    const littleHost = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+    SAMPLE_COLS.slice(0, nCols).forEach((name, i) => {
+        const off = 16 + i * 4 * n;
+        const Ctor = i === 0 ? Int32Array : Float32Array;
+        if (littleHost) {
+            s[name] = new Ctor(buf, off, n);
+        } else {
+            const col = new Ctor(n);
+            for (let k = 0; k < n; k++) {
+                col[k] = i === 0 ? view.getInt32(off + 4 * k, true)
+                                 : view.getFloat32(off + 4 * k, true);
+            }
+            s[name] = col;
+        }
+    });
+    return s;
+}
+
+function windowIndex(t) {
+    return Math.floor(t / WINDOW_MS);
+}
+
+function loadWindow(k) {
+    if (windows.has(k)) return Promise.resolve(windows.get(k));
+    const lo = k * WINDOW_MS, hi = lo + WINDOW_MS - 1;
+    const p = fetch(`/api/session/${SESSION_ID}/samples.bin?t_start=${lo}&t_end=${hi}`)
+        .then(r => r.arrayBuffer())
+        .then(buf => {
+            const w = parseSamples(buf);
+            if (windows.get(k) === p) windows.set(k, w);
+            return w;
+        })
+        .catch(err => {
+            if (windows.get(k) === p) windows.delete(k);
+            throw err;
+        });
+    windows.set(k, p);
+    evictWindows(k);
+    return p;
+}
+
+function loadedWindow(k) {
+    const w = windows.get(k);
+    return (w && !(w instanceof Promise)) ? w : null;
+}
+
+function evictWindows(center) {
+    if (windows.size <= MAX_WINDOWS) return;
+    const keys = [...windows.keys()].sort(
+        (a, b) => Math.abs(b - center) - Math.abs(a - center));
+    keys.slice(0, windows.size - MAX_WINDOWS).forEach(k => windows.delete(k));
+}
+
+function prefetch(t) {
+    const k = windowIndex(t);
+    for (let j = 0; j <= PREFETCH_WINDOWS; j++) {
+        if ((k + j) * WINDOW_MS > tEnd) break;
+        loadWindow(k + j).catch(() => {});
+    }
+}
+
+// Last loaded sample with t <= time (binary search in its window)
+function sampleAt(time) {
+    const k = windowIndex(time);
+    const w = loadedWindow(k);
+    if (!w) return null;
+    if (w.length === 0 || w.t[0] > time) {
+        // Nothing at or before `time` here: the sample is the last one of
+        // an earlier window (never a later sample of this one)
+        for (let j = k - 1; j >= windowIndex(tStart); j--) {
+            const p = loadedWindow(j);
+            if (!p) return null;
+            if (p.length > 0) return { w: p, i: p.length - 1 };
+        }
+        return null;
+    }
+    let lo = 0, hi = w.length - 1;
+    while (lo < hi) {
+        const mid = (lo + hi + 1) >> 1;
+        if (w.t[mid] <= time) lo = mid; else hi = mid - 1;
+    }
+    return { w, i: lo };
+}
+
+// First paint: overview only (session extent + envelope strip)
+fetch(`/api/session/${SESSION_ID}/overview?points=${Math.max(200, strip.clientWidth)}`)
     .then(r => r.json())
-    .then(data => {
-        samples = data;
-        timeline.max = Math.max(0, samples.length - 1);
-        document.getElementById('frameInfo').textContent = `0 / ${samples.length}`;
+    .then(ov => {
+        overview = ov;
+        sampleCount = ov.count;
+        if (ov.n.length > 0) {
+            tStart = ov.t_start[0];
+            tEnd = ov.t_end[ov.t_end.length - 1];
+        }
+        timeline.min = tStart;
+        timeline.max = tEnd;
+        document.getElementById('frameInfo').textContent = `${sampleCount} samples`;
         resize();
-        if (samples.length > 0) showFrame(0);
+        if (sampleCount > 0) seek(tStart);
     });
 
 // ── Resize ──────────────────────────────────────────────────
@@ -50,7 +163,10 @@ function resize() {
     canvas.width = wrap.clientWidth;
     canvas.height = wrap.clientHeight;
     computeBoard();
-    if (samples.length > 0) showFrame(frameIdx);
+    renderOverview();
+    trail = [];
+    if (current) drawSample(current.w, current.i);
+    else drawBoard();
 }
 window.addEventListener('resize', resize);
 
@@ -188,14 +304,61 @@ function drawTrailAndCross(xPos, yPos) {
     ctx.fillText('CoM', xPos, yPos - cs - 4);
 }
 
+// ── Overview strip ──────────────────────────────────────────
+// CoM X/Y min-max envelopes of the whole session, drawn once off-screen,
+// then copied with the playhead on top.
+function renderOverview() {
+    strip.width = strip.clientWidth;
+    strip.height = strip.clientHeight;
+    stripImg.width = strip.width;
+    stripImg.height = strip.height;
+    const g = stripImg.getContext('2d');
+    g.fillStyle = COLORS.bgCanvas;
+    g.fillRect(0, 0, stripImg.width, stripImg.height);
+    if (!overview || overview.n.length === 0 || tEnd <= tStart) return;
+    const h = stripImg.height, span = tEnd - tStart;
+    [['com_x', COLORS.sensors[0]], ['com_y', COLORS.sensors[3]]].forEach(([col, color]) => {
+        g.strokeStyle = color;
+        g.globalAlpha = 0.7;
+        g.beginPath();
+        overview.n.forEach((_, b) => {
+            const x = Math.round((overview.t_start[b] - tStart) / span * (stripImg.width - 1)) + 0.5;
+            const y0 = h / 2 - overview.max[col][b] * h / 2;
+            const y1 = h / 2 - overview.min[col][b] * h / 2;
+            g.moveTo(x, Math.max(0, y0));
+            g.lineTo(x, Math.min(h, y1 + 1));
+        });
+        g.stroke();
+    });
+    g.globalAlpha = 1;
+}
+
+function drawOverviewStrip(time) {
+    stripCtx.drawImage(stripImg, 0, 0);
+    if (tEnd <= tStart) return;
+    const x = Math.round((time - tStart) / (tEnd - tStart) * (strip.width - 1)) + 0.5;
+    stripCtx.strokeStyle = COLORS.textPrimary;
+    stripCtx.lineWidth = 1;
+    stripCtx.beginPath(); stripCtx.moveTo(x, 0); stripCtx.lineTo(x, strip.height); stripCtx.stroke();
+}
+
 // ── Frame display ───────────────────────────────────────────
-function showFrame(idx) {
-    if (idx < 0 || idx >= samples.length) return;
-    frameIdx = idx;
-    timeline.value = idx;
+function showAt(time) {
+    timeline.value = time;
+    drawOverviewStrip(time);
+    const hit = sampleAt(time);
+    if (!hit) {
+        document.getElementById('frameInfo').textContent = 'Chargement...';
+        return;
+    }
+    if (current && current.w === hit.w && current.i === hit.i) return;
+    drawSample(hit.w, hit.i);
+}
 
-    const s = samples[idx];
-    const weights = [s.w0, s.w1, s.w2, s.w3];
+function drawSample(w, idx) {
+    current = { w, i: idx };
+    const weights = [w.w0[idx], w.w1[idx], w.w2[idx], w.w3[idx]];
+    const cx = w.cx[idx], cy = w.cy[idx];
     const total = weights.reduce((a, b) => a + b, 0);
 
     // Update sidebar
@@ -205,15 +368,17 @@ function showFrame(idx) {
     document.getElementById('w3').textContent = (weights[3] / 1000).toFixed(3) + ' kg';
     document.getElementById('total').textContent = (total / 1000).toFixed(3) + ' kg';
     document.getElementById('coords').textContent =
-        `X: ${(s.cx * 100).toFixed(1)}%  Y: ${(s.cy * 100).toFixed(1)}%`;
-    document.getElementById('timeInfo').textContent = (s.t / 1000).toFixed(3) + ' s';
-    document.getElementById('frameInfo').textContent = `${idx + 1} / ${samples.length}`;
+        `X: ${(cx * 100).toFixed(1)}%  Y: ${(cy * 100).toFixed(1)}%`;
+    document.getElementById('timeInfo').textContent = (w.t[idx] / 1000).toFixed(3) + ' s';
+    const pct = tEnd > tStart ? (w.t[idx] - tStart) / (tEnd - tStart) * 100 : 100;
+    document.getElementById('frameInfo').textContent =
+        `${pct.toFixed(1)} % — ${sampleCount} samples`;
 
     // Compute CoM position
     let xPos, yPos;
     if (total > 1) {
-        xPos = bcx + s.cx * (br - bl) / 2;
-        yPos = bcy + s.cy * (bb - bt) / 2;
+        xPos = bcx + cx * (br - bl) / 2;
+        yPos = bcy + cy * (bb - bt) / 2;
         xPos = Math.max(bl, Math.min(br, xPos));
         yPos = Math.max(bt, Math.min(bb, yPos));
     } else {
@@ -230,41 +395,48 @@ function showFrame(idx) {
 }
 
 // ── Playback controls ───────────────────────────────────────
+// The playhead follows the wall clock (x speed); the frame shows the
+// latest sample at or before it. Playback waits while its window loads.
+function setPlayButton(isPlaying) {
+    const btn = document.getElementById('btnPlay');
+    btn.textContent = isPlaying ? 'PAUSE' : 'PLAY';
+    btn.style.background = isPlaying ? 'var(--accent-amber)' : 'var(--accent-teal)';
+}
+
 function togglePlay() {
     if (playing) {
         playing = false;
-        document.getElementById('btnPlay').textContent = 'PLAY';
-        document.getElementById('btnPlay').style.background = 'var(--accent-teal)';
+        setPlayButton(false);
         if (animId) { cancelAnimationFrame(animId); animId = null; }
     } else {
-        if (frameIdx >= samples.length - 1) { frameIdx = 0; trail = []; }
+        if (sampleCount === 0) return;
+        if (playT >= tEnd) seek(tStart);
         playing = true;
-        document.getElementById('btnPlay').textContent = 'PAUSE';
-        document.getElementById('btnPlay').style.background = 'var(--accent-amber)';
+        setPlayButton(true);
         lastFrameTime = performance.now();
         playStep();
     }
 }
 
 function playStep() {
-    if (!playing || frameIdx >= samples.length - 1) {
-        playing = false;
-        document.getElementById('btnPlay').textContent = 'PLAY';
-        document.getElementById('btnPlay').style.background = 'var(--accent-teal)';
-        return;
-    }
-
+    if (!playing) return;
     const now = performance.now();
-    const currT = samples[frameIdx].t;
-    const nextT = samples[frameIdx + 1].t;
-    const neededDelay = (nextT - currT) / speed;
-
-    if (now - lastFrameTime >= neededDelay) {
-        showFrame(frameIdx);
-        frameIdx++;
-        lastFrameTime = now;
+    if (loadedWindow(windowIndex(playT))) {
+        playT += (now - lastFrameTime) * speed;
+    } else {
+        loadWindow(windowIndex(playT)).catch(() => {});
     }
+    lastFrameTime = now;
 
+    if (playT >= tEnd) {
+        playT = tEnd;
+        showAt(playT);
+        playing = false;
+        setPlayButton(false);
+        return;
+    }
+    prefetch(playT);
+    showAt(playT);
     animId = requestAnimationFrame(playStep);
 }
 
@@ -275,16 +447,22 @@ function setSpeed(s) {
     });
 }
 
-function seek(idx) {
+function seek(t) {
     trail = [];
-    showFrame(parseInt(idx));
+    current = null;
+    playT = Math.max(tStart, Math.min(tEnd, Number(t)));
+    const target = playT;
+    prefetch(playT);
+    showAt(playT);
+    loadWindow(windowIndex(playT))
+        .then(() => { if (playT === target) showAt(playT); })
+        .catch(() => {
+            document.getElementById('frameInfo').textContent = 'Erreur de chargement';
+        });
 }
 
 function onSlider(val) {
-    if (!playing) {
-        trail = [];
-        showFrame(parseInt(val));
-    }
+    seek(parseInt(val));
 }
 
 // ── Utility ─────────────────────────────────────────────────
@@ -0,0 +1,51 @@
+# ============================================================
+#  conftest.py — Shared test helpers (run: python -m pytest)
+# ============================================================
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakePort:
+    """pyserial-like port fed from a byte string, `chunk` bytes per read;
+    records what is written to it."""
+
+    def __init__(self, data: bytes = b"", chunk: int = 64):
+        self.data = data
+        self.chunk = chunk
+        self.written = b""
+        self.closed = False
+
+    @property
+    def in_waiting(self) -> int:
+        return min(len(self.data), self.chunk)
+
+    def read(self, n: int) -> bytes:
+        if not self.data:
+            time.sleep(0.01)  # port timeout
+        out, self.data = self.data[:n], self.data[n:]
+        return out
+
+    def write(self, data: bytes):
+        self.written += data
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """database module pointed at an empty database in tmp_path."""
+    import database as db
+    db.close_all()
+    monkeypatch.setattr(db, "_DB_PATH", str(tmp_path / "cm_data.db"))
+    db.init_db()
+    yield db
+    db.close_all()
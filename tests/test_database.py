@@ -0,0 +1,90 @@
+import math
+
+import database
+
+
+def _session(db):
+    return db.start_session(db.add_user("test"), db.add_platform("test"))
+
+
+def _rows(n, start=0):
+    return [(t * 12, 1000.0 + t, 2000.0, 1500.0, 1800.0, 0.1, -0.05)
+            for t in range(start, start + n)]
+
+
+def test_stats_count_sessions_still_recording(temp_db):
+    sid = _session(temp_db)
+    temp_db.insert_samples(sid, _rows(3000))
+    temp_db.insert_samples(sid, _rows(500, start=3000))
+    stats = temp_db.get_stats()
+    assert stats["sample_count"] == 3500
+    assert stats["users"][0]["samples"] == 3500
+    temp_db.end_session(sid, 3500)
+    assert temp_db.get_stats()["sample_count"] == 3500
+
+
+def test_migration_counts_unfinalized_sessions(temp_db):
+    sid = _session(temp_db)
+    temp_db.insert_samples(sid, _rows(2000))
+    conn = temp_db._connect()
+    # Database written before running counts: unfinalized session at 0
+    with conn:
+        conn.execute("UPDATE sessions SET sample_count=0 WHERE id=?", (sid,))
+        conn.execute("PRAGMA user_version=4")
+    assert temp_db.get_stats()["sample_count"] == 0
+    temp_db.init_db()
+    assert temp_db.get_stats()["sample_count"] == 2000
+
+
+def _same(a, b):
+    """Rows equal bit for bit (NaN == NaN, None only matches None)."""
+    return len(a) == len(b) and all(
+        (x is None and y is None) or (x is not None and y is not None
+                                      and database._float_bits([x]) ==
+                                      database._float_bits([y]))
+        for ra, rb in zip(a, b) for x, y in zip(ra, rb))
+
+
+def _legacy_rows():
+    rows = []
+    for t in range(300):
+        w = [1000.0 + t, 2000.25, 1500.5 + t / 3, 1800.0]
+        total = sum(w)
+        row = [t * 12, *w, (w[0] + w[2] - w[1] - w[3]) / total,
+               (w[2] + w[3] - w[0] - w[1]) / total]
+        if t % 7 == 0:
+            row[1 + t % 6] = None  # NULL in a weight or CoM column
+        if t == 5:
+            row[2] = float("nan")  # a real NaN stays NaN, not None
+        rows.append(tuple(row))
+    return rows
+
+
+def test_chunk_round_trip_with_nulls():
+    rows = _legacy_rows() + [(4000, None, None, None, None, None, None)]
+    blob = database._encode_chunk(rows)
+    assert _same(database._decode_chunk(blob), rows)
+    assert _same(database._decode_chunk(database._encode_chunk(_rows(50))),
+                 _rows(50))
+
+
+def test_legacy_rows_with_nulls_migrate_to_chunks(temp_db, monkeypatch):
+    sid = _session(temp_db)
+    rows = _legacy_rows()
+    monkeypatch.setattr(temp_db, "SAMPLE_STORAGE", "rows")
+    temp_db.insert_samples(sid, rows)
+    rows = temp_db.get_samples(sid)  # as stored (SQLite keeps NaN as NULL)
+    assert any(None in r for r in rows)
+    monkeypatch.setattr(temp_db, "SAMPLE_STORAGE", "chunks")
+    assert temp_db.migrate_samples_to_chunks() == 1
+    conn = temp_db._connect()
+    assert conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0] == 0
+    assert _same(temp_db.get_samples(sid), rows)
+    assert temp_db.get_sample_count(sid) == len(rows)
+    if temp_db.np is not None:
+        arr = temp_db.get_samples_array(sid)
+        for name, k in (("w0", 1), ("w1", 2), ("com_y", 6)):
+            # NULL reads as NaN, everything else bit for bit
+            col = arr[name].tolist()
+            assert all(math.isnan(v) if r[k] is None
+                       else _same([(v,)], [(r[k],)]) for v, r in zip(col, rows))
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "centre_de_masse.py")
+
+
+def _run(code, tmp_path, env=None):
+    """Run `code` in a fresh interpreter (cwd = tmp_path, repo on the path)."""
+    full_env = dict(os.environ, PYTHONPATH=ROOT, **(env or {}))
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(code)],
+                          cwd=str(tmp_path), env=full_env, timeout=60,
+                          capture_output=True, text=True)
+
+
+def test_spawned_worker_import_builds_nothing(tmp_path):
+    # What a spawn child does with the GUI script: run it as __mp_main__
+    db_file = tmp_path / "cm_data.db"
+    proc = _run(f"""
+        import runpy, sys
+        sys.modules["dearpygui"] = None   # any GUI import fails
+        import database
+        database._DB_PATH = {str(db_file)!r}
+        ns = runpy.run_path({APP!r}, run_name="__mp_main__")
+        assert ns["dpg"] is None and ns["recorder"] is None
+        assert ns["remote_sync"] is None and ns["samples"] is None
+        assert "dearpygui.dearpygui" not in sys.modules
+    """, tmp_path)
+    assert proc.returncode == 0, proc.stderr
+    assert not db_file.exists()
+
+
+def test_acquisition_child_never_imports_dearpygui(tmp_path):
+    # Tripwire package: importing it leaves a marker file and fails
+    trip = tmp_path / "trip" / "dearpygui"
+    trip.mkdir(parents=True)
+    marker = tmp_path / "imported"
+    (trip / "__init__.py").write_text(
+        f"open({str(marker)!r}, 'a').write('x')\n"
+        "raise ImportError('dearpygui imported')\n")
+    driver = tmp_path / "driver.py"
+    driver.write_text(textwrap.dedent(f"""
+        import sys
+        import acquisition, database
+        # The child re-runs the GUI script as __mp_main__, as in the app
+        sys.modules["__main__"].__file__ = {APP!r}
+        if __name__ == "__main__":
+            database._DB_PATH = {str(tmp_path / "cm_data.db")!r}
+            database.init_db()
+            acq = acquisition.AcquisitionProcess()
+            acq.start()
+            uid = database.add_user("test")
+            pid = database.add_platform("test")
+            assert acq.recorder.start(uid, pid) is not None
+            acq.recorder.stop()
+            acq.close()
+            assert acq._proc.exitcode == 0, acq._proc.exitcode
+    """))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [str(tmp_path / "trip"), ROOT]))
+    proc = subprocess.run([sys.executable, str(driver)], cwd=str(tmp_path),
+                          env=env, timeout=60, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert not marker.exists()
@@ -0,0 +1,34 @@
+import threading
+
+import recorder as rec
+
+
+def _join_overviews():
+    for th in threading.enumerate():
+        if th.name == "recorder-overview":
+            th.join()
+
+
+def test_failed_batch_is_counted_as_dropped(temp_db, monkeypatch):
+    uid, pid = temp_db.add_user("test"), temp_db.add_platform("test")
+    insert = temp_db.insert_samples
+    calls = []
+
+    def flaky_insert(session_id, data):
+        calls.append(len(data))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        insert(session_id, data)
+
+    monkeypatch.setattr(temp_db, "insert_samples", flaky_insert)
+    r = rec.SessionRecorder()
+    sid = r.start(uid, pid)
+    for i in range(2 * rec.FLUSH_THRESHOLD + 200):
+        r.record(i, 1.0, 2.0, 3.0, 4.0, 0.0, 0.0)
+    r.stop()
+    _join_overviews()
+    stored = temp_db.get_sample_count(sid)
+    assert stored == rec.FLUSH_THRESHOLD + 200
+    assert r.dropped_samples == rec.FLUSH_THRESHOLD
+    assert r.sample_count == stored
+    assert temp_db.get_session(sid)["sample_count"] == stored
@@ -0,0 +1,79 @@
+import json
+import time
+
+import serial_ingest as si
+from acquisition import release_port
+from conftest import FakePort
+
+
+def _frames(n, start=0):
+    return b"".join(si.encode_frame(i, i * 12500, (1000 + i, 2000, 3000, 4000))
+                    for i in range(start, start + n))
+
+
+def test_probe_accepts_json_sample_line():
+    port = FakePort(b'{"weight1": 1, "weight2": 2, "weight3": 3, "weight4": 4}\n')
+    assert si.probe(port, timeout=1.0)
+
+
+def test_probe_accepts_device_already_in_binary_mode():
+    # Joined mid-frame, as after an app restart with the device still on
+    port = FakePort(_frames(20)[7:], chunk=16)
+    assert si.probe(port, timeout=1.0)
+
+
+def test_probe_rejects_garbage():
+    noise = bytes(range(256)) * 4
+    assert not si.probe(FakePort(noise + b"\n"), timeout=0.2)
+
+
+def test_json_reader_switches_to_frames_it_finds():
+    port = FakePort(_frames(50)[3:], chunk=40)
+    reader = si.LineReader(port)
+    out = []
+    while port.data:
+        out += reader.read_messages()
+    assert reader.binary
+    weights = [m[1] for m in out if m[0] == "w"]
+    assert weights[0][0] == 1001 and len(weights) == 49
+    assert reader.stats.dropped == 0
+
+
+def test_release_port_switches_device_back_to_json():
+    port = FakePort()
+    release_port(port)
+    assert json.loads(port.written) == si.JSON_REQUEST
+    assert port.closed
+
+
+
+def _read_weights(data, chunk=64):
+    """Sample messages a binary-mode reader gets from `data`."""
+    port = FakePort(b'{"status": "binary_ok"}\n' + data, chunk=chunk)
+    reader = si.LineReader(port)
+    out = []
+    while port.data:
+        out += reader.read_messages()
+    return reader, [m for m in out if m[0] == "w"]
+
+
+def test_lost_frames_are_counted():
+    reader, weights = _read_weights(_frames(10) + _frames(20, start=13))
+    assert len(weights) == 30
+    assert reader.stats.dropped == 3
+
+
+def test_device_restart_is_not_counted_as_lost():
+    # Device reset mid-stream: sequence and clock restart at 0
+    reader, weights = _read_weights(_frames(3000) + _frames(50), chunk=4096)
+    assert len(weights) == 3050
+    assert reader.stats.dropped == 0
+    assert abs(weights[-1][2] - time.time()) < 1.0
+
+
+def test_sequence_jump_faster_than_the_device_is_a_restart():
+    # Clock still moving forward, but 40000 frames "lost" in 12.5 ms
+    jump = si.encode_frame(40005, 5 * 12500, (1, 2, 3, 4))
+    reader, weights = _read_weights(_frames(5) + jump)
+    assert len(weights) == 6
+    assert reader.stats.dropped == 0
@@ -0,0 +1,90 @@
+import http.client
+import threading
+import time
+
+import pytest
+
+import web_dashboard as wd
+
+pytestmark = pytest.mark.skipif(wd.Flask is None, reason="Flask not installed")
+
+
+def _hello(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain"),
+                              ("Content-Length", "2")])
+    return [b"ok"]
+
+
+@pytest.fixture
+def serve():
+    """serve(app, threads) -> port of a running _PooledWSGIServer."""
+    servers = []
+
+    def _serve(app, threads):
+        server = wd._PooledWSGIServer("127.0.0.1", 0, app, threads=threads)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_port
+
+    yield _serve
+    wd._stopping.set()  # ends live streams
+    try:
+        for server in servers:
+            server.stop(grace=1.0)
+    finally:
+        wd._stopping.clear()
+
+
+def _get(conn, path):
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    return resp.status, resp.read()
+
+
+def _timed_get(port, path="/"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    t0 = time.monotonic()
+    try:
+        status, _ = _get(conn, path)
+    finally:
+        conn.close()
+    return status, time.monotonic() - t0
+
+
+def test_idle_keepalive_connections_do_not_hold_workers(serve):
+    port = serve(_hello, threads=2)
+    idle = [http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            for _ in range(4)]
+    for conn in idle:
+        assert _get(conn, "/") == (200, b"ok")
+    # Two workers, four idle keep-alive connections: no wait for the next one
+    status, elapsed = _timed_get(port)
+    assert status == 200 and elapsed < 1.0
+    # The idle connections are still served (same sockets)
+    for conn in idle:
+        assert _get(conn, "/") == (200, b"ok")
+        conn.close()
+
+
+def test_idle_keepalive_connection_is_closed_after_timeout(serve, monkeypatch):
+    monkeypatch.setattr(wd, "WEB_KEEPALIVE", 0.2)
+    port = serve(_hello, threads=2)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    assert _get(conn, "/") == (200, b"ok")
+    time.sleep(0.6)
+    assert conn.sock.recv(1) == b""  # closed by the server
+    conn.close()
+
+
+def test_live_streams_are_capped_below_the_pool(serve):
+    port = serve(wd._create_app(live_clients=1), threads=2)
+    stream = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    stream.request("GET", "/api/live")
+    resp = stream.getresponse()
+    assert resp.status == 200
+    assert resp.readline().startswith(b"retry:")
+    status, _ = _timed_get(port, "/api/live")
+    assert status == 503
+    status, elapsed = _timed_get(port, "/static/live.js")
+    assert status == 200 and elapsed < 1.0
+    stream.close()
@@ -2,18 +2,172 @@
 #  web_dashboard.py — Flask web dashboard for remote access
 # ============================================================
 import threading
+import itertools
+import time
+import tempfile
 import sys
 import os
+import json
+import io
+import zlib
+import hashlib
+import struct
+import socket
+import selectors
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import database as db
+import export
+import live_stream
 
 try:
-    from flask import Flask, render_template, jsonify, request, Response
+    from flask import Flask, render_template, jsonify, request, Response, send_file
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
 except ImportError:
     print("[WEB] Flask not installed. Run: pip install flask")
     Flask = None
+    BaseWSGIServer = WSGIRequestHandler = object
 
 _app = None
+_server = None
 _server_thread = None
+_server_lock = threading.Lock()  # start/stop serialised (port reuse)
+_stopping = threading.Event()  # set by stop_web_server: ends live streams
+
+# Server settings
+WEB_THREADS = 16       # worker threads (one per request being served)
+WEB_TIMEOUT = 15.0     # socket timeout while reading / answering a request
+WEB_KEEPALIVE = 5.0    # idle time before a keep-alive connection is closed
+WEB_MAX_IDLE = 256     # idle keep-alive connections kept (select() limits)
+WEB_STOP_GRACE = 5.0   # seconds given to in-flight requests on stop
+
+# Compressed responses of finished sessions kept on disk (None: disabled)
+WEB_CACHE_DIR = os.path.join(tempfile.gettempdir(), "gravicore_http_cache")
+WEB_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Batch export jobs started from the dashboard (job id -> export.BatchExport)
+_jobs = {}
+_jobs_lock = threading.Lock()
+_job_ids = itertools.count(1)
+_MAX_JOBS = 4
+_JOBS_DIR = os.path.join(tempfile.gettempdir(), "gravicore_jobs")
+
+# Live stream (/api/live): at most LIVE_RATE events/s per client, each
+# carrying every frame received since the previous one
+LIVE_RATE = 20
+LIVE_KEEPALIVE = 15.0  # seconds between keep-alive comments when idle
+# A stream holds a pool thread for its whole life: at most this many (and
+# never more than half of the pool), the next ones get a 503
+LIVE_MAX_CLIENTS = 4
+
+
+# ── Binary sample format ─────────────────────────────────────
+# 16-byte header: magic b"GCSB", version (u16), column count (u16),
+# sample count n (u32), reserved (u32). Then the columns back to back,
+# little-endian: t_ms as int32, then w0, w1, w2, w3, com_x, com_y as
+# float32 (4*n bytes each, so every column is 4-byte aligned and maps
+# directly onto a JS typed array).
+
+BIN_MAGIC = b"GCSB"
+BIN_VERSION = 1
+_BIN_HEADER = struct.Struct("<4sHHII")
+
+
+def encode_samples_binary(batches) -> bytes:
+    """Encode sample batches (lists of 7-tuples) in the binary format."""
+    t_col = array("i")
+    cols = [array("f") for _ in range(6)]
+    for batch in batches:
+        if not batch:
+            continue
+        columns = list(zip(*batch))
+        t_col.extend(columns[0])
+        for col, values in zip(cols, columns[1:]):
+            col.extend(values)
+    parts = [t_col] + cols
+    if sys.byteorder != "little":
+        for part in parts:
+            part.byteswap()
+    header = _BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION, len(parts), len(t_col), 0)
+    return header + b"".join(part.tobytes() for part in parts)
+
+
+# ── HTTP caching (finished sessions) ─────────────────────────
+# Once ended_at is set a session's samples never change: its responses
+# get a strong ETag (304 on If-None-Match), are gzip/deflate encoded when
+# the client accepts it, and are kept in WEB_CACHE_DIR.
+
+def _cache_key(session: dict, variant: str):
+    """Key of one representation of a finished session (None while the
+    session is still recording)."""
+    if not session.get("ended_at"):
+        return None
+    raw = json.dumps([session, variant], sort_keys=True, default=str)
+    digest = hashlib.sha1(raw.encode()).hexdigest()[:16]
+    return f"{session['id']}-{session.get('sample_count') or 0}-{digest}"
+
+
+def _compress(chunks, encoding: str):
+    """Stream-compress str/bytes chunks (gzip or zlib "deflate")."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+    for chunk in chunks:
+        out = z.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def _tee_to_cache(chunks, path: str):
+    """Yield the chunks while writing them to `path` (via a .part file,
+    renamed when complete). Cache errors never break the response."""
+    part = f"{path}.{os.getpid()}-{threading.get_ident()}.part"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(part, "wb")
+    except OSError:
+        yield from chunks
+        return
+    complete = False
+    try:
+        for chunk in chunks:
+            if f is not None:
+                try:
+                    f.write(chunk)
+                except OSError:
+                    f.close()
+                    f = None
+            yield chunk
+        complete = f is not None
+    finally:
+        if f is not None:
+            f.close()
+        try:
+            if complete:
+                os.replace(part, path)
+                _trim_cache()
+            else:
+                os.remove(part)
+        except OSError:
+            pass
+
+
+def _trim_cache():
+    """Delete the least recently used files beyond WEB_CACHE_MAX_BYTES."""
+    try:
+        entries = [e for e in os.scandir(WEB_CACHE_DIR)
+                   if e.is_file() and not e.name.endswith(".part")]
+    except OSError:
+        return
+    stats = [(e.stat().st_atime, e.stat().st_size, e.path) for e in entries]
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in sorted(stats):
+        if total <= WEB_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
 
 
 def _bundle_dir():
@@ -28,19 +182,38 @@ def _bundle_dir():
 _BASE_DIR = _bundle_dir()
 
 
-def _create_app():
+def _create_app(live_clients: int = LIVE_MAX_CLIENTS):
     app = Flask(__name__,
                 template_folder=os.path.join(_BASE_DIR, "templates"),
                 static_folder=os.path.join(_BASE_DIR, "static"))
+    live_slots = threading.Semaphore(max(live_clients, 0))  # /api/live streams
+
+    def _session_page_args():
+        """Filters, sort and page of the session listings (query string)."""
+        return dict(
+            platform_id=request.args.get("platform_id", type=int),
+            user_id=request.args.get("user_id", type=int),
+            date_from=request.args.get("date_from") or None,
+            date_to=request.args.get("date_to") or None,
+            order=request.args.get("order", "desc"),
+            cursor=request.args.get("cursor") or None)
 
     @app.route("/")
     def index():
         platforms = db.list_platforms()
         users = db.list_users()
-        sessions = db.list_sessions()
+        args = _session_page_args()
+        try:
+            sessions, next_cursor = db.list_sessions_page(**args)
+        except ValueError:
+            args.update(order="desc", cursor=None)
+            sessions, next_cursor = db.list_sessions_page(**args)
+        total = db.count_sessions(args["platform_id"], args["user_id"],
+                                  args["date_from"], args["date_to"])
         return render_template("index.html",
                                platforms=platforms, users=users,
-                               sessions=sessions)
+                               sessions=sessions, filters=args,
+                               next_cursor=next_cursor, total=total)
 
     @app.route("/replay/<int:session_id>")
     def replay(session_id):
@@ -60,14 +233,78 @@ def _create_app():
         return render_template("replay.html", session=session,
                                board_w=board_w, board_h=board_h)
 
+    @app.route("/live")
+    def live():
+        platforms = db.list_platforms()
+        pid = request.args.get("platform_id", type=int)
+        board_w, board_h = 50, 40
+        for p_id, pname, pw, ph in platforms:
+            if pid is None or p_id == pid:
+                pid, board_w, board_h = p_id, pw, ph
+                break
+        return render_template("live.html", platforms=platforms,
+                               platform_id=pid,
+                               board_w=board_w, board_h=board_h)
+
+    def _session_response(session, make_body, mimetype, headers=None):
+        """Response for session data: make_body() returns the chunks. For a
+        finished session: ETag / 304, gzip or deflate, disk cache."""
+        headers = dict(headers or {})
+        variant = request.path + "?" + "&".join(
+            f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        key = _cache_key(session, variant)
+        if key is None:
+            body = make_body()
+            if body is None:
+                return jsonify({"error": "no samples"}), 404
+            return Response(body, mimetype=mimetype, headers=headers)
+
+        encoding = request.accept_encodings.best_match(("gzip", "deflate"))
+        etag = f"{key}-{encoding}" if encoding else key
+        headers.update({"ETag": f'"{etag}"', "Vary": "Accept-Encoding",
+                        "Cache-Control": "private, no-cache"})
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        path = os.path.join(WEB_CACHE_DIR, etag) if WEB_CACHE_DIR else None
+        if path and os.path.isfile(path):
+            try:
+                f = open(path, "rb")
+                headers["Content-Length"] = str(os.fstat(f.fileno()).st_size)
+                os.utime(path)  # LRU order for _trim_cache
+                return Response(_file_chunks(f), mimetype=mimetype,
+                                headers=headers)
+            except OSError:
+                pass
+        body = make_body()
+        if body is None:
+            return jsonify({"error": "no samples"}), 404
+        body = (b.encode() if isinstance(b, str) else b for b in body)
+        if encoding:
+            body = _compress(body, encoding)
+        if path:
+            body = _tee_to_cache(body, path)
+        return Response(body, mimetype=mimetype, headers=headers)
+
     # ── API endpoints ────────────────────────────────────────
 
     @app.route("/api/sessions")
     def api_sessions():
-        pid = request.args.get("platform_id", type=int)
-        uid = request.args.get("user_id", type=int)
-        sessions = db.list_sessions(platform_id=pid, user_id=uid)
-        return jsonify(sessions)
+        """One page of sessions: platform_id, user_id, date_from, date_to,
+        order (desc/asc), limit (<= 1000), cursor. The cursor of the next
+        page comes in the X-Next-Cursor header (absent on the last page)."""
+        limit = request.args.get("limit", db.SESSION_PAGE, type=int)
+        try:
+            sessions, next_cursor = db.list_sessions_page(
+                limit=min(max(limit, 1), 1000), **_session_page_args())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        response = jsonify(sessions)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
 
     @app.route("/api/session/<int:session_id>")
     def api_session(session_id):
@@ -76,16 +313,98 @@ def _create_app():
             return jsonify({"error": "not found"}), 404
         return jsonify(session)
 
+    def _sample_batches(session_id):
+        return db.iter_sample_batches(
+            session_id,
+            t_start=request.args.get("t_start", type=int),
+            t_end=request.args.get("t_end", type=int),
+            stride=request.args.get("stride", type=int),
+            max_points=request.args.get("points", type=int))
+
     @app.route("/api/session/<int:session_id>/samples")
     def api_samples(session_id):
-        samples = db.get_samples(session_id)
-        result = []
-        for t_ms, w0, w1, w2, w3, cx, cy in samples:
-            result.append({
-                "t": t_ms, "w0": w0, "w1": w1, "w2": w2, "w3": w3,
-                "cx": cx, "cy": cy
-            })
-        return jsonify(result)
+        """Samples as a JSON array, streamed batch by batch.
+        Optional: t_start / t_end (ms), stride, points (max samples)."""
+        session = db.get_session(session_id)
+        if session is None:
+            return jsonify({"error": "not found"}), 404
+        batches = _sample_batches(session_id)
+
+        def generate():
+            sep = "["
+            for batch in batches:
+                for t_ms, w0, w1, w2, w3, cx, cy in batch:
+                    yield sep + json.dumps({
+                        "t": t_ms, "w0": w0, "w1": w1, "w2": w2, "w3": w3,
+                        "cx": cx, "cy": cy
+                    })
+                    sep = ","
+            yield "[]" if sep == "[" else "]"
+
+        return _session_response(session, generate, "application/json")
+
+    @app.route("/api/session/<int:session_id>/samples.bin")
+    def api_samples_bin(session_id):
+        """Same samples as /samples, as little-endian columns (see
+        encode_samples_binary). Same query parameters."""
+        session = db.get_session(session_id)
+        if session is None:
+            return jsonify({"error": "not found"}), 404
+        return _session_response(
+            session,
+            lambda: [encode_samples_binary(_sample_batches(session_id))],
+            "application/octet-stream")
+
+    @app.route("/api/session/<int:session_id>/overview")
+    def api_overview(session_id):
+        """Min/max/mean envelope in at most `points` buckets."""
+        session = db.get_session(session_id)
+        if session is None:
+            return jsonify({"error": "not found"}), 404
+        points = request.args.get("points", 1000, type=int)
+        return _session_response(
+            session,
+            lambda: [json.dumps(db.get_overview(
+                session_id, points=min(max(points, 1), 100000),
+                t_start=request.args.get("t_start", type=int),
+                t_end=request.args.get("t_end", type=int)))],
+            "application/json")
+
+    @app.route("/api/live")
+    def api_live():
+        """Server-Sent Events: live [t_ms, w0..w3, com_x, com_y] frames
+        from the acquisition thread. Frames a slow client misses are
+        skipped (counted in "dropped"), the producer never waits.
+        503 when all live_clients slots are taken."""
+        if not live_slots.acquire(blocking=False):
+            return Response("Trop de vues en direct ouvertes\n", status=503,
+                            mimetype="text/plain",
+                            headers={"Retry-After": "5"})
+        interval = 1.0 / LIVE_RATE
+
+        def generate():
+            with live_stream.broadcaster.subscribe() as sub:
+                yield "retry: 2000\n\n"
+                idle = 0.0
+                while not _stopping.is_set():
+                    t0 = time.monotonic()
+                    frames = sub.read(timeout=1.0)
+                    if frames:
+                        idle = 0.0
+                        yield "data: " + json.dumps(
+                            {"frames": frames, "dropped": sub.dropped}) + "\n\n"
+                        time.sleep(max(0.0, interval - (time.monotonic() - t0)))
+                    else:
+                        idle += time.monotonic() - t0
+                        if idle >= LIVE_KEEPALIVE:
+                            idle = 0.0
+                            yield ": keep-alive\n\n"
+
+        resp = Response(generate(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache",
+                                 "X-Accel-Buffering": "no"})
+        resp.call_on_close(live_slots.release)
+        return resp
 
     @app.route("/api/platforms")
     def api_platforms():
@@ -97,106 +416,377 @@ def _create_app():
 
     # ── Export endpoints ──────────────────────────────────────
 
-    def _format_timecode(t_ms):
-        total_s = t_ms / 1000.0
-        h = int(total_s // 3600)
-        m = int((total_s % 3600) // 60)
-        s = total_s % 60
-        return f"{h:02d}:{m:02d}:{s:06.3f}"
-
-    @app.route("/api/session/<int:session_id>/export/csv")
-    def api_export_csv(session_id):
+    def _export_response(session_id, fmt, mimetype):
+        """Stream an export (see export.py) as a chunked download."""
         session = db.get_session(session_id)
         if session is None:
             return jsonify({"error": "not found"}), 404
-        samples = db.get_samples(session_id)
-        if not samples:
-            return jsonify({"error": "no samples"}), 404
-
-        import io, csv
-        buf = io.StringIO()
-        writer = csv.writer(buf, delimiter=";")
-        buf.write(f"# Session #{session_id}\n")
-        buf.write(f"# Utilisateur: {session.get('user_name', '?')}\n")
-        buf.write(f"# Plateforme: {session.get('platform_name', '?')}\n")
-        buf.write(f"# Date: {session.get('started_at', '')}\n")
-        buf.write(f"# Duree: {session.get('duration_sec', 0):.1f}s\n")
-        buf.write(f"# Samples: {len(samples)}\n")
-        writer.writerow(["timecode", "t_ms", "t_sec",
-                         "w0_g", "w1_g", "w2_g", "w3_g", "total_g",
-                         "com_x", "com_y"])
-        for t_ms, w0, w1, w2, w3, cx, cy in samples:
-            total = w0 + w1 + w2 + w3
-            writer.writerow([
-                _format_timecode(t_ms), t_ms, round(t_ms / 1000.0, 3),
-                round(w0, 1), round(w1, 1), round(w2, 1), round(w3, 1),
-                round(total, 1), round(cx, 6), round(cy, 6),
-            ])
-
-        return Response(
-            buf.getvalue(),
-            mimetype="text/csv",
+        if fmt == "npz":
+            make_body = lambda: export.iter_sessions_npz([session_id])
+        else:
+            make_body = lambda: export.iter_session_export(session_id, fmt)
+        return _session_response(
+            session, make_body, mimetype,
             headers={"Content-Disposition":
-                      f"attachment; filename=session_{session_id}.csv"})
+                     f"attachment; filename=session_{session_id}.{fmt}"})
+
+    @app.route("/api/session/<int:session_id>/export/csv")
+    def api_export_csv(session_id):
+        return _export_response(session_id, "csv", "text/csv")
 
     @app.route("/api/session/<int:session_id>/export/txt")
     def api_export_txt(session_id):
-        session = db.get_session(session_id)
-        if session is None:
-            return jsonify({"error": "not found"}), 404
-        samples = db.get_samples(session_id)
-        if not samples:
+        return _export_response(session_id, "txt", "text/plain")
+
+    def _npz_response(session_ids, filename):
+        chunks = export.iter_sessions_npz(session_ids)
+        if chunks is None:
             return jsonify({"error": "no samples"}), 404
+        return Response(
+            chunks,
+            mimetype="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename={filename}"})
 
-        lines = []
-        lines.append(f"Session #{session_id}")
-        lines.append(f"Utilisateur: {session.get('user_name', '?')}")
-        lines.append(f"Plateforme: {session.get('platform_name', '?')}")
-        lines.append(f"Date: {session.get('started_at', '')}")
-        lines.append(f"Duree: {session.get('duration_sec', 0):.1f}s")
-        lines.append(f"Samples: {len(samples)}")
-        lines.append("-" * 90)
-        header = ["timecode", "t_ms", "t_sec",
-                   "w0_g", "w1_g", "w2_g", "w3_g", "total_g",
-                   "com_x", "com_y"]
-        lines.append("\t".join(header))
-        lines.append("-" * 90)
-        for t_ms, w0, w1, w2, w3, cx, cy in samples:
-            total = w0 + w1 + w2 + w3
-            lines.append("\t".join(str(v) for v in [
-                _format_timecode(t_ms), t_ms, round(t_ms / 1000.0, 3),
-                round(w0, 1), round(w1, 1), round(w2, 1), round(w3, 1),
-                round(total, 1), round(cx, 6), round(cy, 6),
-            ]))
+    @app.route("/api/session/<int:session_id>/export/npz")
+    def api_export_npz(session_id):
+        return _export_response(session_id, "npz", "application/octet-stream")
 
-        return Response(
-            "\n".join(lines),
-            mimetype="text/plain",
-            headers={"Content-Disposition":
-                      f"attachment; filename=session_{session_id}.txt"})
+    @app.route("/api/export/npz")
+    def api_export_npz_multi():
+        """Several sessions in one archive: ?ids=1,2,3"""
+        try:
+            ids = [int(x) for x in request.args.get("ids", "").split(",") if x.strip()]
+        except ValueError:
+            return jsonify({"error": "bad ids"}), 400
+        if not ids:
+            return jsonify({"error": "no ids"}), 400
+        return _npz_response(ids, "sessions.npz")
+
+    # ── Batch export jobs ─────────────────────────────────────
+
+    def _job_status(job_id, job):
+        p = job.progress()
+        p.pop("output", None)
+        p["id"] = job_id
+        p["format"] = job.fmt
+        return p
+
+    @app.route("/api/export/jobs", methods=["POST"])
+    def api_export_job_start():
+        """Export every session matching user_id / platform_id /
+        date_from / date_to into one ZIP (JSON body or form)."""
+        args = request.get_json(silent=True) or request.form
+        fmt = args.get("format", "csv")
+        if fmt not in export.BATCH_FORMATS:
+            return jsonify({"error": "bad format"}), 400
+        try:
+            uid = int(args["user_id"]) if args.get("user_id") else None
+            pid = int(args["platform_id"]) if args.get("platform_id") else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "bad filter"}), 400
+        sids = export.select_sessions(uid, pid, args.get("date_from") or None,
+                                      args.get("date_to") or None)
+        if not sids:
+            return jsonify({"error": "no sessions"}), 404
+        os.makedirs(_JOBS_DIR, exist_ok=True)
+        with _jobs_lock:
+            job_id = next(_job_ids)
+            _prune_jobs()
+            job = export.BatchExport(
+                sids, fmt, os.path.join(_JOBS_DIR, f"export_{os.getpid()}_{job_id}.zip"))
+            _jobs[job_id] = job
+        job.start()
+        return jsonify(_job_status(job_id, job)), 202
+
+    @app.route("/api/export/jobs/<int:job_id>")
+    def api_export_job(job_id):
+        job = _jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "not found"}), 404
+        return jsonify(_job_status(job_id, job))
+
+    @app.route("/api/export/jobs/<int:job_id>/cancel", methods=["POST"])
+    def api_export_job_cancel(job_id):
+        job = _jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "not found"}), 404
+        job.cancel()
+        return jsonify(_job_status(job_id, job))
+
+    @app.route("/api/export/jobs/<int:job_id>/download")
+    def api_export_job_download(job_id):
+        job = _jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "not found"}), 404
+        if job.progress()["state"] != "done":
+            return jsonify({"error": "not ready"}), 409
+        return send_file(job.output, mimetype="application/zip", as_attachment=True,
+                         download_name=f"sessions_{job.fmt}.zip")
 
     return app
 
 
-def start_web_server(port: int = 5000):
-    """Start Flask in a daemon thread. Returns the thread."""
-    global _app, _server_thread
-    if Flask is None:
-        raise RuntimeError("Flask n'est pas installe (pip install flask)")
+def _file_chunks(f, size=64 * 1024):
+    with f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _prune_jobs():
+    """Forget the oldest finished jobs beyond _MAX_JOBS and delete their
+    archives (caller holds _jobs_lock)."""
+    finished = [jid for jid, job in _jobs.items() if job.finished]
+    for jid in finished[:max(0, len(_jobs) - _MAX_JOBS + 1)]:
+        job = _jobs.pop(jid)
+        try:
+            os.remove(job.output)
+        except OSError:
+            pass
 
-    db.init_db()
-    _app = _create_app()
 
-    def run():
-        _app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
+# ── Server ───────────────────────────────────────────────────
 
-    _server_thread = threading.Thread(target=run, daemon=True)
-    _server_thread.start()
-    return _server_thread
+class _RequestHandler(WSGIRequestHandler):
+    """Werkzeug handler with HTTP/1.1 keep-alive for body-less GET/HEAD
+    requests (werkzeug closes every connection: after each response it
+    drains the socket, which would eat the client's next request).
 
+    Between requests an idle keep-alive connection does not hold its pool
+    thread: handle() returns with `park` set and the server waits for the
+    next request with a selector."""
 
-def stop_web_server():
-    """Flask dev server doesn't support clean shutdown, but since it's
-    a daemon thread it will stop when the main app exits."""
-    global _app
-    _app = None
+    protocol_version = "HTTP/1.1"
+    timeout = WEB_TIMEOUT
+    _keep_alive = False
+    park = False
+
+    def handle(self):
+        """Serve the requests already received, then park or close."""
+        try:
+            self.close_connection = True
+            self.handle_one_request()
+            while not self.close_connection:
+                if not self._request_pending():
+                    self.park = True
+                    return
+                self.handle_one_request()
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e)
+
+    def _request_pending(self):
+        """Bytes of a next request already here (buffered or on the socket),
+        checked without blocking."""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(WEB_TIMEOUT)
+
+    def run_wsgi(self):
+        self.server._set_busy(self.connection, True)
+        self.connection.settimeout(WEB_TIMEOUT)
+        self._keep_alive = self._can_keep_alive()
+        try:
+            if not self._keep_alive:
+                return super().run_wsgi()
+            # No request body: hide the socket from werkzeug's drain
+            rfile, self.rfile = self.rfile, io.BytesIO()
+            try:
+                return super().run_wsgi()
+            finally:
+                self.rfile = rfile
+        finally:
+            self._keep_alive = False
+            self.server._set_busy(self.connection, False)
+
+    def _can_keep_alive(self):
+        return (self.request_version == "HTTP/1.1"
+                and not self.close_connection
+                and not _stopping.is_set()
+                and self.command in ("GET", "HEAD")
+                and self.headers.get("Content-Length", "0") == "0"
+                and "Transfer-Encoding" not in self.headers)
+
+    def send_header(self, keyword, value):
+        if (self._keep_alive and keyword.lower() == "connection"
+                and value.lower() == "close"):
+            return
+        super().send_header(keyword, value)
+
+    def log_request(self, code="-", size="-"):
+        pass  # no per-request console line
+
+
+class _PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server whose requests are served by a fixed thread pool
+    (instead of one new thread per connection), with a graceful stop.
+
+    A pool thread serves one connection only while it has requests to
+    answer. Idle keep-alive connections wait in a selector (one thread for
+    all of them): back to the pool when the next request arrives, closed
+    after WEB_KEEPALIVE seconds."""
+
+    request_queue_size = 64
+
+    def __init__(self, host, port, app, threads=WEB_THREADS):
+        super().__init__(host, port, app, handler=_RequestHandler)
+        self._pool = ThreadPoolExecutor(max_workers=threads,
+                                        thread_name_prefix="web")
+        self._conns = {}  # open connection -> busy (inside a request)
+        self._conns_lock = threading.Condition()
+        self._parked = []  # (conn, address) handed to the idle loop
+        self._idle_count = 0
+        self._closing = False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._idle_thread = threading.Thread(target=self._idle_loop,
+                                             name="web-idle", daemon=True)
+        self._idle_thread.start()
+
+    def process_request(self, request, client_address):
+        with self._conns_lock:
+            self._conns[request] = False
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        park = False
+        try:
+            park = self.RequestHandlerClass(request, client_address, self).park
+        except Exception:
+            self.handle_error(request, client_address)
+        if not (park and self._park(request, client_address)):
+            self._release(request)
+
+    def _release(self, conn):
+        self.shutdown_request(conn)
+        with self._conns_lock:
+            self._conns.pop(conn, None)
+            self._conns_lock.notify_all()
+
+    def _park(self, conn, client_address):
+        """Hand an idle keep-alive connection to the idle loop (False:
+        stopping or too many idle connections, close it instead)."""
+        with self._conns_lock:
+            if (self._closing or _stopping.is_set()
+                    or self._idle_count >= WEB_MAX_IDLE):
+                return False
+            self._idle_count += 1
+            self._parked.append((conn, client_address))
+        self._wake()
+        return True
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _idle_loop(self):
+        """Wait for the next request of the parked connections."""
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        deadlines = {}  # parked connection -> monotonic close time
+        while True:
+            with self._conns_lock:
+                parked, self._parked = self._parked, []
+                closing = self._closing
+            now = time.monotonic()
+            for conn, address in parked:
+                sel.register(conn, selectors.EVENT_READ, address)
+                deadlines[conn] = now + WEB_KEEPALIVE
+            if closing:
+                break
+            timeout = min(deadlines.values(), default=now + 1.0) - now
+            ready = []
+            for key, _ in sel.select(max(timeout, 0.0)):
+                if key.fileobj is self._wake_r:
+                    self._wake_r.recv(4096)
+                else:
+                    ready.append((key.fileobj, key.data))
+            now = time.monotonic()
+            expired = [c for c, t in deadlines.items() if t <= now]
+            for conn, address in ready:
+                self._unpark(sel, deadlines, conn)
+                self._pool.submit(self._process, conn, address)
+            for conn in expired:
+                if conn in deadlines:
+                    self._unpark(sel, deadlines, conn)
+                    self._release(conn)
+        for conn in list(deadlines):
+            self._unpark(sel, deadlines, conn)
+            self._release(conn)
+        sel.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _unpark(self, sel, deadlines, conn):
+        sel.unregister(conn)
+        del deadlines[conn]
+        with self._conns_lock:
+            self._idle_count -= 1
+
+    def _set_busy(self, conn, busy):
+        with self._conns_lock:
+            if conn in self._conns:
+                self._conns[conn] = busy
+            if not busy and _stopping.is_set():
+                self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def stop(self, grace=WEB_STOP_GRACE):
+        """Stop accepting, close idle keep-alive connections, let running
+        requests finish for up to `grace` seconds, then cut the rest."""
+        self.shutdown()  # serve_forever returns and closes the listen socket
+        with self._conns_lock:
+            self._closing = True
+        self._wake()
+        self._idle_thread.join()  # parked connections are closed
+        with self._conns_lock:
+            for conn, busy in list(self._conns.items()):
+                if not busy:
+                    self._close(conn)
+            self._conns_lock.wait_for(lambda: not self._conns, timeout=grace)
+            for conn in list(self._conns):
+                self._close(conn)
+        self._pool.shutdown(wait=True)
+
+
+def start_web_server(port: int = 5000, threads: int = WEB_THREADS):
+    """Start the dashboard (pooled HTTP server) in a daemon thread.
+    Returns the thread."""
+    global _app, _server, _server_thread
+    if Flask is None:
+        raise RuntimeError("Flask n'est pas installe (pip install flask)")
+    with _server_lock:
+        if _server is not None:
+            return _server_thread
+        db.init_db()
+        _app = _create_app(live_clients=min(LIVE_MAX_CLIENTS, threads // 2))
+        _stopping.clear()
+        _server = _PooledWSGIServer("0.0.0.0", port, _app, threads=threads)
+        _server_thread = threading.Thread(target=_server.serve_forever,
+                                          daemon=True)
+        _server_thread.start()
+        return _server_thread
+
+
+def stop_web_server(grace: float = WEB_STOP_GRACE):
+    """Graceful stop: refuse new connections, end live streams, wait for
+    the running requests (at most `grace` seconds)."""
+    global _app, _server, _server_thread
+    with _server_lock:
+        if _server is not None:
+            _stopping.set()
+            _server.stop(grace)
+            _server_thread.join(timeout=1.0)
+        _app = _server = _server_thread = None